@@ -1,70 +1,338 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, HTTPException, Query
 from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import sys
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List
-import uuid
-from datetime import datetime, timezone
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from datetime import datetime
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# The supermarket packages (database, services) live at the repository root
+sys.path.insert(0, str(ROOT_DIR.parent))
+
+from database.db_manager import DatabaseManager  # noqa: E402
+from services import Services  # noqa: E402
+from services.reporting import PERIODS, period_range  # noqa: E402
+
+# Shared SQLite store (WAL): SUPERMARKET_DB is a path, relative names resolve inside database/
+# like the desktop app, so the back office and this server can open the same file.
+DB_PATH = os.environ.get('SUPERMARKET_DB') or 'supermarket.db'
+POOL_SIZE = int(os.environ.get('SUPERMARKET_POOL_SIZE') or 8)
+# A batch holds the writer for its whole transaction, so keep it bounded
+MAX_BATCH = int(os.environ.get('SUPERMARKET_MAX_BATCH') or 500)
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(title="Supermarket Management System")
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Opened on startup: one writer connection shared by all requests and a pool of readers
+db = None
+services = None
+
+PURCHASE_COLUMNS = ('id', 'supplier_id', 'total_syp', 'total_usd', 'payment_method',
+                    'paid_amount_syp', 'paid_amount_usd', 'notes', 'purchase_date')
+PURCHASE_ITEM_COLUMNS = ('product_name', 'quantity', 'unit_price_syp', 'unit_price_usd',
+                         'subtotal_syp', 'subtotal_usd')
+
 
 # Define Models
-class StatusCheck(BaseModel):
-    model_config = ConfigDict(extra="ignore")  # Ignore MongoDB's _id field
-    
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    client_name: str
-    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+class Category(BaseModel):
+    id: int
+    name: str
+
+
+class Product(BaseModel):
+    id: int
+    name: str
+    category_id: Optional[int] = None
+    category: str
+    purchase_price_syp: float
+    purchase_price_usd: float
+    selling_price_syp: float
+    selling_price_usd: float
+    quantity: float
+    min_quantity: float
+    unit: str
+    barcode: str
+
+
+class SaleLine(BaseModel):
+    product_id: int
+    quantity: float = Field(gt=0)
+
+
+class SaleCreate(BaseModel):
+    items: List[SaleLine] = Field(min_length=1)
+    payment_method: str = 'نقدي'
+    # Must not exceed the cart subtotal (checked by SalesService.checkout)
+    discount_syp: float = Field(0, ge=0)
+    discount_usd: float = Field(0, ge=0)
+    notes: str = ''
+    sale_date: Optional[datetime] = None
+
+
+class SaleResult(BaseModel):
+    id: int
+    total_syp: float
+    total_usd: float
+
+
+class CompletedSaleLine(BaseModel):
+    product_id: int
+    quantity: float = Field(gt=0)
+    # Prices charged at the terminal, not the current catalog prices
+    unit_price_syp: float = Field(ge=0)
+    unit_price_usd: float = Field(ge=0)
+    name: Optional[str] = None
+
+
+class CompletedSale(BaseModel):
+    # Generated by the terminal (e.g. a UUID) and reused on every retry of the same sale
+    client_key: str = Field(min_length=1, max_length=100)
+    items: List[CompletedSaleLine] = Field(min_length=1)
+    payment_method: str = 'نقدي'
+    discount_syp: float = Field(0, ge=0)
+    discount_usd: float = Field(0, ge=0)
+    notes: str = ''
+    # Checked per sale in SalesService.ingest so one bad date only rejects its own sale
+    sale_date: Optional[str] = None
+
+
+class SaleBatch(BaseModel):
+    sales: List[CompletedSale] = Field(min_length=1, max_length=MAX_BATCH)
+
+
+class BatchResult(BaseModel):
+    client_key: str
+    status: Literal['created', 'duplicate', 'rejected', 'failed']
+    sale_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    created: int
+    duplicate: int
+    rejected: int
+    failed: int
+    results: List[BatchResult]
+
+
+class PurchaseLine(BaseModel):
+    product_id: int
+    quantity: float = Field(gt=0)
+    # Defaults to the product's current purchase price
+    unit_price_syp: Optional[float] = None
+    unit_price_usd: Optional[float] = None
+
+
+class PurchaseCreate(BaseModel):
+    items: List[PurchaseLine] = Field(min_length=1)
+    supplier_id: Optional[int] = None
+    payment_method: str = 'نقدي'
+    paid_syp: float = 0
+    paid_usd: float = 0
+    notes: str = ''
+    purchase_date: Optional[datetime] = None
+
+
+class StockAdjustment(BaseModel):
+    product_id: int
+    quantity: float = Field(gt=0)
+    movement_type: Literal['in', 'out']
+    reason: str = ''
+    movement_date: Optional[datetime] = None
+
+
+def product_dict(record):
+    return {field: getattr(record, field) for field in Product.model_fields}
+
+
+async def call(fn, *args, **kwargs):
+    """Run a blocking service call in the thread pool.
+
+    Writes made by another process on the same file (the desktop back office) are picked up
+    first, input errors become 400 responses and failed saves (None/False) become 500.
+    """
+    def run():
+        db.sync_external_changes()
+        return fn(*args, **kwargs)
+
+    try:
+        result = await run_in_threadpool(run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None or result is False:
+        raise HTTPException(status_code=500, detail="تعذر حفظ العملية في قاعدة البيانات")
+    return result
+
+
+def date_range(period, from_date, to_date):
+    """(from, to) for a preset period or an explicit range"""
+    if from_date or to_date:
+        return from_date, to_date or from_date
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"فترة غير معروفة: {period}")
+    return period_range(period)
 
-class StatusCheckCreate(BaseModel):
-    client_name: str
 
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
-    return {"message": "Hello World"}
-
-@api_router.post("/status", response_model=StatusCheck)
-async def create_status_check(input: StatusCheckCreate):
-    status_dict = input.model_dump()
-    status_obj = StatusCheck(**status_dict)
-    
-    # Convert to dict and serialize datetime to ISO string for MongoDB
-    doc = status_obj.model_dump()
-    doc['timestamp'] = doc['timestamp'].isoformat()
-    
-    _ = await db.status_checks.insert_one(doc)
-    return status_obj
-
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    # Exclude MongoDB's _id field from the query results
-    status_checks = await db.status_checks.find({}, {"_id": 0}).to_list(1000)
-    
-    # Convert ISO string timestamps back to datetime objects
-    for check in status_checks:
-        if isinstance(check['timestamp'], str):
-            check['timestamp'] = datetime.fromisoformat(check['timestamp'])
-    
-    return status_checks
+    return {"message": "Supermarket Management System", "database": db.db_path, "profile": db.profile_name}
+
+
+# ------------------ Catalog ------------------
+@api_router.get("/categories", response_model=List[Category])
+async def list_categories():
+    choices = await call(services.catalog.category_choices)
+    return [{"id": category_id, "name": name} for name, category_id in choices.items()]
+
+
+@api_router.get("/products", response_model=List[Product])
+async def list_products(category_id: Optional[int] = None,
+                        limit: int = Query(100, ge=1, le=1000), after_id: int = Query(0, ge=0)):
+    """Products ordered by id; pass the last id of a page as after_id to get the next one.
+
+    Keyset paging stays stable while the catalog changes between requests.
+    """
+    def page():
+        catalog = services.catalog.catalog
+        records = catalog.records() if category_id is None else catalog.in_category(category_id)
+        records = sorted((record for record in records if record.id > after_id), key=lambda record: record.id)
+        return [product_dict(record) for record in records[:limit]]
+
+    return await call(page)
+
+
+@api_router.get("/products/barcode/{barcode}", response_model=Product)
+async def get_product_by_barcode(barcode: str):
+    def find():
+        record = services.catalog.find_by_barcode(barcode)
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"باركود غير معروف: {barcode}")
+        return product_dict(record)
+
+    return await call(find)
+
+
+@api_router.get("/products/{product_id}", response_model=Product)
+async def get_product(product_id: int):
+    def find():
+        record = services.catalog.get(product_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"منتج غير معروف: {product_id}")
+        return product_dict(record)
+
+    return await call(find)
+
+
+@api_router.get("/search", response_model=List[Product])
+async def search_products(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=200)):
+    def search():
+        ids = services.catalog.search(q, limit=limit, include_category=True)
+        records = (services.catalog.get(product_id) for product_id in ids)
+        return [product_dict(record) for record in records if record is not None]
+
+    return await call(search)
+
+
+# ------------------ Sales ------------------
+@api_router.post("/sales", response_model=SaleResult, status_code=201)
+async def create_sale(sale: SaleCreate):
+    def checkout():
+        sale_id, cart = services.sales.sell(
+            [(line.product_id, line.quantity) for line in sale.items],
+            payment_method=sale.payment_method,
+            discount_syp=sale.discount_syp,
+            discount_usd=sale.discount_usd,
+            notes=sale.notes,
+            sale_date=sale.sale_date
+        )
+        if sale_id is None:
+            return None
+        total_syp, total_usd = cart.subtotal()
+        return {"id": sale_id, "total_syp": total_syp - sale.discount_syp, "total_usd": total_usd - sale.discount_usd}
+
+    return await call(checkout)
+
+
+@api_router.post("/sales/batch", response_model=BatchResponse)
+async def ingest_sales(batch: SaleBatch):
+    """Record sales completed at the terminals in one transaction.
+
+    Sales whose client_key is already recorded come back as duplicates with their id, so a
+    terminal can resend a whole queue after a dropped connection. Invalid sales are rejected
+    individually without affecting the rest of the batch.
+    """
+    results = await call(services.sales.ingest, [sale.model_dump() for sale in batch.sales])
+    counts = {status: 0 for status in ('created', 'duplicate', 'rejected', 'failed')}
+    for result in results:
+        counts[result['status']] += 1
+    return {**counts, "results": results}
+
+
+# ------------------ Purchases ------------------
+@api_router.post("/purchases", status_code=201)
+async def create_purchase(purchase: PurchaseCreate):
+    def save():
+        lines = [services.purchasing.line(line.product_id, line.quantity, line.unit_price_syp, line.unit_price_usd)
+                 for line in purchase.items]
+        return services.purchasing.save(
+            lines, purchase.supplier_id,
+            payment_method=purchase.payment_method,
+            paid_syp=purchase.paid_syp,
+            paid_usd=purchase.paid_usd,
+            notes=purchase.notes,
+            purchase_date=purchase.purchase_date
+        )
+
+    return {"id": await call(save)}
+
+
+@api_router.get("/purchases/{purchase_id}")
+async def get_purchase(purchase_id: int):
+    purchase, items = await call(services.purchasing.details, purchase_id)
+    if purchase is None:
+        raise HTTPException(status_code=404, detail=f"فاتورة غير معروفة: {purchase_id}")
+    return {
+        **dict(zip(PURCHASE_COLUMNS, purchase)),
+        "items": [dict(zip(PURCHASE_ITEM_COLUMNS, item)) for item in items],
+    }
+
+
+# ------------------ Inventory ------------------
+@api_router.post("/stock/adjustments")
+async def adjust_stock(adjustment: StockAdjustment):
+    quantity = await call(
+        services.inventory.adjust,
+        adjustment.product_id, adjustment.quantity, adjustment.movement_type,
+        adjustment.reason, adjustment.movement_date
+    )
+    return {"product_id": adjustment.product_id, "quantity": quantity}
+
+
+# ------------------ Reports ------------------
+@api_router.get("/dashboard")
+async def dashboard():
+    return await call(db.dashboard.get)
+
+
+@api_router.get("/reports/{report}")
+async def get_report(report: str, period: str = 'month',
+                     from_date: Optional[str] = None, to_date: Optional[str] = None):
+    from_date, to_date = date_range(period, from_date, to_date)
+    data = await call(services.reporting.report, report, from_date, to_date)
+    return {"report": report, "from_date": from_date, "to_date": to_date, **data}
+
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -84,6 +352,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@app.on_event("startup")
+async def open_database():
+    global db, services
+    db = DatabaseManager(DB_PATH, pool_size=POOL_SIZE)
+    services = Services(db)
+    # Load the catalog once so the first checkout does not pay for it
+    await run_in_threadpool(db.catalog.ensure_loaded)
+    logger.info("Serving %s (profile: %s)", db.db_path, db.profile_name)
+
+
 @app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+async def close_database():
+    if db is not None:
+        db.close()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    # Listen on the store LAN with SUPERMARKET_HOST=0.0.0.0
+    uvicorn.run(app, host=os.environ.get('SUPERMARKET_HOST', '127.0.0.1'),
+                port=int(os.environ.get('SUPERMARKET_PORT') or 8001))
@@ -0,0 +1,372 @@
+# توليد قاعدة بيانات اصطناعية واقعية بمخطط create_tables لقياس الأداء
+# الاستخدام: python -m benchmarks.generate مسار_القاعدة [--preset small|medium|large] [--seed 1]
+# - شعبية المنتجات بتوزيع Zipf: قلة من المنتجات تظهر في معظم السلال كما في متجر حقيقي
+# - مشتريات إعادة تعبئة من مورد كل فئة عند انخفاض المخزون، ومصروفات يومية وشهرية
+# - الأيام تنتهي اليوم حتى تكون فترات التقارير (اليوم، الأسبوع...) ممتلئة
+# - نفس البذرة والمعاملات تعطي نفس البيانات (عدا التواريخ المرتبطة بيوم التوليد)
+import argparse
+import math
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from database.db_manager import DatabaseManager
+
+
+# الأحجام الجاهزة: المنتجات، الفئات، الموردون، الأيام، المبيعات في اليوم
+PRESETS = {
+    'small': {'products': 500, 'categories': 20, 'suppliers': 10, 'days': 365, 'sales_per_day': 80},
+    'medium': {'products': 3000, 'categories': 40, 'suppliers': 30, 'days': 730, 'sales_per_day': 200},
+    'large': {'products': 10000, 'categories': 80, 'suppliers': 60, 'days': 1095, 'sales_per_day': 400},
+}
+
+# سعر صرف ثابت لتحويل الأسعار بين الدولار والليرة
+USD_RATE = 13000
+
+_CATEGORY_NAMES = (
+    'مواد غذائية', 'مشروبات', 'ألبان وأجبان', 'معلبات', 'حبوب وبقوليات', 'زيوت وسمون', 'حلويات',
+    'بسكويت وشوكولا', 'منظفات', 'عناية شخصية', 'خضار وفواكه', 'لحوم ودواجن', 'مخبوزات', 'بهارات',
+    'أدوات منزلية', 'قرطاسية', 'مجمدات', 'أطعمة أطفال', 'مكسرات', 'شاي وقهوة',
+)
+_PRODUCT_NAMES = (
+    'أرز', 'سكر', 'شاي', 'قهوة', 'حليب', 'لبنة', 'جبنة', 'زيت زيتون', 'زيت دوار الشمس', 'سمنة', 'معكرونة',
+    'برغل', 'عدس', 'حمص', 'فول', 'طحين', 'ملح', 'عسل', 'مربى', 'طحينة', 'حلاوة', 'بسكويت', 'شوكولا',
+    'عصير برتقال', 'مياه معدنية', 'مشروب غازي', 'تونة', 'سردين', 'رب البندورة', 'ذرة', 'فطر', 'زيتون',
+    'صابون', 'شامبو', 'معجون أسنان', 'مسحوق غسيل', 'سائل جلي', 'مناديل', 'كلور', 'معطر', 'بيض',
+    'خبز', 'كعك', 'زعتر', 'كمون', 'فلفل أسود', 'قرفة', 'لوز', 'فستق', 'بزر',
+)
+_BRANDS = ('الريف', 'الشام', 'النخبة', 'الوادي', 'الجبل', 'الساحل', 'البادية', 'الفرات', 'الربيع', 'الأصيل',
+           'الذهبي', 'الممتاز', 'السنبلة', 'الغدير', 'الهلال')
+_SIZES = (('250 غ', 'قطعة'), ('500 غ', 'قطعة'), ('1 كغ', 'قطعة'), ('2 كغ', 'قطعة'), ('1 لتر', 'قطعة'),
+          ('1.5 لتر', 'قطعة'), ('عبوة 6', 'علبة'), ('علبة 12', 'علبة'), ('كرتونة', 'كرتونة'), ('', 'كغ'))
+_PAYMENT_METHODS = ('نقدي', 'نقدي', 'نقدي', 'نقدي', 'بطاقة', 'آجل')
+# المصروفات الشهرية (الفئة، الوصف، المبلغ بالدولار) والمصروفات اليومية المتغيرة
+_MONTHLY_EXPENSES = (('إيجار', 'إيجار المحل', 400), ('رواتب', 'رواتب الموظفين', 900),
+                     ('كهرباء', 'فاتورة الكهرباء', 120), ('مياه', 'فاتورة المياه', 20))
+_DAILY_EXPENSES = (('نقل', 'أجور نقل بضاعة'), ('صيانة', 'صيانة وإصلاحات'), ('ضيافة', 'ضيافة'),
+                   ('مولدة', 'مازوت المولدة'), ('متفرقة', 'مصاريف متفرقة'))
+
+
+def zipf_weights(count, exponent=1.0):
+    """أوزان تراكمية لشعبية count عنصراً: وزن العنصر ذي الرتبة r يساوي 1 / r^exponent"""
+    cumulative = []
+    total = 0
+    for rank in range(1, count + 1):
+        total += 1 / rank ** exponent
+        cumulative.append(total)
+    return cumulative
+
+
+def _money(usd):
+    """السعر بالدولار (سنتان) وما يقابله بالليرة مقرباً لأقرب 100"""
+    usd = round(usd, 2)
+    return usd, round(usd * USD_RATE, -2)
+
+
+def _day_time(rng, day, opening=8, closing=22):
+    """وقت عشوائي خلال ساعات الدوام في يوم معين"""
+    return datetime.combine(day, datetime.min.time()) + timedelta(
+        seconds=rng.randint(opening * 3600, closing * 3600 - 1), microseconds=rng.randint(0, 999999)
+    )
+
+
+class DatasetGenerator:
+    """توليد البيانات بإدراج جماعي مباشر ثم إعادة بناء طبقات التكلفة والملخصات مرة واحدة
+
+    الإدراج المباشر أسرع بكثير من complete_sale لكل فاتورة، والنتيجة مطابقة لما يسجله البرنامج
+    بعد أمر rebuild-costs (الجداول نفسها وصيغ التواريخ نفسها).
+    """
+
+    def __init__(self, db, products=500, categories=20, suppliers=10, days=365, sales_per_day=80,
+                 basket_mean=4, zipf_exponent=1.0, seed=1, end_date=None):
+        self.db = db
+        self.products = products
+        self.categories = categories
+        self.suppliers = suppliers
+        self.days = days
+        self.sales_per_day = sales_per_day
+        self.basket_mean = basket_mean
+        self.zipf_exponent = zipf_exponent
+        self.end_date = end_date or datetime.now().date()
+        self.rng = random.Random(seed)
+        # المنتجات المولدة: [المعرف، الاسم، سعر الشراء $، سعر البيع $، المورد، الحد الأدنى]
+        self.catalog = []
+        self.stock = {}
+        self.counts = {}
+
+    def run(self, progress=None):
+        """توليد كل البيانات وإرجاع عدد صفوف كل جدول"""
+        self.create_catalog()
+        self.create_history(progress)
+        if self.db.costing.rebuild() is None:
+            raise RuntimeError("تعذر إعادة بناء طبقات التكلفة")
+        # إحصائيات المخطط كما في قاعدة مستخدمة منذ مدة (PRAGMA optimize عند كل تشغيل)
+        self.db.execute_query("ANALYZE")
+        return self.counts
+
+    # ------------------ الكتالوج ------------------
+    def create_catalog(self):
+        """الفئات والموردون والمنتجات بأسعار وباركودات فريدة"""
+        rng = self.rng
+        start = (self.end_date - timedelta(days=self.days)).strftime('%Y-%m-%d %H:%M:%S')
+        categories = [
+            (i, _CATEGORY_NAMES[(i - 1) % len(_CATEGORY_NAMES)] +
+             ('' if i <= len(_CATEGORY_NAMES) else f" {(i - 1) // len(_CATEGORY_NAMES) + 1}"), '', start)
+            for i in range(1, self.categories + 1)
+        ]
+        suppliers = [
+            (i, f"مورد {rng.choice(_BRANDS)} {i}", f"09{rng.randint(10000000, 99999999)}",
+             rng.choice(('دمشق', 'حلب', 'حمص', 'حماة', 'اللاذقية', 'طرطوس')), '', start)
+            for i in range(1, self.suppliers + 1)
+        ]
+        # مورد كل فئة (منه تُشترى منتجاتها)
+        category_supplier = {category[0]: rng.randint(1, self.suppliers) for category in categories}
+
+        products = []
+        barcodes = rng.sample(range(10 ** 11, 10 ** 12), self.products)
+        for product_id in range(1, self.products + 1):
+            category_id = rng.randint(1, self.categories)
+            size, unit = rng.choice(_SIZES)
+            name = ' '.join(part for part in (rng.choice(_PRODUCT_NAMES), rng.choice(_BRANDS), size) if part)
+            name = f"{name} {product_id}"
+            # أسعار الشراء موزعة لوغاريتمياً بين 0.2 و 25 دولاراً
+            cost_usd, cost_syp = _money(math.exp(rng.uniform(math.log(0.2), math.log(25))))
+            price_usd, price_syp = _money(cost_usd * rng.uniform(1.15, 1.4))
+            min_quantity = rng.choice((5, 10, 10, 20))
+            products.append((product_id, name, category_id, cost_syp, cost_usd, price_syp, price_usd,
+                             0, min_quantity, unit, '', start, start, f"6{barcodes[product_id - 1]:012d}"))
+            self.catalog.append([product_id, name, cost_usd, price_usd, category_supplier[category_id], min_quantity])
+            self.stock[product_id] = 0
+
+        with self.db.transaction():
+            self.db.execute_many(
+                "INSERT INTO categories (id, name, description, created_at) VALUES (?, ?, ?, ?)", categories
+            )
+            self.db.execute_many(
+                "INSERT INTO suppliers (id, name, phone, address, notes, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                suppliers
+            )
+            self.db.execute_many(
+                """INSERT INTO products (id, name, category_id, purchase_price_syp, purchase_price_usd,
+                                         selling_price_syp, selling_price_usd, quantity, min_quantity, unit,
+                                         description, created_at, updated_at, barcode)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                products
+            )
+        self.counts.update(categories=len(categories), suppliers=len(suppliers), products=len(products))
+
+    # ------------------ السجل التاريخي ------------------
+    def create_history(self, progress=None):
+        """المبيعات والمشتريات والمصروفات يوماً بيوم (معاملة لكل شهر تقريباً)"""
+        rng = self.rng
+        # ترتيب الشعبية عشوائي حتى لا تكون المنتجات الأولى هي الأكثر مبيعاً
+        popular = list(self.catalog)
+        rng.shuffle(popular)
+        cumulative = zipf_weights(len(popular), self.zipf_exponent)
+        # الطلب اليومي المتوقع لكل منتج لتحديد متى وكم يُعاد تعبئته
+        lines_per_day = self.sales_per_day * self.basket_mean
+        demand = {product[0]: lines_per_day * 2 * (cumulative[i] - (cumulative[i - 1] if i else 0)) / cumulative[-1]
+                  for i, product in enumerate(popular)}
+
+        ids = {'sales': 0, 'sale_items': 0, 'purchases': 0, 'purchase_items': 0, 'expenses': 0}
+        batch = self._empty_batch()
+        first_day = self.end_date - timedelta(days=self.days - 1)
+        for offset in range(self.days):
+            day = first_day + timedelta(days=offset)
+            self._restock(day, demand, ids, batch)
+            self._expenses(day, ids, batch)
+            for _ in range(max(0, round(rng.gauss(self.sales_per_day, self.sales_per_day * 0.15)))):
+                self._sale(day, popular, cumulative, ids, batch)
+            if offset % 30 == 29 or offset == self.days - 1:
+                self._flush(batch)
+                batch = self._empty_batch()
+                if progress:
+                    progress(offset + 1, self.days)
+
+        # الكميات الحالية = كل المشتريات - كل المبيعات
+        with self.db.transaction():
+            self.db.execute_many("UPDATE products SET quantity = ? WHERE id = ?",
+                                 [(quantity, product_id) for product_id, quantity in self.stock.items()])
+        self.counts.update(ids)
+        self.counts['inventory_movements'] = ids['sale_items'] + ids['purchase_items']
+
+    @staticmethod
+    def _empty_batch():
+        return {'sales': [], 'sale_items': [], 'purchases': [], 'purchase_items': [],
+                'expenses': [], 'movements': [], 'debts': []}
+
+    def _sale(self, day, popular, cumulative, ids, batch):
+        rng = self.rng
+        at = _day_time(rng, day).isoformat()
+        # عدد أسطر السلة بتوزيع هندسي متوسطه basket_mean
+        lines = 1
+        while rng.random() > 1 / self.basket_mean:
+            lines += 1
+        basket = {}
+        for product in rng.choices(popular, cum_weights=cumulative, k=lines):
+            quantity = rng.choice((1, 1, 1, 1, 2, 2, 3, 5))
+            basket[product[0]] = (product, basket.get(product[0], (product, 0))[1] + quantity)
+
+        ids['sales'] += 1
+        sale_id = ids['sales']
+        total_usd = 0
+        for product, quantity in basket.values():
+            product_id, name, _, price_usd = product[:4]
+            price_usd, price_syp = _money(price_usd)
+            ids['sale_items'] += 1
+            batch['sale_items'].append((ids['sale_items'], sale_id, product_id, name, quantity, price_syp, price_usd,
+                                        round(quantity * price_syp, 2), round(quantity * price_usd, 2)))
+            batch['movements'].append((product_id, 'out', quantity, 'بيع', at))
+            self.stock[product_id] -= quantity
+            total_usd += quantity * price_usd
+        # خصم على نحو 5% من الفواتير
+        discount_usd = round(total_usd * 0.05, 2) if rng.random() < 0.05 else 0
+        total_usd = round(total_usd - discount_usd, 2)
+        batch['sales'].append((sale_id, round(total_usd * USD_RATE, -2), total_usd, rng.choice(_PAYMENT_METHODS),
+                               round(discount_usd * USD_RATE, -2), discount_usd, '', at))
+
+    def _restock(self, day, demand, ids, batch):
+        """فاتورة شراء لكل مورد بالمنتجات التي انخفض مخزونها عن حاجة يومين"""
+        rng = self.rng
+        orders = {}
+        for product_id, name, cost_usd, _, supplier_id, min_quantity in self.catalog:
+            daily = demand[product_id]
+            if self.stock[product_id] < daily * 2 + min_quantity:
+                quantity = math.ceil(daily * rng.uniform(7, 14)) + min_quantity * 2
+                orders.setdefault(supplier_id, []).append((product_id, name, cost_usd, quantity))
+        at = _day_time(rng, day, 7, 9).strftime('%Y-%m-%d %H:%M:%S')
+        for supplier_id, items in orders.items():
+            ids['purchases'] += 1
+            purchase_id = ids['purchases']
+            total_usd = 0
+            for product_id, name, cost_usd, quantity in items:
+                cost_usd, cost_syp = _money(cost_usd * rng.uniform(0.97, 1.03))
+                ids['purchase_items'] += 1
+                batch['purchase_items'].append((ids['purchase_items'], purchase_id, product_id, name, quantity,
+                                                cost_syp, cost_usd, round(quantity * cost_syp, 2),
+                                                round(quantity * cost_usd, 2)))
+                batch['movements'].append((product_id, 'in', quantity, 'شراء', at))
+                self.stock[product_id] += quantity
+                total_usd += quantity * cost_usd
+            total_usd = round(total_usd, 2)
+            total_syp = round(total_usd * USD_RATE, -2)
+            # ثلث الفواتير آجلة يُدفع نصفها فيتراكم دين على المورد
+            method = 'آجل' if rng.random() < 0.33 else 'نقدي'
+            paid_usd = round(total_usd / 2, 2) if method == 'آجل' else total_usd
+            paid_syp = round(paid_usd * USD_RATE, -2)
+            batch['purchases'].append((purchase_id, supplier_id, total_syp, total_usd, method,
+                                       paid_syp, paid_usd, '', at))
+            if paid_usd < total_usd:
+                batch['debts'].append((total_syp - paid_syp, round(total_usd - paid_usd, 2), supplier_id))
+
+    def _expenses(self, day, ids, batch):
+        rng = self.rng
+        rows = []
+        if day.day == 1:
+            rows.extend(_MONTHLY_EXPENSES)
+        for category, description in _DAILY_EXPENSES:
+            if rng.random() < 0.3:
+                rows.append((category, description, rng.uniform(2, 40)))
+        for category, description, amount in rows:
+            amount_usd, amount_syp = _money(amount)
+            ids['expenses'] += 1
+            batch['expenses'].append((ids['expenses'], category, description, amount_syp, amount_usd,
+                                      _day_time(rng, day).strftime('%Y-%m-%d %H:%M:%S')))
+
+    def _flush(self, batch):
+        """كتابة دفعة الأيام في معاملة واحدة (المشغلات تحدّث الملخصات اليومية وفهرس البحث)"""
+        with self.db.transaction():
+            self.db.execute_many(
+                """INSERT INTO purchases (id, supplier_id, total_syp, total_usd, payment_method,
+                                          paid_amount_syp, paid_amount_usd, notes, purchase_date)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                batch['purchases']
+            )
+            self.db.execute_many(
+                """INSERT INTO purchase_items (id, purchase_id, product_id, product_name, quantity,
+                                               unit_price_syp, unit_price_usd, subtotal_syp, subtotal_usd)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                batch['purchase_items']
+            )
+            self.db.execute_many(
+                "UPDATE suppliers SET debt_syp = debt_syp + ?, debt_usd = debt_usd + ? WHERE id = ?",
+                batch['debts']
+            )
+            self.db.execute_many(
+                """INSERT INTO sales (id, total_syp, total_usd, payment_method, discount_syp, discount_usd,
+                                      notes, sale_date)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                batch['sales']
+            )
+            self.db.execute_many(
+                """INSERT INTO sale_items (id, sale_id, product_id, product_name, quantity, unit_price_syp,
+                                           unit_price_usd, subtotal_syp, subtotal_usd)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                batch['sale_items']
+            )
+            self.db.execute_many(
+                """INSERT INTO expenses (id, category, description, amount_syp, amount_usd, expense_date)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                batch['expenses']
+            )
+            self.db.execute_many(
+                """INSERT INTO inventory_movements (product_id, movement_type, quantity, reason, movement_date)
+                   VALUES (?, ?, ?, ?, ?)""",
+                batch['movements']
+            )
+
+
+def generate(path, preset='small', seed=1, progress=None, **overrides):
+    """إنشاء قاعدة بيانات جديدة في path وإرجاع عدد صفوف كل جدول
+
+    overrides يغيّر معاملات الحجم الجاهز (products، days، sales_per_day...).
+    """
+    path = os.path.abspath(path)
+    if os.path.exists(path):
+        raise FileExistsError(f"الملف موجود مسبقاً: {path}")
+    params = dict(PRESETS[preset])
+    params.update({key: value for key, value in overrides.items() if value is not None})
+    db = DatabaseManager(path)
+    try:
+        return DatasetGenerator(db, seed=seed, **params).run(progress)
+    finally:
+        db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="توليد قاعدة بيانات اصطناعية لقياس الأداء")
+    parser.add_argument('path', help="مسار ملف قاعدة البيانات الجديدة")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small', help="الحجم الجاهز")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--products', type=int)
+    parser.add_argument('--categories', type=int)
+    parser.add_argument('--suppliers', type=int)
+    parser.add_argument('--days', type=int)
+    parser.add_argument('--sales-per-day', type=int)
+    parser.add_argument('--force', action='store_true', help="استبدال الملف إن كان موجوداً")
+    args = parser.parse_args(argv)
+
+    if args.force:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.path + suffix):
+                os.remove(args.path + suffix)
+
+    def progress(done, total):
+        print(f"\r{done} / {total} يوم", end='', flush=True)
+
+    start = time.perf_counter()
+    try:
+        counts = generate(args.path, args.preset, args.seed, progress, products=args.products,
+                          categories=args.categories, suppliers=args.suppliers, days=args.days,
+                          sales_per_day=args.sales_per_day)
+    except FileExistsError as e:
+        print(f"{e} (استخدم --force للاستبدال)")
+        return 1
+    print(f"\nتم التوليد في {time.perf_counter() - start:.1f} ثانية:")
+    for table, count in counts.items():
+        print(f"  {table}: {count:,}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,326 @@
+# قياس أداء العمليات الأساسية على قاعدة بيانات اصطناعية بدون واجهة (لا يحتاج شاشة)
+# الاستخدام: python -m benchmarks.run [--db قاعدة_مولدة | --preset small] [--output نتائج.json] [--compare سابقة.json]
+# - كل قياس: تشغيلات إحماء ثم عدة تكرارات، والنتيجة الأدنى والوسيط والمتوسط و p95 والأقصى بالميلي ثانية
+# - القياس على نسخة مؤقتة من القاعدة لأن قياس البيع يكتب فيها
+# - النتائج JSON مع بيئة التشغيل (Python، SQLite، رقم الإيداع) لمقارنتها بين الإصدارات
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from database.db_manager import DatabaseManager
+from database.export import export_dataset
+from database.reports import REPORT_BUILDERS
+from database.search import tokenize
+from benchmarks.generate import PRESETS, generate
+from services.inventory import INVENTORY_COLUMNS
+from services.reporting import PERIODS, period_range
+from utils.perf import percentile
+
+
+# الجداول التي يُسجل عدد صفوفها مع النتائج
+_COUNTED_TABLES = ('products', 'categories', 'suppliers', 'sales', 'sale_items', 'purchases', 'expenses')
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def stats(durations):
+    """إحصائيات أزمنة التكرارات بالميلي ثانية"""
+    values = sorted(d * 1000 for d in durations)
+    return {
+        'runs': len(values),
+        'min_ms': round(values[0], 3),
+        'median_ms': round(statistics.median(values), 3),
+        'mean_ms': round(statistics.fmean(values), 3),
+        'p95_ms': round(percentile(values, 0.95), 3),
+        'max_ms': round(values[-1], 3),
+    }
+
+
+def git_commit():
+    """رقم الإيداع الحالي (مع علامة + إن وُجدت تعديلات غير مودعة) أو None"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=_ROOT,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=_ROOT,
+                               capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return (commit + ('+' if dirty else '')) or None
+
+
+def environment(db):
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'sqlite': sqlite3.sqlite_version,
+        'commit': git_commit(),
+        'database_profile': db.profile_name,
+        'costing': db.costing.method,
+    }
+
+
+class BenchmarkSuite:
+    """تعريف القياسات وتشغيلها على DatabaseManager مفتوح"""
+
+    def __init__(self, db, repeat=10, warmup=2, basket=10, seed=1, output_dir=None):
+        self.db = db
+        self.repeat = repeat
+        self.warmup = warmup
+        self.basket = basket
+        self.rng = random.Random(seed)
+        self.output_dir = output_dir or tempfile.gettempdir()
+        self.results = {}
+
+    def measure(self, name, fn, setup=None, repeat=None, warmup=None):
+        """تشغيل fn بعد setup (غير محسوب) في كل تكرار وحفظ إحصائيات الأزمنة"""
+        repeat = self.repeat if repeat is None else repeat
+        warmup = self.warmup if warmup is None else warmup
+        durations = []
+        for i in range(warmup + repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            if i >= warmup:
+                durations.append(elapsed)
+        self.results[name] = stats(durations)
+        return self.results[name]
+
+    def benchmarks(self):
+        """(الاسم، الدالة) لكل قياس بالترتيب"""
+        items = [
+            ('checkout', self.bench_checkout),
+            ('search.cold', lambda name: self.bench_search(name, cold=True)),
+            ('search.warm', lambda name: self.bench_search(name, cold=False)),
+            ('search.typing', self.bench_typing),
+        ]
+        for report in REPORT_BUILDERS:
+            for period in PERIODS:
+                items.append((f"report.{report}.{period}",
+                              lambda name, report=report, period=period: self.bench_report(name, report, period)))
+        items += [
+            ('dashboard', self.bench_dashboard),
+            ('inventory.load', self.bench_inventory),
+            ('export.sales.year', lambda name: self.bench_export(name, 'sales', 'year')),
+            ('export.raw_sale_items.month', lambda name: self.bench_export(name, 'raw_sale_items', 'month')),
+        ]
+        return items
+
+    def run(self, patterns=None, progress=None):
+        """تشغيل القياسات المطابقة لأحد الأنماط (fnmatch) أو كلها"""
+        for name, bench in self.benchmarks():
+            if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                continue
+            bench(name)
+            if progress:
+                progress(name, self.results[name])
+        return self.results
+
+    # ------------------ القياسات ------------------
+    def bench_checkout(self, name):
+        """تسجيل فاتورة من basket سطراً بالمنتجات الأكثر مبيعاً (المعاملة والتكلفة والمخزون والملخصات)"""
+        product_ids = [row[0] for row in self.db.fetch_all("""
+            SELECT product_id FROM sale_items GROUP BY product_id ORDER BY SUM(quantity) DESC LIMIT ?
+        """, (max(self.basket * 5, 50),))]
+        if len(product_ids) < self.basket:
+            product_ids = [row[0] for row in self.db.fetch_all("SELECT id FROM products LIMIT ?", (self.basket * 5,))]
+        catalog = self.db.catalog
+        catalog.ensure_loaded()
+
+        def checkout():
+            items = []
+            for product_id in self.rng.sample(product_ids, min(self.basket, len(product_ids))):
+                record = catalog.get(product_id)
+                price_syp, price_usd = record.selling_price_syp, record.selling_price_usd
+                items.append({
+                    'product_id': product_id, 'name': record.name, 'quantity': 1,
+                    'unit_price_syp': price_syp, 'unit_price_usd': price_usd,
+                    'total_syp': price_syp, 'total_usd': price_usd,
+                })
+            total_syp = sum(item['total_syp'] for item in items)
+            total_usd = sum(item['total_usd'] for item in items)
+            if self.db.complete_sale(items, total_syp, total_usd) is None:
+                raise RuntimeError("فشل تسجيل الفاتورة")
+
+        self.measure(name, checkout)
+        self.results[name]['basket'] = self.basket
+
+    def search_terms(self, count=20):
+        """كلمات بحث من أسماء المنتجات الفعلية (أول كلمة وأول كلمتين)"""
+        names = [row[0] for row in self.db.fetch_all("SELECT name FROM products ORDER BY id")]
+        sample = self.rng.sample(names, min(count, len(names)))
+        return [' '.join(tokenize(name)[:1 + i % 2]) for i, name in enumerate(sample)]
+
+    def bench_search(self, name, cold):
+        """البحث عن مجموعة كلمات (cold: بدون ذاكرة النتائج في كل تكرار)"""
+        searcher = self.db.product_search
+        self.db.catalog.ensure_loaded()
+        terms = self.search_terms()
+
+        def search():
+            for term in terms:
+                searcher.search(term)
+
+        searcher.clear()
+        self.measure(name, search, setup=searcher.clear if cold else None)
+        self.results[name]['terms'] = len(terms)
+
+    def bench_typing(self, name):
+        """كتابة كلمة حرفاً حرفاً كما في مربع البحث (تضييق نتيجة البادئة السابقة)"""
+        searcher = self.db.product_search
+        self.db.catalog.ensure_loaded()
+        terms = self.search_terms(5)
+
+        def typing():
+            for term in terms:
+                for i in range(1, len(term) + 1):
+                    searcher.search(term[:i])
+
+        self.measure(name, typing, setup=searcher.clear)
+
+    def bench_report(self, name, report, period):
+        """جمع بيانات تقرير لفترة عبر اتصال قراءة (بدون ذاكرة التقارير، كأول فتح له)"""
+        builder = REPORT_BUILDERS[report]
+        from_date, to_date = period_range(period)
+        with self.db.pool.checkout() as reader:
+            self.measure(name, lambda: builder(reader, from_date, to_date))
+
+    def bench_dashboard(self, name):
+        """حساب لقطة لوحة التحكم بعد إبطال المخزنة"""
+        dashboard = self.db.dashboard
+        self.measure(name, dashboard.get, setup=dashboard.invalidate)
+
+    def bench_inventory(self, name):
+        """تحميل كتالوج المنتجات وأول صفحة من جدول المخزون مرتبة بالاسم"""
+        # استيراد متأخر: الوحدة تستورد tkinter (يعمل بدون شاشة)
+        from ui.virtual_table import CatalogPageSource
+        catalog = self.db.catalog
+
+        def load():
+            catalog.reload()
+            source = CatalogPageSource(catalog, columns=INVENTORY_COLUMNS)
+            source.fetch('name', limit=100)
+
+        self.measure(name, load)
+        self.results[name]['products'] = len(catalog)
+
+    def bench_export(self, name, dataset, period):
+        """تصدير بيانات فترة إلى CSV"""
+        from_date, to_date = period_range(period)
+        file_path = os.path.join(self.output_dir, f"benchmark_{dataset}.csv")
+        rows = []
+        with self.db.pool.checkout() as reader:
+            self.measure(name, lambda: rows.append(export_dataset(reader, dataset, from_date, to_date, file_path)),
+                         repeat=max(1, self.repeat // 2), warmup=min(self.warmup, 1))
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        self.results[name]['rows'] = rows[-1] if rows else 0
+
+
+def compare(current, baseline, threshold=0.2):
+    """مقارنة الوسيط بالنتائج السابقة: [(الاسم، السابق، الحالي، النسبة، تراجع؟)]"""
+    rows = []
+    for name, result in current['benchmarks'].items():
+        old = baseline.get('benchmarks', {}).get(name)
+        if not old or not old.get('median_ms'):
+            continue
+        ratio = result['median_ms'] / old['median_ms']
+        rows.append((name, old['median_ms'], result['median_ms'], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="قياس أداء العمليات الأساسية بدون واجهة")
+    parser.add_argument('--db', help="قاعدة مولدة مسبقاً (python -m benchmarks.generate)، تُنسخ قبل القياس")
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small',
+                        help="حجم القاعدة المولدة عند عدم تحديد --db")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=10, help="عدد التكرارات المحسوبة لكل قياس")
+    parser.add_argument('--warmup', type=int, default=2, help="عدد تشغيلات الإحماء غير المحسوبة")
+    parser.add_argument('--basket', type=int, default=10, help="عدد أسطر فاتورة قياس البيع")
+    parser.add_argument('--only', action='append', help="تشغيل القياسات المطابقة فقط (مثل 'report.*')")
+    parser.add_argument('--profile', help="ملف أداء قاعدة البيانات (الافتراضي كالبرنامج)")
+    parser.add_argument('--output', help="ملف JSON للنتائج")
+    parser.add_argument('--compare', help="ملف نتائج سابق للمقارنة")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="نسبة زيادة الوسيط التي تُعد تراجعاً (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    # sqlite3.connect ينشئ قاعدة فارغة لمسار غير موجود فتُقاس عمليات على لا شيء
+    if args.db and not os.path.isfile(args.db):
+        parser.error(f"ملف القاعدة غير موجود: {args.db}")
+
+    workdir = tempfile.mkdtemp(prefix='supermarket_bench_')
+    try:
+        db_path = os.path.join(workdir, 'benchmark.db')
+        dataset = {'seed': args.seed}
+        if args.db:
+            # القاعدة المصدر قد تكون مفتوحة في وضع WAL: النسخ عبر backup يشمل ما لم يُدمج بعد
+            source = sqlite3.connect(args.db)
+            target = sqlite3.connect(db_path)
+            source.backup(target)
+            target.close()
+            source.close()
+            dataset['source'] = os.path.abspath(args.db)
+        else:
+            print(f"توليد قاعدة {args.preset}...")
+            start = time.perf_counter()
+            generate(db_path, args.preset, args.seed)
+            dataset.update(preset=args.preset, params=PRESETS[args.preset],
+                           generated_s=round(time.perf_counter() - start, 3))
+
+        db = DatabaseManager(db_path, profile=args.profile)
+        try:
+            dataset['rows'] = {table: db.fetch_one(f"SELECT COUNT(*) FROM {table}")[0] for table in _COUNTED_TABLES}
+            dataset['size_bytes'] = os.path.getsize(db_path)
+
+            def progress(name, result):
+                print(f"{name:<36} median {result['median_ms']:>10.3f} ms   p95 {result['p95_ms']:>10.3f} ms")
+
+            suite = BenchmarkSuite(db, args.repeat, args.warmup, args.basket, args.seed, workdir)
+            results = {
+                'format': 1,
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'environment': environment(db),
+                'dataset': dataset,
+                'settings': {'repeat': args.repeat, 'warmup': args.warmup, 'basket': args.basket},
+                'benchmarks': suite.run(args.only, progress),
+            }
+        finally:
+            db.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"تم حفظ النتائج في {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        print(f"\nالمقارنة مع {args.compare} (commit {baseline.get('environment', {}).get('commit')}):")
+        for name, old, new, ratio, regressed in rows:
+            print(f"{'!!' if regressed else '  '} {name:<36} {old:>10.3f} -> {new:>10.3f} ms  x{ratio:.2f}")
+        regressions = [row for row in rows if row[4]]
+        if regressions:
+            print(f"\n{len(regressions)} قياس أبطأ بأكثر من {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -17,7 +17,13 @@ echo هذه العملية قد تستغرق عدة دقائق...
 echo.
 
 REM بناء الملف
-pyinstaller --onefile --windowed --icon=NONE --name="SuperMarket" main.py
+REM الشاشات والمكتبات الثقيلة تُستورد بالاسم عند أول حاجة فيجب إعلامها لـ PyInstaller
+pyinstaller --onefile --windowed --icon=NONE --name="SuperMarket" ^
+    --collect-submodules ui --collect-submodules database ^
+    --hidden-import ttkbootstrap --hidden-import pytz ^
+    --hidden-import arabic_reshaper --hidden-import bidi.algorithm ^
+    --hidden-import matplotlib.figure --hidden-import matplotlib.backends.backend_tkagg ^
+    main.py
 
 echo.
 if exist "dist\SuperMarket.exe" (
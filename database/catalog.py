@@ -0,0 +1,275 @@
+# كتالوج المنتجات في الذاكرة: سجلات مدمجة مع فهارس بالمعرف والاسم والفئة
+# يُحدَّث تدريجياً من إشعارات الصفوف المتغيرة فلا تحتاج شاشة البيع إلى القرص عند البحث والإضافة
+import threading
+
+
+NO_CATEGORY = 'بدون فئة'
+
+_PRODUCT_QUERY = """
+    SELECT id, name, category_id,
+           COALESCE(purchase_price_syp, 0), COALESCE(purchase_price_usd, 0),
+           COALESCE(selling_price_syp, 0), COALESCE(selling_price_usd, 0),
+           COALESCE(quantity, 0), COALESCE(min_quantity, 0), COALESCE(unit, ''),
+           COALESCE(barcode, '')
+    FROM products
+"""
+
+_CATEGORY_QUERY = "SELECT id, name FROM categories"
+
+# حد عدد المعاملات في استعلام IN واحد
+_CHUNK = 500
+
+
+def _read_catalog(reader):
+    """قراءة الفئات والمنتجات من لقطة واحدة (تُستدعى في خيط عامل)"""
+    with reader.snapshot():
+        return reader.fetch_all(_CATEGORY_QUERY), reader.fetch_all(_PRODUCT_QUERY)
+
+
+class ProductRecord:
+    """سجل منتج مدمج في الذاكرة"""
+    __slots__ = ('id', 'name', 'category_id', 'category',
+                 'purchase_price_syp', 'purchase_price_usd',
+                 'selling_price_syp', 'selling_price_usd',
+                 'quantity', 'min_quantity', 'unit', 'barcode')
+
+    def __init__(self, row, category):
+        (self.id, self.name, self.category_id,
+         self.purchase_price_syp, self.purchase_price_usd,
+         self.selling_price_syp, self.selling_price_usd,
+         self.quantity, self.min_quantity, self.unit, self.barcode) = row
+        self.category = category
+
+    @property
+    def is_out(self):
+        return self.quantity == 0
+
+    @property
+    def is_low(self):
+        return self.quantity != 0 and self.quantity <= self.min_quantity
+
+
+class ProductCatalog:
+    def __init__(self, db):
+        self.db = db
+        self._by_id = {}
+        self._by_name = {}
+        self._by_category = {}
+        self._by_barcode = {}
+        self._categories = {}
+        # الخادم يقرأ من خيوط عدة أثناء تحديث الفهارس في خيط الكاتب، فالقراءة والتعديل تحت القفل
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._listeners = []
+        # التحميل في الخيط العامل: الدوال المنتظرة والصفوف التي تغيرت أثناءه
+        self._loading = False
+        self._waiters = []
+        self._deferred = {}
+        # يزداد مع كل تغيير ليتمكن المستخدمون من إبطال ما بنوه فوق الكتالوج
+        self.version = 0
+        # يزداد فقط عند تغير النص القابل للبحث (إضافة/حذف منتج أو تغير اسمه أو فئته)
+        self.text_version = 0
+        db.subscribe_rows(self._on_rows_changed)
+
+    # ------------------ القراءة ------------------
+    def ensure_loaded(self):
+        """تحميل الكتالوج كاملاً عند أول استخدام"""
+        if not self._loaded:
+            self.reload()
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def reload(self):
+        """إعادة تحميل الكتالوج كاملاً من قاعدة البيانات (مع إشعار المشتركين إن كان محملاً)"""
+        categories, products = self.db.fetch_all(_CATEGORY_QUERY), self.db.fetch_all(_PRODUCT_QUERY)
+        with self._lock:
+            loaded, old_ids = self._loaded, set(self._by_id)
+            self._install(categories, products)
+            new_ids = set(self._by_id)
+        if loaded:
+            self._publish(new_ids, old_ids - new_ids)
+
+    def load_async(self, executor, callback=None):
+        """تحميل الكتالوج في خيط عامل ثم استدعاء callback() في خيط الواجهة (فوراً إن كان محملاً)"""
+        if self._loaded:
+            if callback:
+                callback()
+            return
+        if callback:
+            self._waiters.append(callback)
+        if self._loading:
+            return
+        self._loading = True
+        self._deferred = {}
+        executor.submit(_read_catalog, on_done=self._on_loaded, on_error=self._on_load_failed)
+
+    def _on_loaded(self, result):
+        self._loading = False
+        # قد يكون حُمِّل مباشرة أثناء الانتظار (ensure_loaded) فتكون نتيجته أحدث
+        if not self._loaded:
+            self._install(*result)
+            # الصفوف التي ثُبِّت تغييرها بعد اللقطة
+            deferred, self._deferred = self._deferred, {}
+            if deferred:
+                self._on_rows_changed(deferred)
+        self._release_waiters()
+
+    def _on_load_failed(self, error):
+        print(f"خطأ في تحميل الكتالوج: {error}")
+        self._loading = False
+        self._deferred = {}
+        self.ensure_loaded()
+        self._release_waiters()
+
+    def _release_waiters(self):
+        waiters, self._waiters = self._waiters, []
+        for callback in waiters:
+            try:
+                callback()
+            except Exception as e:
+                print(f"خطأ بعد تحميل الكتالوج: {e}")
+
+    def _install(self, categories, products):
+        with self._lock:
+            self._categories = dict(categories)
+            self._by_id = {}
+            self._by_name = {}
+            self._by_category = {}
+            self._by_barcode = {}
+            for row in products:
+                self._put(row)
+            self._loaded = True
+            self.version += 1
+            self.text_version += 1
+
+    def get(self, product_id):
+        """سجل المنتج بالمعرف أو None"""
+        self.ensure_loaded()
+        with self._lock:
+            return self._by_id.get(product_id)
+
+    def find_by_name(self, name):
+        """المنتجات المطابقة للاسم تماماً (دون حساسية لحالة الأحرف)"""
+        self.ensure_loaded()
+        with self._lock:
+            return [self._by_id[i] for i in self._by_name.get(name.strip().casefold(), ())]
+
+    def find_by_barcode(self, barcode):
+        """المنتج صاحب الباركود أو None (بحث مباشر في جدول تجزئة)"""
+        self.ensure_loaded()
+        with self._lock:
+            product_id = self._by_barcode.get(barcode.strip())
+            return self._by_id.get(product_id) if product_id is not None else None
+
+    def in_category(self, category_id):
+        """منتجات فئة معينة"""
+        self.ensure_loaded()
+        with self._lock:
+            return [self._by_id[i] for i in self._by_category.get(category_id, ())]
+
+    def records(self):
+        """جميع سجلات المنتجات"""
+        self.ensure_loaded()
+        with self._lock:
+            return list(self._by_id.values())
+
+    def category_name(self, category_id):
+        self.ensure_loaded()
+        with self._lock:
+            return self._categories.get(category_id, NO_CATEGORY)
+
+    def __len__(self):
+        self.ensure_loaded()
+        with self._lock:
+            return len(self._by_id)
+
+    # ------------------ إشعارات التغيير ------------------
+    def subscribe(self, callback):
+        """تسجيل دالة تُستدعى عند تغير الكتالوج بالشكل callback(changed_ids, removed_ids)"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _publish(self, changed, removed):
+        self.version += 1
+        for callback in list(self._listeners):
+            try:
+                callback(frozenset(changed), frozenset(removed))
+            except Exception as e:
+                print(f"خطأ في معالج تغيير الكتالوج: {e}")
+
+    def _on_rows_changed(self, rows):
+        """تحديث السجلات المتأثرة فقط بعد تثبيت التغييرات"""
+        if not self._loaded:
+            if self._loading:
+                for table, ids in rows.items():
+                    self._deferred.setdefault(table, set()).update(ids)
+            return
+        changed = set()
+        removed = set()
+
+        category_ids = rows.get('categories')
+        if category_ids:
+            categories = dict(self.db.fetch_all(_CATEGORY_QUERY))
+            with self._lock:
+                self._categories = categories
+                self.text_version += 1
+                for category_id in category_ids:
+                    for product_id in self._by_category.get(category_id, ()):
+                        self._by_id[product_id].category = categories.get(category_id, NO_CATEGORY)
+                        changed.add(product_id)
+
+        product_ids = rows.get('products')
+        if product_ids:
+            ids = list(product_ids)
+            found = set()
+            for i in range(0, len(ids), _CHUNK):
+                chunk = ids[i:i + _CHUNK]
+                placeholders = ', '.join('?' * len(chunk))
+                for row in self.db.fetch_all(f"{_PRODUCT_QUERY} WHERE id IN ({placeholders})", tuple(chunk)):
+                    with self._lock:
+                        self._put(row)
+                    found.add(row[0])
+            with self._lock:
+                for product_id in product_ids - found:
+                    if self._remove(product_id):
+                        removed.add(product_id)
+                        self.text_version += 1
+            changed |= found
+
+        if changed or removed:
+            self._publish(changed, removed)
+
+    # ------------------ الفهارس (تُستدعى تحت القفل) ------------------
+    def _put(self, row):
+        product_id = row[0]
+        record = ProductRecord(row, self._categories.get(row[2], NO_CATEGORY))
+        old = self._by_id.get(product_id)
+        if old is None or old.name != record.name or old.category != record.category:
+            self.text_version += 1
+        self._remove(product_id)
+        self._by_id[product_id] = record
+        self._by_name.setdefault(record.name.casefold(), set()).add(product_id)
+        self._by_category.setdefault(record.category_id, set()).add(product_id)
+        if record.barcode:
+            self._by_barcode[record.barcode] = product_id
+
+    def _remove(self, product_id):
+        record = self._by_id.pop(product_id, None)
+        if record is None:
+            return False
+        for index, value in ((self._by_name, record.name.casefold()),
+                             (self._by_category, record.category_id)):
+            ids = index.get(value)
+            if ids:
+                ids.discard(product_id)
+                if not ids:
+                    del index[value]
+        if self._by_barcode.get(record.barcode) == product_id:
+            del self._by_barcode[record.barcode]
+        return True
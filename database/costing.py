@@ -0,0 +1,218 @@
+# طبقات التكلفة التاريخية للمخزون (FIFO أو المتوسط المتحرك)
+# - كل كمية واردة (شراء أو إضافة يدوية) تُسجَّل طبقة في cost_layers بتكلفة وحدتها وقت الاستلام
+# - البيع يستهلك الطبقات، ومتوسط تكلفة الوحدة المستهلكة يُحفظ في sale_items عند إتمام البيع
+#   فتبقى تكلفة البضاعة المباعة صحيحة مهما تغير سعر الشراء لاحقاً
+# - في طريقة المتوسط تُدمج الطبقات المفتوحة للمنتج في طبقة واحدة بتكلفة المتوسط المرجح
+# - الرصيد الافتتاحي (كمية المنتج عند إنشائه أو تعديلها يدوياً) يدخل طبقةً كأي كمية واردة،
+#   والرصيد السابق لأول حركة مسجلة تبنيه rebuild() طبقةً أولى فيُستهلك قبل المشتريات اللاحقة
+# - ما لا تغطيه الطبقات رغم ذلك يُكلَّف بسعر الشراء الحالي للمنتج
+import os
+
+
+COSTING_METHODS = ('fifo', 'average')
+DEFAULT_COSTING = 'fifo'
+
+_OPEN_LAYERS = """
+    SELECT id, remaining, unit_cost_syp, unit_cost_usd FROM cost_layers
+    WHERE product_id = ? AND remaining > 0 ORDER BY id
+"""
+
+
+def take(layers, quantity):
+    """استهلاك كمية من الطبقات بالترتيب (تُعدَّل في مكانها) وإرجاع (التكلفة ل.س، التكلفة $، الكمية المغطاة)
+
+    الطبقة قائمة [المعرف، المتبقي، تكلفة الوحدة ل.س، تكلفة الوحدة $].
+    """
+    cost_syp = cost_usd = covered = 0
+    for layer in layers:
+        if covered >= quantity:
+            break
+        if layer[1] <= 0:
+            continue
+        used = min(layer[1], quantity - covered)
+        layer[1] -= used
+        cost_syp += used * layer[2]
+        cost_usd += used * layer[3]
+        covered += used
+    return cost_syp, cost_usd, covered
+
+
+def average(layers, quantity, unit_cost_syp, unit_cost_usd):
+    """تكلفة الوحدة بالمتوسط المرجح للطبقات المفتوحة مع الكمية الواردة"""
+    total = quantity
+    total_syp = quantity * unit_cost_syp
+    total_usd = quantity * unit_cost_usd
+    for layer in layers:
+        if layer[1] > 0:
+            total += layer[1]
+            total_syp += layer[1] * layer[2]
+            total_usd += layer[1] * layer[3]
+    if total <= 0:
+        return unit_cost_syp, unit_cost_usd
+    return total_syp / total, total_usd / total
+
+
+class CostLedger:
+    """سجل طبقات التكلفة: الاستلام والاستهلاك وإعادة البناء من السجل التاريخي
+
+    دوال الكتابة تُستدعى داخل معاملة مفتوحة في DatabaseManager.
+    """
+
+    def __init__(self, db, method=None):
+        self.db = db
+        # الطريقة: الوسيط ثم متغير البيئة ثم الافتراضي
+        self.method = method or os.environ.get('SUPERMARKET_COSTING') or DEFAULT_COSTING
+        if self.method not in COSTING_METHODS:
+            print(f"طريقة تكلفة غير معروفة: {self.method}، سيتم استخدام {DEFAULT_COSTING}")
+            self.method = DEFAULT_COSTING
+
+    # ------------------ الاستلام ------------------
+    def receive(self, product_id, quantity, unit_cost_syp, unit_cost_usd, received_date, purchase_item_id=None):
+        """تسجيل كمية واردة بتكلفة وحدتها"""
+        if quantity <= 0:
+            return
+        if self.method == 'average':
+            layers = [list(row) for row in self.db.fetch_all(_OPEN_LAYERS, (product_id,))]
+            remaining = quantity + sum(layer[1] for layer in layers)
+            unit_cost_syp, unit_cost_usd = average(layers, quantity, unit_cost_syp, unit_cost_usd)
+            if layers:
+                self.db.execute_query(
+                    "UPDATE cost_layers SET remaining = 0 WHERE product_id = ? AND remaining > 0",
+                    (product_id,)
+                )
+        else:
+            remaining = quantity
+        self.db.execute_insert(
+            """INSERT INTO cost_layers
+               (product_id, purchase_item_id, received_date, quantity, remaining, unit_cost_syp, unit_cost_usd)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (product_id, purchase_item_id, received_date, quantity, remaining, unit_cost_syp, unit_cost_usd)
+        )
+
+    def receive_purchase(self, purchase_id, received_date):
+        """تسجيل طبقات عناصر فاتورة مشتريات"""
+        items = self.db.fetch_all(
+            """SELECT id, product_id, quantity, COALESCE(unit_price_syp, 0), COALESCE(unit_price_usd, 0)
+               FROM purchase_items WHERE purchase_id = ? ORDER BY id""",
+            (purchase_id,)
+        )
+        for item_id, product_id, quantity, cost_syp, cost_usd in items:
+            self.receive(product_id, quantity, cost_syp, cost_usd, received_date, item_id)
+
+    # ------------------ الاستهلاك ------------------
+    def consume(self, product_id, quantity):
+        """استهلاك كمية من طبقات المنتج وإرجاع متوسط تكلفة الوحدة (ل.س، $)"""
+        if quantity <= 0:
+            return self.fallback_cost(product_id)
+        layers = [list(row) for row in self.db.fetch_all(_OPEN_LAYERS, (product_id,))]
+        remaining_before = {layer[0]: layer[1] for layer in layers}
+        cost_syp, cost_usd, covered = take(layers, quantity)
+        changed = [(layer[1], layer[0]) for layer in layers if layer[1] != remaining_before[layer[0]]]
+        if changed:
+            self.db.execute_many("UPDATE cost_layers SET remaining = ? WHERE id = ?", changed)
+        if covered < quantity:
+            fallback_syp, fallback_usd = self.fallback_cost(product_id)
+            cost_syp += (quantity - covered) * fallback_syp
+            cost_usd += (quantity - covered) * fallback_usd
+        return cost_syp / quantity, cost_usd / quantity
+
+    def fallback_cost(self, product_id):
+        """سعر الشراء الحالي للمنتج (لما لا تغطيه الطبقات)"""
+        row = self.db.fetch_one(
+            "SELECT COALESCE(purchase_price_syp, 0), COALESCE(purchase_price_usd, 0) FROM products WHERE id = ?",
+            (product_id,)
+        )
+        return tuple(row) if row else (0, 0)
+
+    # ------------------ إعادة البناء ------------------
+    def rebuild(self):
+        """إعادة بناء الطبقات من سجل المشتريات والمبيعات والحركات اليدوية بالترتيب الزمني،
+        وتسجيل تكلفة كل عنصر بيع تاريخي ثم إعادة بناء الملخصات اليومية
+
+        يُرجع عدد عناصر البيع التي سُجلت تكلفتها أو None عند الفشل.
+        """
+        try:
+            # القراءة والكتابة في معاملة واحدة حتى لا تفوتها عملية بيع أثناء إعادة البناء
+            with self.db.transaction():
+                # التواريخ محفوظة بصيغتين (بفاصل T أو مسافة) فتُوحَّد للترتيب
+                # عند تساوي الوقت تسبق الواردات (0) الصادرات (1)
+                events = self.db.fetch_all("""
+                    SELECT replace(p.purchase_date, 'T', ' ') AS at, 0 AS kind, pi.id, pi.product_id, pi.quantity,
+                           COALESCE(pi.unit_price_syp, 0), COALESCE(pi.unit_price_usd, 0), 'purchase'
+                    FROM purchase_items pi JOIN purchases p ON pi.purchase_id = p.id
+                    UNION ALL
+                    SELECT replace(s.sale_date, 'T', ' '), 1, si.id, si.product_id, si.quantity, 0, 0, 'sale'
+                    FROM sale_items si JOIN sales s ON si.sale_id = s.id
+                    UNION ALL
+                    SELECT replace(m.movement_date, 'T', ' '), CASE m.movement_type WHEN 'in' THEN 0 ELSE 1 END,
+                           m.id, m.product_id, m.quantity,
+                           COALESCE(pr.purchase_price_syp, 0), COALESCE(pr.purchase_price_usd, 0), 'adjustment'
+                    FROM inventory_movements m LEFT JOIN products pr ON m.product_id = pr.id
+                    WHERE COALESCE(m.reason, '') NOT IN ('بيع', 'شراء')
+                    ORDER BY 1, 2, 3
+                """)
+                products = self.db.fetch_all("""
+                    SELECT id, COALESCE(purchase_price_syp, 0), COALESCE(purchase_price_usd, 0),
+                           COALESCE(quantity, 0), created_at
+                    FROM products
+                """)
+                fallback = {row[0]: (row[1], row[2]) for row in products}
+
+                # الرصيد السابق لأول حركة مسجلة = الكمية الحالية - صافي الحركات
+                net = {}
+                for at, kind, row_id, product_id, quantity, cost_syp, cost_usd, source in events:
+                    if quantity > 0:
+                        net[product_id] = net.get(product_id, 0) + (quantity if kind == 0 else -quantity)
+
+                # الطبقات في الذاكرة لكل منتج: [المعرف، المتبقي، تكلفة ل.س، تكلفة $، الكمية، عنصر الشراء، التاريخ]
+                # تبدأ بطبقة الرصيد الافتتاحي بسعر الشراء الحالي (لا يُعرف غيره) فتُستهلك قبل كل الواردات
+                layers = {}
+                for product_id, cost_syp, cost_usd, quantity, created_at in products:
+                    opening = quantity - net.get(product_id, 0)
+                    if opening > 0:
+                        layers[product_id] = [[None, opening, cost_syp, cost_usd, opening, None, created_at]]
+                sale_costs = []
+                for at, kind, row_id, product_id, quantity, cost_syp, cost_usd, source in events:
+                    product_layers = layers.setdefault(product_id, [])
+                    if kind == 0:
+                        if quantity <= 0:
+                            continue
+                        remaining = quantity
+                        if self.method == 'average':
+                            cost_syp, cost_usd = average(product_layers, quantity, cost_syp, cost_usd)
+                            remaining += sum(layer[1] for layer in product_layers if layer[1] > 0)
+                            for layer in product_layers:
+                                layer[1] = 0
+                        item_id = row_id if source == 'purchase' else None
+                        product_layers.append([None, remaining, cost_syp, cost_usd, quantity, item_id, at])
+                        continue
+
+                    total_syp, total_usd, covered = take(product_layers, quantity)
+                    if source != 'sale' or quantity <= 0:
+                        continue
+                    if covered < quantity:
+                        price_syp, price_usd = fallback.get(product_id, (0, 0))
+                        total_syp += (quantity - covered) * price_syp
+                        total_usd += (quantity - covered) * price_usd
+                    sale_costs.append((total_syp / quantity, total_usd / quantity, row_id))
+
+                rows = [(product_id, layer[5], layer[6], layer[4], layer[1], layer[2], layer[3])
+                        for product_id, product_layers in layers.items() for layer in product_layers]
+                self.db.execute_query("DELETE FROM cost_layers")
+                self.db.execute_many(
+                    """INSERT INTO cost_layers
+                       (product_id, purchase_item_id, received_date, quantity, remaining, unit_cost_syp, unit_cost_usd)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    rows
+                )
+                self.db.execute_many(
+                    "UPDATE sale_items SET unit_cost_syp = ?, unit_cost_usd = ? WHERE id = ?",
+                    sale_costs
+                )
+                # تكلفة البضاعة في الملخصات مبنية على تكلفة عناصر البيع
+                if not self.db.rebuild_daily_rollups():
+                    raise RuntimeError("تعذر إعادة بناء الملخصات اليومية")
+                return len(sale_costs)
+        except Exception as e:
+            print(f"خطأ في إعادة بناء طبقات التكلفة: {e}")
+            return None
@@ -0,0 +1,65 @@
+# مزوّد لقطة لوحة التحكم: كل البطاقات وسلسلة آخر 7 أيام في استعلام واحد مع تخزين مؤقت
+import time
+from datetime import datetime, timedelta
+
+
+# الجداول التي يؤدي تغيرها إلى إبطال اللقطة
+_DEPENDENT_TABLES = {'sales', 'products', 'suppliers', 'daily_rollups'}
+
+
+class DashboardSnapshotProvider:
+    def __init__(self, db, ttl=30, days=7):
+        self.db = db
+        self.ttl = ttl
+        self.days = days
+        self._snapshot = None
+        self._taken_at = 0
+        db.subscribe(self._on_change)
+
+    def _on_change(self, tables):
+        """إبطال اللقطة عند تغير أحد الجداول التي تعتمد عليها"""
+        if tables & _DEPENDENT_TABLES:
+            self.invalidate()
+
+    def invalidate(self):
+        """إبطال اللقطة المخزنة"""
+        self._snapshot = None
+
+    def get(self):
+        """إرجاع اللقطة الحالية (من الذاكرة إن كانت صالحة)"""
+        today = datetime.now().strftime('%Y-%m-%d')
+        snapshot = self._snapshot
+        if snapshot and snapshot['today'] == today and time.monotonic() - self._taken_at < self.ttl:
+            return snapshot
+        self._snapshot = self._load(today)
+        self._taken_at = time.monotonic()
+        return self._snapshot
+
+    def _load(self, today):
+        """حساب البطاقات وسلسلة الأيام بجولة واحدة إلى قاعدة البيانات"""
+        first_day = (datetime.strptime(today, '%Y-%m-%d') - timedelta(days=self.days - 1)).strftime('%Y-%m-%d')
+        rows = self.db.fetch_all("""
+            WITH RECURSIVE days(day) AS (
+                SELECT ?
+                UNION ALL
+                SELECT date(day, '+1 day') FROM days WHERE day < ?
+            )
+            SELECT d.day, COALESCE(r.revenue_syp, 0),
+                   (SELECT COUNT(*) FROM products),
+                   (SELECT COUNT(*) FROM products WHERE quantity <= min_quantity),
+                   (SELECT COUNT(*) FROM suppliers)
+            FROM days d
+            LEFT JOIN daily_rollups r ON r.day = d.day
+            ORDER BY d.day
+        """, (first_day, today))
+
+        week = [(row[0], row[1]) for row in rows]
+        last = rows[-1] if rows else (today, 0, 0, 0, 0)
+        return {
+            'today': today,
+            'sales_today': last[1] or 0,
+            'products_count': last[2] or 0,
+            'low_stock': last[3] or 0,
+            'suppliers_count': last[4] or 0,
+            'week': week,
+        }
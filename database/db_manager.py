@@ -1,32 +1,525 @@
-import sqlite3
 import os
-from datetime import datetime
+import re
+import threading
+import time
+from functools import lru_cache
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from database.search import normalize_arabic, build_match_query, ProductSearcher
+from database.pool import ConnectionPool
+from database.costing import CostLedger
+from database.workers import QueryExecutor
+
+# ملفات إعدادات أداء SQLite
+# safe: الإعداد الافتراضي، WAL مع ذاكرة مؤقتة معتدلة ومن دون mmap
+# max: أعلى إنتاجية للأجهزة ذات الذاكرة الكافية (ذاكرة مؤقتة أكبر، mmap، نقاط تثبيت أقل تكراراً)
+PERFORMANCE_PROFILES = {
+    'safe': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -8000,          # بالكيلوبايت (~8MB)
+        'mmap_size': 0,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 1000,   # بالصفحات
+        'checkpoint_every': 500,      # عدد عمليات التثبيت بين كل نقطتي تثبيت يدويتين
+    },
+    'max': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,         # ~64MB
+        'mmap_size': 268435456,       # 256MB
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 4000,
+        'checkpoint_every': 2000,
+    },
+}
+
+DEFAULT_PROFILE = 'safe'
+
+# إعدادات PRAGMA التي تُطبَّق على كل اتصال بالترتيب
+_PRAGMA_KEYS = ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store', 'wal_autocheckpoint')
+# الإعدادات الخاصة بالاتصال التي تهم اتصالات القراءة في الخيوط العاملة
+_READER_PRAGMA_KEYS = ('cache_size', 'mmap_size', 'temp_store')
+
+
+# الفهارس الثانوية: أعمدة التاريخ (لتقارير الفترات) والمفاتيح الخارجية وعمود المنتج
+_INDEXES = (
+    ('idx_products_category', 'products', 'category_id'),
+    ('idx_products_name', 'products', 'name'),
+    ('idx_sales_date', 'sales', 'sale_date'),
+    ('idx_sale_items_sale', 'sale_items', 'sale_id'),
+    ('idx_sale_items_product', 'sale_items', 'product_id'),
+    ('idx_purchases_date', 'purchases', 'purchase_date'),
+    ('idx_purchases_supplier', 'purchases', 'supplier_id'),
+    ('idx_purchase_items_purchase', 'purchase_items', 'purchase_id'),
+    ('idx_purchase_items_product', 'purchase_items', 'product_id'),
+    ('idx_expenses_date', 'expenses', 'expense_date'),
+    ('idx_inventory_movements_product', 'inventory_movements', 'product_id, movement_date'),
+)
+
+# أعمدة أُضيفت بعد الإصدار الأول: تُضاف إلى قواعد البيانات القديمة عند الفتح
+_COLUMN_MIGRATIONS = (
+    ('products', 'barcode', 'TEXT'),
+    ('sale_items', 'unit_cost_syp', 'REAL'),
+    ('sale_items', 'unit_cost_usd', 'REAL'),
+    ('sales', 'client_key', 'TEXT'),
+)
+
+# الباركود فريد عند وجوده (المنتجات بلا باركود مستثناة من القيد)
+_UNIQUE_INDEXES = (
+    ('idx_products_barcode', 'products', 'barcode', "barcode IS NOT NULL AND barcode != ''"),
+    # مفتاح منع التكرار الذي تولده نقطة البيع للفاتورة المرسلة إلى الخادم
+    ('idx_sales_client_key', 'sales', 'client_key', "client_key IS NOT NULL"),
+)
+
+# فهارس جزئية غير فريدة: الطبقات المفتوحة فقط (المستهلكة بالكامل تبقى للسجل)
+_PARTIAL_INDEXES = (
+    ('idx_cost_layers_open', 'cost_layers', 'product_id, id', "remaining > 0"),
+)
+
+
+# مشغلات تحديث جدول الملخصات اليومية (daily_rollups) تدريجياً مع كل عملية كتابة
+# تكلفة الوحدة المسجلة عند البيع (طبقات التكلفة)، وسعر الشراء الحالي للعناصر القديمة قبل إعادة بناء التكاليف
+_SALE_COST_SYP = "COALESCE({row}.unit_cost_syp, (SELECT purchase_price_syp FROM products WHERE id = {row}.product_id), 0)"
+_SALE_COST_USD = "COALESCE({row}.unit_cost_usd, (SELECT purchase_price_usd FROM products WHERE id = {row}.product_id), 0)"
+
+_ROLLUP_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_sales_insert AFTER INSERT ON sales
+    BEGIN
+        INSERT OR IGNORE INTO daily_rollups (day) VALUES (substr(NEW.sale_date, 1, 10));
+        UPDATE daily_rollups SET
+            sales_count = sales_count + 1,
+            revenue_syp = revenue_syp + COALESCE(NEW.total_syp, 0),
+            revenue_usd = revenue_usd + COALESCE(NEW.total_usd, 0),
+            discount_syp = discount_syp + COALESCE(NEW.discount_syp, 0),
+            discount_usd = discount_usd + COALESCE(NEW.discount_usd, 0)
+        WHERE day = substr(NEW.sale_date, 1, 10);
+    END
+    """,
+    # قبل الحذف: ما زالت عناصر الفاتورة موجودة فنطرح تكلفتها مع قيم الفاتورة
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_sales_delete BEFORE DELETE ON sales
+    BEGIN
+        UPDATE daily_rollups SET
+            sales_count = sales_count - 1,
+            revenue_syp = revenue_syp - COALESCE(OLD.total_syp, 0),
+            revenue_usd = revenue_usd - COALESCE(OLD.total_usd, 0),
+            discount_syp = discount_syp - COALESCE(OLD.discount_syp, 0),
+            discount_usd = discount_usd - COALESCE(OLD.discount_usd, 0),
+            cogs_syp = cogs_syp - COALESCE((SELECT SUM(si.quantity * {cost_syp}) FROM sale_items si WHERE si.sale_id = OLD.id), 0),
+            cogs_usd = cogs_usd - COALESCE((SELECT SUM(si.quantity * {cost_usd}) FROM sale_items si WHERE si.sale_id = OLD.id), 0)
+        WHERE day = substr(OLD.sale_date, 1, 10);
+    END
+    """.format(cost_syp=_SALE_COST_SYP.format(row='si'), cost_usd=_SALE_COST_USD.format(row='si')),
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_sale_items_insert AFTER INSERT ON sale_items
+    BEGIN
+        UPDATE daily_rollups SET
+            cogs_syp = cogs_syp + NEW.quantity * {cost_syp},
+            cogs_usd = cogs_usd + NEW.quantity * {cost_usd}
+        WHERE day = (SELECT substr(sale_date, 1, 10) FROM sales WHERE id = NEW.sale_id);
+    END
+    """.format(cost_syp=_SALE_COST_SYP.format(row='NEW'), cost_usd=_SALE_COST_USD.format(row='NEW')),
+    # عند حذف الفاتورة نفسها يكون السطر الأب قد حُذف فلا يطابق أي يوم (تمت المعالجة في trg_rollup_sales_delete)
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_sale_items_delete AFTER DELETE ON sale_items
+    BEGIN
+        UPDATE daily_rollups SET
+            cogs_syp = cogs_syp - OLD.quantity * {cost_syp},
+            cogs_usd = cogs_usd - OLD.quantity * {cost_usd}
+        WHERE day = (SELECT substr(sale_date, 1, 10) FROM sales WHERE id = OLD.sale_id);
+    END
+    """.format(cost_syp=_SALE_COST_SYP.format(row='OLD'), cost_usd=_SALE_COST_USD.format(row='OLD')),
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_purchases_insert AFTER INSERT ON purchases
+    BEGIN
+        INSERT OR IGNORE INTO daily_rollups (day) VALUES (substr(NEW.purchase_date, 1, 10));
+        UPDATE daily_rollups SET
+            purchases_count = purchases_count + 1,
+            purchases_syp = purchases_syp + COALESCE(NEW.total_syp, 0),
+            purchases_usd = purchases_usd + COALESCE(NEW.total_usd, 0)
+        WHERE day = substr(NEW.purchase_date, 1, 10);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_purchases_delete AFTER DELETE ON purchases
+    BEGIN
+        UPDATE daily_rollups SET
+            purchases_count = purchases_count - 1,
+            purchases_syp = purchases_syp - COALESCE(OLD.total_syp, 0),
+            purchases_usd = purchases_usd - COALESCE(OLD.total_usd, 0)
+        WHERE day = substr(OLD.purchase_date, 1, 10);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_expenses_insert AFTER INSERT ON expenses
+    BEGIN
+        INSERT OR IGNORE INTO daily_rollups (day) VALUES (substr(NEW.expense_date, 1, 10));
+        UPDATE daily_rollups SET
+            expenses_count = expenses_count + 1,
+            expenses_syp = expenses_syp + COALESCE(NEW.amount_syp, 0),
+            expenses_usd = expenses_usd + COALESCE(NEW.amount_usd, 0)
+        WHERE day = substr(NEW.expense_date, 1, 10);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_rollup_expenses_delete AFTER DELETE ON expenses
+    BEGIN
+        UPDATE daily_rollups SET
+            expenses_count = expenses_count - 1,
+            expenses_syp = expenses_syp - COALESCE(OLD.amount_syp, 0),
+            expenses_usd = expenses_usd - COALESCE(OLD.amount_usd, 0)
+        WHERE day = substr(OLD.expense_date, 1, 10);
+    END
+    """,
+)
+
+# أعمدة الملخص اليومي بالترتيب
+ROLLUP_COLUMNS = (
+    'sales_count', 'revenue_syp', 'revenue_usd', 'discount_syp', 'discount_usd',
+    'cogs_syp', 'cogs_usd', 'expenses_count', 'expenses_syp', 'expenses_usd',
+    'purchases_count', 'purchases_syp', 'purchases_usd',
+)
+
+
+# استخراج اسم الجدول المتأثر من استعلامات الكتابة
+_WRITE_TABLE_RE = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+[\"`\[]?(\w+)",
+    re.IGNORECASE
+)
+
+
+# بصمة الاستعلام: القيم الحرفية تُستبدل بـ ? وقوائم IN تُختصر فتتجمع الاستعلامات المتشابهة
+_SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SQL_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+@lru_cache(maxsize=2048)
+def sql_fingerprint(query):
+    """توحيد نص الاستعلام لتجميع الاستدعاءات المتشابهة (مسافات، قيم حرفية، قوائم IN)"""
+    fingerprint = _SQL_LITERAL_RE.sub('?', query)
+    fingerprint = _SQL_IN_LIST_RE.sub('(?, ...)', fingerprint)
+    return ' '.join(fingerprint.split())
+
+
+# فهرس البحث النصي للمنتجات (النص مخزّن بعد التوحيد بـ normalize_ar)
+_SEARCH_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, category, tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3'
+    )
+"""
+
+# مشغلات مؤقتة تُبقي الفهرس متزامناً (تعتمد على دالة normalize_ar المسجلة في الاتصال)
+_SEARCH_TRIGGERS = (
+    """
+    CREATE TEMP TRIGGER IF NOT EXISTS search_products_insert AFTER INSERT ON main.products
+    BEGIN
+        INSERT INTO products_fts (rowid, name, category)
+        VALUES (NEW.id, normalize_ar(NEW.name),
+                normalize_ar((SELECT name FROM categories WHERE id = NEW.category_id)));
+    END
+    """,
+    """
+    CREATE TEMP TRIGGER IF NOT EXISTS search_products_update AFTER UPDATE OF id, name, category_id ON main.products
+    BEGIN
+        DELETE FROM products_fts WHERE rowid = OLD.id;
+        INSERT INTO products_fts (rowid, name, category)
+        VALUES (NEW.id, normalize_ar(NEW.name),
+                normalize_ar((SELECT name FROM categories WHERE id = NEW.category_id)));
+    END
+    """,
+    """
+    CREATE TEMP TRIGGER IF NOT EXISTS search_products_delete AFTER DELETE ON main.products
+    BEGIN
+        DELETE FROM products_fts WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TEMP TRIGGER IF NOT EXISTS search_categories_update AFTER UPDATE OF name ON main.categories
+    BEGIN
+        UPDATE products_fts SET category = normalize_ar(NEW.name)
+        WHERE rowid IN (SELECT id FROM products WHERE category_id = NEW.id);
+    END
+    """,
+    """
+    CREATE TEMP TRIGGER IF NOT EXISTS search_categories_delete AFTER DELETE ON main.categories
+    BEGIN
+        UPDATE products_fts SET category = ''
+        WHERE rowid IN (SELECT id FROM products WHERE category_id = OLD.id);
+    END
+    """,
+)
+
+
+# الجداول التي تُتتبع صفوفها المتغيرة (لتحديث الكتالوج في الذاكرة تدريجياً)
+_ROW_TRACKED_TABLES = ('products', 'categories')
+
+_TRIGGER_NAME_RE = re.compile(r"CREATE\s+TRIGGER\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+
+
+def day_bounds(from_date, to_date=None):
+    """تحويل نطاق أيام (YYYY-MM-DD) إلى حدّين نصفيين [من، اليوم التالي لـ إلى) يمكن استخدامهما مع الفهارس"""
+    to_date = to_date or from_date
+    start = datetime.strptime(from_date.strip()[:10], '%Y-%m-%d')
+    end = datetime.strptime(to_date.strip()[:10], '%Y-%m-%d') + timedelta(days=1)
+    return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+
+def parse_timestamp(value, sep='T'):
+    """توحيد تاريخ عملية (نص ISO أو datetime) إلى isoformat بالتوقيت المحلي (sep: فاصل التاريخ والوقت)
+
+    يرفع ValueError إن لم يكن تاريخاً صالحاً حتى لا يُكتب يوم غير صالح في الملخصات اليومية.
+    """
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).strip())
+        except ValueError:
+            raise ValueError(f"تاريخ غير صالح: {value}")
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.isoformat(sep=sep)
+
+
+def rollup_totals(reader, from_date, to_date):
+    """مجاميع الملخصات اليومية لفترة (الأيام بالصيغة YYYY-MM-DD شاملة الطرفين) كقاموس
+
+    reader: أي كائن يوفر fetch_one/fetch_all (DatabaseManager أو اتصال قراءة في خيط عامل)
+    """
+    row = reader.fetch_one(
+        f"SELECT {', '.join(f'COALESCE(SUM({c}), 0)' for c in ROLLUP_COLUMNS)} "
+        "FROM daily_rollups WHERE day BETWEEN ? AND ?",
+        (from_date[:10], to_date[:10])
+    )
+    return dict(zip(ROLLUP_COLUMNS, row or (0,) * len(ROLLUP_COLUMNS)))
+
+
+def daily_series(reader, from_date, to_date, column='revenue_syp'):
+    """سلسلة يومية [(اليوم، القيمة)] لعمود من الملخصات خلال فترة (الأيام الخالية غير مدرجة)"""
+    if column not in ROLLUP_COLUMNS:
+        raise ValueError(f"عمود غير معروف: {column}")
+    return reader.fetch_all(
+        f"SELECT day, {column} FROM daily_rollups WHERE day BETWEEN ? AND ? AND {column} != 0 ORDER BY day",
+        (from_date[:10], to_date[:10])
+    )
+
 
 class DatabaseManager:
-    def __init__(self, db_name="supermarket.db"):
+    def __init__(self, db_name="supermarket.db", profile=None, pool_size=4, costing=None, slow_query_ms=None):
         self.db_path = os.path.join(os.path.dirname(__file__), db_name)
+        # مجمع الاتصالات: self.connection هو اتصال الكاتب، والقراءات تستعير اتصالات للقراءة فقط
+        self.pool = None
         self.connection = None
-        self.cursor = None
+        self.pool_size = pool_size
+        # عمق المعاملات المتداخلة (0 = لا توجد معاملة مفتوحة) والخيط صاحب المعاملة
+        self._tx_depth = 0
+        self._tx_thread = None
+        # ملف الأداء: الوسيط ثم متغير البيئة ثم الافتراضي
+        self.profile_name = profile or os.environ.get('SUPERMARKET_DB_PROFILE') or DEFAULT_PROFILE
+        if self.profile_name not in PERFORMANCE_PROFILES:
+            print(f"ملف أداء غير معروف: {self.profile_name}، سيتم استخدام {DEFAULT_PROFILE}")
+            self.profile_name = DEFAULT_PROFILE
+        self.profile = PERFORMANCE_PROFILES[self.profile_name]
+        self._commits_since_checkpoint = 0
+        # المشتركون في إشعارات التغيير والجداول المتغيرة بانتظار التثبيت
+        self._listeners = []
+        self._pending_changes = set()
+        # المشتركون في إشعارات الصفوف المتغيرة ومعرفات الصفوف بانتظار التثبيت
+        self._row_listeners = []
+        self._pending_rows = {}
+        # مراقبو الاستعلامات (قياس الأداء)
+        self._query_observers = []
+        # سجل الاستعلامات البطيئة (اختياري): الحد بالميلي ثانية من الوسيط أو متغير البيئة
+        self.slow_log = None
+        slow_query_ms = slow_query_ms if slow_query_ms is not None else os.environ.get('SUPERMARKET_SLOW_QUERY_MS')
+        if slow_query_ms not in (None, ''):
+            from database.querylog import SlowQueryLog
+            self.slow_log = SlowQueryLog(self, self.db_path + '.slow.log', float(slow_query_ms))
+        # طبقات التكلفة التاريخية (fifo أو average)
+        self.costing = CostLedger(self, costing)
         self.connect()
         self.create_tables()
+        
+        # لقطة لوحة التحكم المخزنة مؤقتاً
+        from database.dashboard import DashboardSnapshotProvider
+        self.dashboard = DashboardSnapshotProvider(self)
+        
+        # كتالوج المنتجات في الذاكرة (يُحمَّل عند أول استخدام)
+        from database.catalog import ProductCatalog
+        self.catalog = ProductCatalog(self)
+        self.product_search = ProductSearcher(self)
+        
+        # ذاكرة نتائج التقارير حسب النوع والفترة
+        from database.reports import ReportCache
+        self.report_cache = ReportCache(self)
+
+        # منفذ استعلامات القراءة في خيوط عاملة (تُربط بالواجهة عبر executor.attach(root))
+        self.executor = QueryExecutor(self.pool)
     
     def connect(self):
         """إنشاء اتصال بقاعدة البيانات"""
         try:
-            self.connection = sqlite3.connect(self.db_path)
-            self.cursor = self.connection.cursor()
+            # كاتب واحد (المعاملات تُدار يدوياً عبر transaction()) واتصالات قراءة تُنشأ عند الحاجة
+            self.pool = ConnectionPool(
+                self.db_path,
+                max_readers=self.pool_size,
+                configure_reader=lambda connection: self.apply_performance_profile(connection, _READER_PRAGMA_KEYS)
+            )
+            self.connection = self.pool.writer
             # تفعيل دعم المفاتيح الخارجية
-            self.cursor.execute("PRAGMA foreign_keys = ON")
+            self.connection.execute("PRAGMA foreign_keys = ON")
+            self.apply_performance_profile()
+            # دالة تستدعيها مشغلات التتبع المؤقتة لكل صف متغير
+            self.connection.create_function('track_row_change', 2, self._track_row_change)
+            # توحيد النص العربي لفهرس البحث
+            self.connection.create_function('normalize_ar', 1, normalize_arabic, deterministic=True)
+            # رقم إصدار الملف كما يراه الكاتب: يتغير فقط بتثبيت عملية أخرى (انظر sync_external_changes)
+            self._data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
             return True
         except Exception as e:
             print(f"خطأ في الاتصال بقاعدة البيانات: {e}")
             return False
     
+    def apply_performance_profile(self, connection=None, keys=_PRAGMA_KEYS):
+        """تطبيق إعدادات PRAGMA الخاصة بملف الأداء الحالي على الاتصال"""
+        connection = connection or self.connection
+        for key in keys:
+            try:
+                connection.execute(f"PRAGMA {key} = {self.profile[key]}")
+            except Exception as e:
+                print(f"تعذر تطبيق الإعداد {key}: {e}")
+
+    def get_active_settings(self):
+        """قراءة إعدادات PRAGMA الفعلية من الاتصال الحالي"""
+        settings = {'profile': self.profile_name}
+        for key in ('foreign_keys',) + _PRAGMA_KEYS:
+            row = self.connection.execute(f"PRAGMA {key}").fetchone()
+            settings[key] = row[0] if row else None
+        return settings
+
+    def checkpoint(self, mode='PASSIVE'):
+        """نقل محتوى ملف WAL إلى قاعدة البيانات (PASSIVE لا يحجب القرّاء أو الكاتب)"""
+        try:
+            self._commits_since_checkpoint = 0
+            with self.pool.writing():
+                return self.connection.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        except Exception as e:
+            print(f"خطأ في نقطة التثبيت: {e}")
+            return None
+
+    def subscribe(self, callback):
+        """تسجيل دالة تُستدعى بعد تثبيت أي تغيير بالشكل callback(tables)"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        """إلغاء تسجيل دالة إشعارات التغيير"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def sync_external_changes(self):
+        """إبطال الكتالوج والذاكرات المؤقتة إن ثبّتت عملية أخرى تغييرات على الملف منذ آخر استدعاء
+
+        لا تصل إشعارات التغيير بين العمليات (مثل الخادم وبرنامج المكتب على الملف نفسه)،
+        فيُستدعى قبل القراءة من الذاكرة ويُرجع True إن وُجدت تغييرات خارجية.
+        """
+        with self.pool.writing():
+            version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+            if version == self._data_version:
+                return False
+            self._data_version = version
+        self.catalog.reload()
+        self.report_cache.clear()
+        self.dashboard.invalidate()
+        return True
+
+    def notify_change(self, *tables):
+        """إشعار المشتركين بتغير جداول (يؤجَّل حتى تثبيت المعاملة المفتوحة)"""
+        self._pending_changes.update(tables)
+        if not self.in_transaction:
+            self._flush_changes()
+
+    def subscribe_rows(self, callback):
+        """تسجيل دالة تُستدعى بعد التثبيت بمعرفات الصفوف المتغيرة callback({الجدول: معرفات})"""
+        if callback not in self._row_listeners:
+            self._row_listeners.append(callback)
+
+    def unsubscribe_rows(self, callback):
+        """إلغاء تسجيل دالة إشعارات الصفوف"""
+        if callback in self._row_listeners:
+            self._row_listeners.remove(callback)
+
+    def observe_queries(self, callback):
+        """تسجيل دالة تُستدعى بعد كل استعلام بالشكل callback(العملية، البصمة، عدد الصفوف، المدة بالثواني، الخطأ)"""
+        if callback not in self._query_observers:
+            self._query_observers.append(callback)
+
+    def unobserve_queries(self, callback):
+        """إلغاء تسجيل مراقب الاستعلامات"""
+        if callback in self._query_observers:
+            self._query_observers.remove(callback)
+
+    def _observe(self, operation, query, params, rows, start, error=None):
+        """إبلاغ مراقبي الاستعلامات وسجل البطيء بمدة استعلام بدأ عند start (لا شيء إن لم يوجد مراقبون)"""
+        if not self._query_observers and self.slow_log is None:
+            return
+        seconds = time.perf_counter() - start
+        fingerprint = sql_fingerprint(query)
+        if self.slow_log is not None and error is None:
+            try:
+                self.slow_log.observe(operation, query, params, fingerprint, rows, seconds)
+            except Exception as e:
+                print(f"خطأ في سجل الاستعلامات البطيئة: {e}")
+        for callback in list(self._query_observers):
+            try:
+                callback(operation, fingerprint, rows, seconds, error)
+            except Exception as e:
+                print(f"خطأ في مراقب الاستعلامات: {e}")
+
+    def _track_row_change(self, table, row_id):
+        """تسجيل صف متغير (تُستدعى من مشغلات التتبع داخل SQLite)"""
+        self._pending_rows.setdefault(table, set()).add(row_id)
+        self._pending_changes.add(table)
+
+    def _flush_changes(self):
+        """إرسال الإشعارات المؤجلة إلى المشتركين"""
+        # الصفوف أولاً حتى تكون الذاكرات المؤقتة محدثة عند إشعار الشاشات بالجداول
+        if self._pending_rows:
+            rows = {table: frozenset(ids) for table, ids in self._pending_rows.items()}
+            self._pending_rows.clear()
+            for callback in list(self._row_listeners):
+                try:
+                    callback(rows)
+                except Exception as e:
+                    print(f"خطأ في معالج إشعار الصفوف: {e}")
+        if not self._pending_changes:
+            return
+        tables = frozenset(self._pending_changes)
+        self._pending_changes.clear()
+        for callback in list(self._listeners):
+            try:
+                callback(tables)
+            except Exception as e:
+                print(f"خطأ في معالج إشعار التغيير: {e}")
+
+    def _record_write(self, query):
+        """تسجيل الجدول المتأثر باستعلام كتابة لإشعار المشتركين"""
+        match = _WRITE_TABLE_RE.match(query)
+        if match:
+            self._pending_changes.add(match.group(1).lower())
+
+    def _after_commit(self):
+        """إرسال إشعارات التغيير وتشغيل نقطة تثبيت دورية بعد عدد محدد من عمليات التثبيت"""
+        self._flush_changes()
+        self._commits_since_checkpoint += 1
+        if self._commits_since_checkpoint >= self.profile['checkpoint_every']:
+            self.checkpoint()
+
     def create_tables(self):
         """إنشاء جداول قاعدة البيانات"""
         try:
             # جدول الفئات
-            self.cursor.execute('''
+            self.connection.execute('''
                 CREATE TABLE IF NOT EXISTS categories (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     name TEXT NOT NULL UNIQUE,
@@ -36,7 +529,7 @@ class DatabaseManager:
             ''')
             
             # جدول المنتجات
-            self.cursor.execute('''
+            self.connection.execute('''
                 CREATE TABLE IF NOT EXISTS products (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     name TEXT NOT NULL,
@@ -51,12 +544,13 @@ class DatabaseManager:
                     description TEXT,
                     created_at TEXT DEFAULT CURRENT_TIMESTAMP,
                     updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    barcode TEXT,
                     FOREIGN KEY (category_id) REFERENCES categories(id)
                 )
             ''')
             
             # جدول الموردين
-            self.cursor.execute('''
+            self.connection.execute('''
                 CREATE TABLE IF NOT EXISTS suppliers (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     name TEXT NOT NULL,
@@ -70,7 +564,7 @@ class DatabaseManager:
             ''')
             
             # جدول المبيعات
-            self.cursor.execute('''
+            self.connection.execute('''
                 CREATE TABLE IF NOT EXISTS sales (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     total_syp REAL DEFAULT 0,
@@ -79,12 +573,13 @@ class DatabaseManager:
                     discount_syp REAL DEFAULT 0,
                     discount_usd REAL DEFAULT 0,
                     notes TEXT,
-                    sale_date TEXT DEFAULT CURRENT_TIMESTAMP
+                    sale_date TEXT DEFAULT CURRENT_TIMESTAMP,
+                    client_key TEXT
                 )
             ''')
             
             # جدول عناصر المبيعات
-            self.cursor.execute('''
+            self.connection.execute('''
                 CREATE TABLE IF NOT EXISTS sale_items (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     sale_id INTEGER NOT NULL,
@@ -95,13 +590,15 @@ class DatabaseManager:
                     unit_price_usd REAL DEFAULT 0,
                     subtotal_syp REAL DEFAULT 0,
                     subtotal_usd REAL DEFAULT 0,
+                    unit_cost_syp REAL,
+                    unit_cost_usd REAL,
                     FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE,
                     FOREIGN KEY (product_id) REFERENCES products(id)
                 )
             ''')
             
             # جدول المشتريات
-            self.cursor.execute('''
+            self.connection.execute('''
                 CREATE TABLE IF NOT EXISTS purchases (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     supplier_id INTEGER,
@@ -117,7 +614,7 @@ class DatabaseManager:
             ''')
             
             # جدول عناصر المشتريات
-            self.cursor.execute('''
+            self.connection.execute('''
                 CREATE TABLE IF NOT EXISTS purchase_items (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     purchase_id INTEGER NOT NULL,
@@ -134,7 +631,7 @@ class DatabaseManager:
             ''')
             
             # جدول المصروفات
-            self.cursor.execute('''
+            self.connection.execute('''
                 CREATE TABLE IF NOT EXISTS expenses (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     category TEXT NOT NULL,
@@ -146,7 +643,7 @@ class DatabaseManager:
             ''')
             
             # جدول حركة المخزون
-            self.cursor.execute('''
+            self.connection.execute('''
                 CREATE TABLE IF NOT EXISTS inventory_movements (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     product_id INTEGER NOT NULL,
@@ -158,51 +655,528 @@ class DatabaseManager:
                 )
             ''')
             
-            self.connection.commit()
+            # جدول طبقات التكلفة (الكميات الواردة وتكلفة وحدتها والمتبقي منها)
+            costs_exist = self.connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cost_layers'"
+            ).fetchone()
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS cost_layers (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    product_id INTEGER NOT NULL,
+                    purchase_item_id INTEGER,
+                    received_date TEXT,
+                    quantity REAL NOT NULL,
+                    remaining REAL NOT NULL,
+                    unit_cost_syp REAL DEFAULT 0,
+                    unit_cost_usd REAL DEFAULT 0,
+                    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+                )
+            ''')
+            
+            # الأعمدة الجديدة قبل المشغلات التي تستخدمها
+            self.migrate_columns()
+            
+            # جدول الملخصات اليومية (يُحدَّث بالمشغلات)
+            rollups_exist = self.connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_rollups'"
+            ).fetchone()
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS daily_rollups (
+                    day TEXT PRIMARY KEY,
+                    sales_count INTEGER DEFAULT 0,
+                    revenue_syp REAL DEFAULT 0,
+                    revenue_usd REAL DEFAULT 0,
+                    discount_syp REAL DEFAULT 0,
+                    discount_usd REAL DEFAULT 0,
+                    cogs_syp REAL DEFAULT 0,
+                    cogs_usd REAL DEFAULT 0,
+                    expenses_count INTEGER DEFAULT 0,
+                    expenses_syp REAL DEFAULT 0,
+                    expenses_usd REAL DEFAULT 0,
+                    purchases_count INTEGER DEFAULT 0,
+                    purchases_syp REAL DEFAULT 0,
+                    purchases_usd REAL DEFAULT 0
+                )
+            ''')
+            # تُعاد كتابة المشغلات عند كل تشغيل ليسري أي تغيير في تعريفها على القواعد القديمة
+            with self.transaction():
+                for trigger in _ROLLUP_TRIGGERS:
+                    name = _TRIGGER_NAME_RE.search(trigger).group(1)
+                    self.connection.execute(f"DROP TRIGGER IF EXISTS {name}")
+                    self.connection.execute(trigger)
+            
+            self.create_indexes()
+            self.create_row_tracking()
+            
+            # فهرس البحث النصي للمنتجات
+            self.connection.execute(_SEARCH_TABLE)
+            for trigger in _SEARCH_TRIGGERS:
+                self.connection.execute(trigger)
+            # إعادة البناء إن أُنشئ للتو أو عُدّلت المنتجات من اتصال لا يملك المشغلات المؤقتة
+            indexed = self.connection.execute("SELECT COUNT(*) FROM products_fts").fetchone()[0]
+            products = self.connection.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+            if indexed != products:
+                self.rebuild_search_index()
+            
+            # بناء طبقات التكلفة (منها الرصيد الافتتاحي للمنتجات الموجودة) وتكاليف المبيعات التاريخية
+            # عند إنشاء الجدول لأول مرة (تعيد بناء الملخصات أيضاً)، وإلا بناء الملخصات وحدها إن أُنشئت للتو
+            if not costs_exist and self.connection.execute("SELECT 1 FROM products LIMIT 1").fetchone():
+                self.costing.rebuild()
+            elif not rollups_exist:
+                self.rebuild_daily_rollups()
             return True
         except Exception as e:
             print(f"خطأ في إنشاء الجداول: {e}")
             return False
     
+    @contextmanager
+    def transaction(self):
+        """فتح معاملة (أو نقطة حفظ عند التداخل) تُثبَّت عند النجاح وتُلغى عند حدوث خطأ
+
+        تحجز اتصال الكاتب للخيط الحالي حتى نهاية المعاملة فتنتظر كتابات الخيوط الأخرى.
+        """
+        with self.pool.writing():
+            depth = self._tx_depth
+            savepoint = f"sp_{depth}"
+            if depth == 0:
+                self.connection.execute("BEGIN IMMEDIATE")
+                self._tx_thread = threading.get_ident()
+            else:
+                self.connection.execute(f"SAVEPOINT {savepoint}")
+            self._tx_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._tx_depth -= 1
+                if depth == 0:
+                    self._tx_thread = None
+                    self.connection.execute("ROLLBACK")
+                    self._pending_changes.clear()
+                    self._pending_rows.clear()
+                else:
+                    self.connection.execute(f"ROLLBACK TO {savepoint}")
+                    self.connection.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                self._tx_depth -= 1
+                if depth == 0:
+                    self._tx_thread = None
+                    self.connection.execute("COMMIT")
+                    self._after_commit()
+                else:
+                    self.connection.execute(f"RELEASE {savepoint}")
+
+    @property
+    def in_transaction(self):
+        """هل توجد معاملة مفتوحة حالياً في هذا الخيط"""
+        return self._tx_depth > 0 and self._tx_thread == threading.get_ident()
+
+    @contextmanager
+    def _reading(self):
+        """الاتصال المناسب للقراءة: الكاتب داخل معاملة (ليرى تغييراتها) وإلا اتصال قراءة معار"""
+        if self.in_transaction:
+            yield self.connection
+        else:
+            with self.pool.checkout() as reader:
+                yield reader.connection
+
+    def migrate_columns(self):
+        """إضافة الأعمدة الجديدة إلى الجداول الموجودة مسبقاً"""
+        for table, column, definition in _COLUMN_MIGRATIONS:
+            existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    def create_indexes(self):
+        """إنشاء الفهارس الثانوية إن لم تكن موجودة"""
+        for name, table, columns in _INDEXES:
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        for name, table, columns, where in _UNIQUE_INDEXES:
+            self.connection.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({columns}) WHERE {where}")
+        for name, table, columns, where in _PARTIAL_INDEXES:
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns}) WHERE {where}")
+        # تحديث إحصائيات المخطط ليختار الفهارس المناسبة
+        self.connection.execute("PRAGMA optimize")
+
+    def create_row_tracking(self):
+        """إنشاء مشغلات مؤقتة (خاصة بهذا الاتصال) تُبلغ عن معرفات الصفوف المتغيرة"""
+        for table in _ROW_TRACKED_TABLES:
+            self.connection.execute(f"""
+                CREATE TEMP TRIGGER IF NOT EXISTS track_{table}_insert AFTER INSERT ON main.{table}
+                BEGIN SELECT track_row_change('{table}', NEW.id); END
+            """)
+            self.connection.execute(f"""
+                CREATE TEMP TRIGGER IF NOT EXISTS track_{table}_update AFTER UPDATE ON main.{table}
+                BEGIN SELECT track_row_change('{table}', OLD.id), track_row_change('{table}', NEW.id); END
+            """)
+            self.connection.execute(f"""
+                CREATE TEMP TRIGGER IF NOT EXISTS track_{table}_delete AFTER DELETE ON main.{table}
+                BEGIN SELECT track_row_change('{table}', OLD.id); END
+            """)
+        # أيام الملخصات المتغيرة (تُبطل ذاكرة التقارير للفترات التي تشملها فقط)
+        for event, row in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+            self.connection.execute(f"""
+                CREATE TEMP TRIGGER IF NOT EXISTS track_daily_rollups_{event} AFTER {event.upper()} ON main.daily_rollups
+                BEGIN SELECT track_row_change('daily_rollups', {row}.day); END
+            """)
+
+    def rebuild_search_index(self):
+        """إعادة بناء فهرس البحث النصي للمنتجات بالكامل"""
+        try:
+            with self.transaction():
+                self.execute_query("DELETE FROM products_fts")
+                self.execute_query("""
+                    INSERT INTO products_fts (rowid, name, category)
+                    SELECT p.id, normalize_ar(p.name), normalize_ar(c.name)
+                    FROM products p
+                    LEFT JOIN categories c ON p.category_id = c.id
+                """)
+            return True
+        except Exception as e:
+            print(f"خطأ في إعادة بناء فهرس البحث: {e}")
+            return False
+
+    def search_product_ids(self, term, limit=None, include_category=False):
+        """البحث عن المنتجات بالبادئة مع توحيد العربية وإرجاع المعرفات مرتبة حسب الصلة (مع ذاكرة مؤقتة)"""
+        return self.product_search.search(term, limit, include_category)
+
+    def query_product_ids(self, term, limit=None, include_category=False):
+        """استعلام فهرس البحث مباشرة وإرجاع (المعرفات، هل النتيجة كاملة غير مقطوعة)"""
+        columns = ('name', 'category') if include_category else ('name',)
+        match = build_match_query(term, columns)
+        if match is None:
+            return [], True
+        query = "SELECT rowid FROM products_fts WHERE products_fts MATCH ?"
+        if not limit:
+            return [row[0] for row in self.fetch_all(query, (match,))], True
+        
+        # حساب bm25 لآلاف النتائج مكلف أثناء الكتابة: البادئات العامة جداً (أكثر من limit نتيجة)
+        # تُرجع بترتيب الفهرس، والترتيب حسب الصلة (الاسم أهم من الفئة) يُطبَّق على النتائج المحددة فقط
+        ids = [row[0] for row in self.fetch_all(f"{query} LIMIT ?", (match, limit + 1))]
+        if len(ids) > limit:
+            return ids[:limit], False
+        ranked = self.fetch_all(f"{query} ORDER BY bm25(products_fts, 10.0, 1.0)", (match,))
+        return [row[0] for row in ranked], True
+
+    def rebuild_daily_rollups(self):
+        """إعادة بناء جدول الملخصات اليومية بالكامل من السجل التاريخي"""
+        cost_syp = _SALE_COST_SYP.format(row='si')
+        cost_usd = _SALE_COST_USD.format(row='si')
+        try:
+            with self.transaction():
+                self.execute_query("DELETE FROM daily_rollups")
+                self.execute_query(f"""
+                    INSERT INTO daily_rollups (day, {', '.join(ROLLUP_COLUMNS)})
+                    SELECT day, SUM(sales_count), SUM(revenue_syp), SUM(revenue_usd),
+                           SUM(discount_syp), SUM(discount_usd), SUM(cogs_syp), SUM(cogs_usd),
+                           SUM(expenses_count), SUM(expenses_syp), SUM(expenses_usd),
+                           SUM(purchases_count), SUM(purchases_syp), SUM(purchases_usd)
+                    FROM (
+                        SELECT substr(sale_date, 1, 10) AS day, COUNT(*) AS sales_count,
+                               SUM(total_syp) AS revenue_syp, SUM(total_usd) AS revenue_usd,
+                               SUM(discount_syp) AS discount_syp, SUM(discount_usd) AS discount_usd,
+                               0 AS cogs_syp, 0 AS cogs_usd, 0 AS expenses_count, 0 AS expenses_syp,
+                               0 AS expenses_usd, 0 AS purchases_count, 0 AS purchases_syp, 0 AS purchases_usd
+                        FROM sales GROUP BY 1
+                        UNION ALL
+                        SELECT substr(s.sale_date, 1, 10), 0, 0, 0, 0, 0,
+                               SUM(si.quantity * {cost_syp}), SUM(si.quantity * {cost_usd}),
+                               0, 0, 0, 0, 0, 0
+                        FROM sale_items si JOIN sales s ON si.sale_id = s.id GROUP BY 1
+                        UNION ALL
+                        SELECT substr(expense_date, 1, 10), 0, 0, 0, 0, 0, 0, 0,
+                               COUNT(*), SUM(amount_syp), SUM(amount_usd), 0, 0, 0
+                        FROM expenses GROUP BY 1
+                        UNION ALL
+                        SELECT substr(purchase_date, 1, 10), 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+                               COUNT(*), SUM(total_syp), SUM(total_usd)
+                        FROM purchases GROUP BY 1
+                    )
+                    GROUP BY day
+                """)
+            return True
+        except Exception as e:
+            print(f"خطأ في إعادة بناء الملخصات اليومية: {e}")
+            return False
+
+    def get_rollup_totals(self, from_date, to_date):
+        """مجاميع الملخصات اليومية لفترة كقاموس"""
+        return rollup_totals(self, from_date, to_date)
+
+    def get_daily_series(self, from_date, to_date, column='revenue_syp'):
+        """سلسلة يومية [(اليوم، القيمة)] لعمود من الملخصات خلال فترة"""
+        return daily_series(self, from_date, to_date, column)
+
     def execute_query(self, query, params=None):
-        """تنفيذ استعلام وإرجاع النتائج"""
+        """تنفيذ استعلام كتابة (يُثبَّت مباشرة خارج المعاملات)"""
+        start = time.perf_counter()
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            self.connection.commit()
+            with self.pool.writing():
+                cursor = self.connection.execute(query, params or ())
+                self._record_write(query)
+                if not self.in_transaction:
+                    self._after_commit()
+            self._observe('execute_query', query, params, cursor.rowcount, start)
             return True
         except Exception as e:
+            self._observe('execute_query', query, params, 0, start, str(e))
+            # داخل معاملة يجب أن يصل الخطأ إلى transaction() لإلغاء المعاملة كاملة
+            if self.in_transaction:
+                raise
+            print(f"خطأ في تنفيذ الاستعلام: {e}")
+            return False
+
+    def execute_insert(self, query, params=None):
+        """تنفيذ استعلام إضافة وإرجاع رقم السجل الجديد (أو None عند الفشل)"""
+        start = time.perf_counter()
+        try:
+            # lastrowid من مؤشر هذا الاستعلام نفسه تحت قفل الكاتب فلا يتأثر بكتابات خيوط أخرى
+            with self.pool.writing():
+                cursor = self.connection.execute(query, params or ())
+                self._record_write(query)
+                if not self.in_transaction:
+                    self._after_commit()
+            self._observe('execute_insert', query, params, cursor.rowcount, start)
+            return cursor.lastrowid
+        except Exception as e:
+            self._observe('execute_insert', query, params, 0, start, str(e))
+            if self.in_transaction:
+                raise
+            print(f"خطأ في تنفيذ الاستعلام: {e}")
+            return None
+
+    def execute_many(self, query, params_seq):
+        """تنفيذ استعلام واحد على مجموعة من المعاملات دفعة واحدة"""
+        start = time.perf_counter()
+        try:
+            with self.transaction():
+                cursor = self.connection.executemany(query, params_seq)
+                self._record_write(query)
+            self._observe('execute_many', query, None, cursor.rowcount, start)
+            return True
+        except Exception as e:
+            self._observe('execute_many', query, None, 0, start, str(e))
+            if self.in_transaction:
+                raise
             print(f"خطأ في تنفيذ الاستعلام: {e}")
-            self.connection.rollback()
             return False
     
     def fetch_all(self, query, params=None):
         """جلب جميع النتائج"""
+        start = time.perf_counter()
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            return self.cursor.fetchall()
+            with self._reading() as connection:
+                rows = connection.execute(query, params or ()).fetchall()
+            self._observe('fetch_all', query, params, len(rows), start)
+            return rows
         except Exception as e:
+            self._observe('fetch_all', query, params, 0, start, str(e))
             print(f"خطأ في جلب البيانات: {e}")
             return []
     
     def fetch_one(self, query, params=None):
         """جلب نتيجة واحدة"""
+        start = time.perf_counter()
         try:
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            return self.cursor.fetchone()
+            with self._reading() as connection:
+                row = connection.execute(query, params or ()).fetchone()
+            self._observe('fetch_one', query, params, 0 if row is None else 1, start)
+            return row
         except Exception as e:
+            self._observe('fetch_one', query, params, 0, start, str(e))
             print(f"خطأ في جلب البيانات: {e}")
             return None
     
+    def import_barcodes(self, rows):
+        """استيراد باركودات بالجملة من أزواج (معرف المنتج أو اسمه، الباركود) في معاملة واحدة
+        
+        الملف هو المرجع: الباركود المستورد يُنزع من أي منتج آخر كان يحمله.
+        يُرجع (عدد المنتجات المحدثة، الأسطر المتجاهلة) أو None عند الفشل.
+        """
+        assignments = {}
+        seen_barcodes = set()
+        skipped = []
+        for key, barcode in rows:
+            key = str(key).strip()
+            barcode = str(barcode).strip()
+            if key.isdigit() and self.catalog.get(int(key)):
+                product = self.catalog.get(int(key))
+            else:
+                matches = self.catalog.find_by_name(key)
+                product = matches[0] if len(matches) == 1 else None
+            # منتج غير معروف أو اسم مكرر أو باركود فارغ أو مكرر داخل الملف
+            if product is None or not barcode or barcode in seen_barcodes:
+                skipped.append((key, barcode))
+                continue
+            seen_barcodes.add(barcode)
+            assignments[product.id] = barcode
+
+        params = [(barcode, product_id) for product_id, barcode in assignments.items()]
+        try:
+            with self.transaction():
+                # تحرير الباركودات المستوردة أولاً حتى لا يتعارض تبديلها بين المنتجات مع القيد الفريد
+                self.execute_many(
+                    "UPDATE products SET barcode = NULL WHERE barcode = ?",
+                    [(barcode,) for barcode, _ in params]
+                )
+                self.execute_many(
+                    "UPDATE products SET barcode = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    params
+                )
+            return len(params), skipped
+        except Exception as e:
+            print(f"خطأ في استيراد الباركود: {e}")
+            return None
+
+    def complete_sale(self, items, total_syp, total_usd, payment_method='نقدي',
+                      discount_syp=0, discount_usd=0, notes='', sale_date=None, client_key=None):
+        """تسجيل عملية بيع كاملة (الفاتورة، العناصر، المخزون، الحركات) في معاملة واحدة وإرجاع رقم الفاتورة
+
+        يرفع ValueError إن كان sale_date تاريخاً غير صالح.
+        """
+        sale_date = parse_timestamp(sale_date) if sale_date else datetime.now().isoformat()
+        try:
+            with self.transaction():
+                sale_id = self.execute_insert(
+                    """
+                    INSERT INTO sales (total_syp, total_usd, payment_method, discount_syp, discount_usd, notes, sale_date,
+                                       client_key)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (total_syp, total_usd, payment_method, discount_syp, discount_usd, notes, sale_date, client_key)
+                )
+
+                # تكلفة الوحدة من طبقات التكلفة وقت البيع
+                costs = [self.costing.consume(item['product_id'], item['quantity']) for item in items]
+
+                # عناصر البيع
+                self.execute_many(
+                    """
+                    INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price_syp, unit_price_usd,
+                                            subtotal_syp, subtotal_usd, unit_cost_syp, unit_cost_usd)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [(sale_id, item['product_id'], item['name'], item['quantity'],
+                      item['unit_price_syp'], item['unit_price_usd'],
+                      item['total_syp'], item['total_usd'], cost_syp, cost_usd)
+                     for item, (cost_syp, cost_usd) in zip(items, costs)]
+                )
+
+                # تحديث المخزون
+                self.execute_many(
+                    "UPDATE products SET quantity = quantity - ?, updated_at = ? WHERE id = ?",
+                    [(item['quantity'], sale_date, item['product_id']) for item in items]
+                )
+
+                # تسجيل حركة المخزون
+                self.execute_many(
+                    """
+                    INSERT INTO inventory_movements (product_id, movement_type, quantity, reason, movement_date)
+                    VALUES (?, 'out', ?, 'بيع', ?)
+                    """,
+                    [(item['product_id'], item['quantity'], sale_date) for item in items]
+                )
+            return sale_id
+        except Exception as e:
+            print(f"خطأ في تسجيل عملية البيع: {e}")
+            return None
+
+    def save_purchase(self, items, supplier_id, total_syp, total_usd, payment_method='نقدي',
+                      paid_syp=0, paid_usd=0, notes='', purchase_date=None):
+        """تسجيل فاتورة مشتريات كاملة (العناصر، المخزون، الحركات، ديون المورد) في معاملة واحدة وإرجاع رقمها
+
+        يرفع ValueError إن كان purchase_date تاريخاً غير صالح.
+        """
+        if purchase_date:
+            purchase_date = parse_timestamp(purchase_date, sep=' ')
+        else:
+            purchase_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            with self.transaction():
+                purchase_id = self.execute_insert(
+                    """INSERT INTO purchases 
+                       (supplier_id, total_syp, total_usd, payment_method, paid_amount_syp, paid_amount_usd, notes, purchase_date)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (supplier_id, total_syp, total_usd, payment_method, paid_syp, paid_usd, notes, purchase_date)
+                )
+
+                # عناصر المشتريات
+                self.execute_many(
+                    """INSERT INTO purchase_items 
+                       (purchase_id, product_id, product_name, quantity, unit_price_syp, unit_price_usd, subtotal_syp, subtotal_usd)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    [(purchase_id, item['product_id'], item['name'], item['quantity'],
+                      item['unit_price_syp'], item['unit_price_usd'],
+                      item['total_syp'], item['total_usd']) for item in items]
+                )
+
+                # طبقات تكلفة الكميات الواردة
+                self.costing.receive_purchase(purchase_id, purchase_date)
+
+                # تحديث المخزون
+                self.execute_many(
+                    "UPDATE products SET quantity = quantity + ?, updated_at = ? WHERE id = ?",
+                    [(item['quantity'], purchase_date, item['product_id']) for item in items]
+                )
+
+                # حركة المخزون
+                self.execute_many(
+                    """INSERT INTO inventory_movements (product_id, movement_type, quantity, reason, movement_date)
+                       VALUES (?, 'in', ?, 'شراء', ?)""",
+                    [(item['product_id'], item['quantity'], purchase_date) for item in items]
+                )
+
+                # تحديث ديون المورد
+                if supplier_id:
+                    remaining_syp = total_syp - paid_syp
+                    remaining_usd = total_usd - paid_usd
+                    if remaining_syp > 0 or remaining_usd > 0:
+                        self.execute_query(
+                            "UPDATE suppliers SET debt_syp = debt_syp + ?, debt_usd = debt_usd + ? WHERE id = ?",
+                            (remaining_syp, remaining_usd, supplier_id)
+                        )
+            return purchase_id
+        except Exception as e:
+            print(f"خطأ في تسجيل المشتريات: {e}")
+            return None
+
+    def adjust_stock(self, product_id, quantity, movement_type, reason, movement_date=None):
+        """تعديل كمية منتج يدوياً ('in' إضافة أو 'out' سحب) مع تسجيل الحركة في معاملة واحدة
+
+        يرفع ValueError إن كان movement_date تاريخاً غير صالح.
+        """
+        if movement_date:
+            movement_date = parse_timestamp(movement_date, sep=' ')
+        else:
+            movement_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        delta = quantity if movement_type == 'in' else -quantity
+        try:
+            with self.transaction():
+                self.execute_query(
+                    "UPDATE products SET quantity = quantity + ?, updated_at = ? WHERE id = ?",
+                    (delta, movement_date, product_id)
+                )
+                self.execute_query(
+                    """INSERT INTO inventory_movements (product_id, movement_type, quantity, reason, movement_date)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    (product_id, movement_type, quantity, reason, movement_date)
+                )
+                # الإضافة اليدوية طبقة بسعر الشراء الحالي، والسحب يستهلك من الطبقات
+                if movement_type == 'in':
+                    cost_syp, cost_usd = self.costing.fallback_cost(product_id)
+                    self.costing.receive(product_id, quantity, cost_syp, cost_usd, movement_date)
+                else:
+                    self.costing.consume(product_id, quantity)
+            return True
+        except Exception as e:
+            print(f"خطأ في تعديل المخزون: {e}")
+            return False
+    
     def close(self):
         """إغلاق الاتصال بقاعدة البيانات"""
-        if self.connection:
-            self.connection.close()
+        self.executor.shutdown()
+        if self.slow_log is not None:
+            self.slow_log.close()
+        if self.pool:
+            self.checkpoint('TRUNCATE')
+            self.pool.close()
@@ -0,0 +1,249 @@
+# تصدير بيانات التقارير والجداول الخام كتدفق (CSV أو Parquet أو Feather)
+# - الصفوف تُقرأ على دفعات (fetchmany) وتُكتب فوراً فلا يُحمَّل التقرير كاملاً في الذاكرة
+# - يعمل في خيط عامل باتصال قراءة فقط، ويبلغ عن تقدمه (المكتوب، الإجمالي) بعد كل دفعة
+# - الكتابة في ملف مؤقت يُستبدل به الملف المطلوب عند الاكتمال فقط، ويُحذف عند الإلغاء أو الخطأ
+# - الصيغ العمودية (تتطلب pyarrow الاختيارية) تحفظ الأنواع: التواريخ كتواريخ والمبالغ كأرقام
+#   مع عملتها في بيانات العمود، وكل دفعة تُكتب مجموعة صفوف (row group) مستقلة
+import csv
+import importlib.util
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from database.db_manager import day_bounds
+
+# pyarrow تُستورد عند أول تصدير عمودي فقط (استيرادها بطيء)
+pa = pq = None
+
+
+EXPORT_FORMATS = ('csv', 'parquet', 'feather')
+
+# أنواع الأعمدة: int, real, text, date, timestamp, syp, usd (المبالغ أرقام عشرية بعملتها)
+# نوع البيانات -> (الأعمدة [(الاسم، النوع)]، الاستعلام)
+# استعلامات الفترة تأخذ (البداية، اليوم التالي للنهاية)
+EXPORTS = {
+    # ------------------ التقارير ------------------
+    'sales': (
+        [('ID', 'int'), ('Total SYP', 'syp'), ('Total USD', 'usd'),
+         ('Payment Method', 'text'), ('Date', 'timestamp')],
+        """SELECT id, total_syp, total_usd, payment_method, sale_date
+           FROM sales WHERE sale_date >= ? AND sale_date < ? ORDER BY id DESC""",
+    ),
+    'purchases': (
+        [('ID', 'int'), ('Supplier', 'text'), ('Total SYP', 'syp'), ('Total USD', 'usd'),
+         ('Date', 'timestamp')],
+        """SELECT p.id, COALESCE(s.name, 'N/A'), p.total_syp, p.total_usd, p.purchase_date
+           FROM purchases p LEFT JOIN suppliers s ON p.supplier_id = s.id
+           WHERE p.purchase_date >= ? AND p.purchase_date < ? ORDER BY p.id DESC""",
+    ),
+    'expenses': (
+        [('ID', 'int'), ('Category', 'text'), ('Description', 'text'),
+         ('Amount SYP', 'syp'), ('Amount USD', 'usd'), ('Date', 'timestamp')],
+        """SELECT id, category, description, amount_syp, amount_usd, expense_date
+           FROM expenses WHERE expense_date >= ? AND expense_date < ? ORDER BY id DESC""",
+    ),
+    'profit': (
+        [('Date', 'date'), ('Revenue SYP', 'syp'), ('Revenue USD', 'usd'),
+         ('COGS SYP', 'syp'), ('COGS USD', 'usd'), ('Expenses SYP', 'syp'), ('Expenses USD', 'usd'),
+         ('Net Profit SYP', 'syp'), ('Net Profit USD', 'usd')],
+        """SELECT day, revenue_syp, revenue_usd, cogs_syp, cogs_usd, expenses_syp, expenses_usd,
+                  revenue_syp - cogs_syp - expenses_syp, revenue_usd - cogs_usd - expenses_usd
+           FROM daily_rollups WHERE day >= ? AND day < ? ORDER BY day""",
+    ),
+    'top_products': (
+        [('Product Name', 'text'), ('Quantity Sold', 'real'),
+         ('Total Sales (SYP)', 'syp'), ('Total Sales (USD)', 'usd')],
+        """SELECT si.product_name, SUM(si.quantity), SUM(si.subtotal_syp), SUM(si.subtotal_usd)
+           FROM sale_items si JOIN sales s ON si.sale_id = s.id
+           WHERE s.sale_date >= ? AND s.sale_date < ?
+           GROUP BY si.product_name ORDER BY SUM(si.quantity) DESC""",
+    ),
+    # الموردون لا يعتمدون على الفترة
+    'suppliers': (
+        [('Supplier', 'text'), ('Purchases Count', 'int'), ('Debt SYP', 'syp'), ('Debt USD', 'usd'),
+         ('Phone', 'text')],
+        """SELECT s.name, COUNT(p.id), s.debt_syp, s.debt_usd, s.phone
+           FROM suppliers s LEFT JOIN purchases p ON s.id = p.supplier_id
+           GROUP BY s.id ORDER BY s.debt_syp DESC""",
+    ),
+    # ------------------ الجداول الخام (بترتيب المعرف) ------------------
+    'raw_sales': (
+        [('id', 'int'), ('total_syp', 'syp'), ('total_usd', 'usd'), ('payment_method', 'text'),
+         ('discount_syp', 'syp'), ('discount_usd', 'usd'), ('notes', 'text'), ('sale_date', 'timestamp')],
+        """SELECT id, total_syp, total_usd, payment_method, discount_syp, discount_usd, notes, sale_date
+           FROM sales WHERE sale_date >= ? AND sale_date < ? ORDER BY id""",
+    ),
+    'raw_sale_items': (
+        [('id', 'int'), ('sale_id', 'int'), ('sale_date', 'timestamp'), ('product_id', 'int'),
+         ('product_name', 'text'), ('quantity', 'real'),
+         ('unit_price_syp', 'syp'), ('unit_price_usd', 'usd'),
+         ('subtotal_syp', 'syp'), ('subtotal_usd', 'usd'),
+         ('unit_cost_syp', 'syp'), ('unit_cost_usd', 'usd')],
+        """SELECT si.id, si.sale_id, s.sale_date, si.product_id, si.product_name, si.quantity,
+                  si.unit_price_syp, si.unit_price_usd, si.subtotal_syp, si.subtotal_usd,
+                  si.unit_cost_syp, si.unit_cost_usd
+           FROM sales s JOIN sale_items si ON si.sale_id = s.id
+           WHERE s.sale_date >= ? AND s.sale_date < ? ORDER BY s.id, si.id""",
+    ),
+    'raw_purchases': (
+        [('id', 'int'), ('supplier_id', 'int'), ('total_syp', 'syp'), ('total_usd', 'usd'),
+         ('payment_method', 'text'), ('paid_amount_syp', 'syp'), ('paid_amount_usd', 'usd'),
+         ('notes', 'text'), ('purchase_date', 'timestamp')],
+        """SELECT id, supplier_id, total_syp, total_usd, payment_method, paid_amount_syp, paid_amount_usd,
+                  notes, purchase_date
+           FROM purchases WHERE purchase_date >= ? AND purchase_date < ? ORDER BY id""",
+    ),
+    'raw_expenses': (
+        [('id', 'int'), ('category', 'text'), ('description', 'text'),
+         ('amount_syp', 'syp'), ('amount_usd', 'usd'), ('expense_date', 'timestamp')],
+        """SELECT id, category, description, amount_syp, amount_usd, expense_date
+           FROM expenses WHERE expense_date >= ? AND expense_date < ? ORDER BY id""",
+    ),
+}
+
+
+def export_format(file_path):
+    """صيغة التصدير من امتداد الملف (CSV افتراضياً)"""
+    extension = os.path.splitext(file_path)[1].lower().lstrip('.')
+    if extension in ('parquet', 'pq'):
+        return 'parquet'
+    if extension in ('feather', 'arrow', 'ipc'):
+        return 'feather'
+    return 'csv'
+
+
+def columnar_available():
+    """هل مكتبة pyarrow مثبتة (مطلوبة لصيغتي Parquet و Feather)"""
+    return pa is not None or importlib.util.find_spec('pyarrow') is not None
+
+
+def _load_arrow():
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("التصدير إلى Parquet/Feather يتطلب تثبيت مكتبة pyarrow")
+        pa, pq = pyarrow, pyarrow.parquet
+
+
+def export_dataset(reader, dataset, from_date, to_date, file_path, file_format=None,
+                   progress=None, chunk_size=None):
+    """كتابة بيانات dataset في file_path على دفعات وإرجاع عدد الصفوف المكتوبة
+
+    reader: اتصال قراءة (ReadConnection)؛ progress: دالة اختيارية تُستدعى بـ (المكتوب، الإجمالي).
+    الصيغة من الامتداد إن لم تُحدد. عند عدم وجود بيانات يُرجَع 0 دون إنشاء الملف.
+    """
+    file_format = file_format or export_format(file_path)
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"صيغة تصدير غير معروفة: {file_format}")
+    if file_format != 'csv':
+        _load_arrow()
+    columns, query = EXPORTS[dataset]
+    params = day_bounds(from_date, to_date) if '?' in query else ()
+    # الصيغ العمودية تكتب كل دفعة مجموعة صفوف فتُفضَّل دفعات أكبر
+    chunk_size = chunk_size or (5000 if file_format == 'csv' else 65536)
+    open_writer = {'csv': _csv_writer, 'parquet': _parquet_writer, 'feather': _feather_writer}[file_format]
+    temp_path = file_path + '.part'
+    # العدّ والقراءة من لقطة واحدة حتى يطابق الإجمالي ما يُكتب فعلاً
+    with reader.snapshot():
+        total = reader.fetch_one(f"SELECT COUNT(*) FROM ({query})", params)[0]
+        if not total:
+            return 0
+        if progress:
+            progress((0, total))
+        written = 0
+        try:
+            with open_writer(temp_path, columns) as write:
+                for rows in reader.fetch_chunks(query, params, chunk_size):
+                    write(rows)
+                    written += len(rows)
+                    if progress:
+                        progress((written, total))
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return written
+
+
+# ------------------ الكتّاب ------------------
+@contextmanager
+def _csv_writer(path, columns):
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow([name for name, _ in columns])
+        yield writer.writerows
+
+
+@contextmanager
+def _parquet_writer(path, columns):
+    schema = _arrow_schema(columns)
+    writer = pq.ParquetWriter(path, schema, compression='zstd')
+    try:
+        yield lambda rows: writer.write_table(pa.Table.from_batches([_record_batch(schema, columns, rows)]))
+    finally:
+        writer.close()
+
+
+@contextmanager
+def _feather_writer(path, columns):
+    # Feather v2 هو صيغة ملف Arrow IPC
+    schema = _arrow_schema(columns)
+    options = pa.ipc.IpcWriteOptions(compression='zstd')
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+        yield lambda rows: writer.write_batch(_record_batch(schema, columns, rows))
+
+
+# ------------------ أنواع Arrow ------------------
+def _to_date(value):
+    try:
+        return datetime.strptime(str(value).strip()[:10], '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
+def _to_timestamp(value):
+    # التواريخ محفوظة بفاصل T أو مسافة، مع أجزاء الثانية أو بدونها، أو يوماً فقط
+    try:
+        return datetime.fromisoformat(str(value).strip()) if value else None
+    except ValueError:
+        return None
+
+
+def _to_text(value):
+    # SQLite لا يفرض نوع العمود (رقم هاتف مخزن كعدد مثلاً)
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+_CONVERTERS = {'date': _to_date, 'timestamp': _to_timestamp, 'text': _to_text}
+
+
+def _field_name(name):
+    """اسم عمود Arrow من رأس العمود: 'Total Sales (SYP)' -> 'total_sales_syp'"""
+    return '_'.join(name.lower().replace('(', ' ').replace(')', ' ').split())
+
+
+def _arrow_schema(columns):
+    types = {
+        'int': pa.int64(), 'real': pa.float64(), 'text': pa.string(),
+        'date': pa.date32(), 'timestamp': pa.timestamp('us'),
+        'syp': pa.float64(), 'usd': pa.float64(),
+    }
+    fields = []
+    for name, kind in columns:
+        metadata = {'currency': kind.upper()} if kind in ('syp', 'usd') else None
+        fields.append(pa.field(_field_name(name), types[kind], metadata=metadata))
+    return pa.schema(fields)
+
+
+def _record_batch(schema, columns, rows):
+    arrays = []
+    for index, ((_, kind), field) in enumerate(zip(columns, schema)):
+        values = [row[index] for row in rows]
+        converter = _CONVERTERS.get(kind)
+        if converter:
+            values = [converter(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
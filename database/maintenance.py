@@ -0,0 +1,133 @@
+# أوامر صيانة قاعدة البيانات
+# الاستخدام: python -m database.maintenance <الأمر> [--db مسار_القاعدة]
+import argparse
+import csv
+from datetime import datetime
+from database.db_manager import DatabaseManager
+from database.costing import COSTING_METHODS
+from database.export import EXPORTS, export_dataset
+from database.querylog import summarize_log
+
+
+def rebuild_rollups(db, args):
+    """إعادة بناء جدول الملخصات اليومية من السجل التاريخي"""
+    if db.rebuild_daily_rollups():
+        count = db.fetch_one("SELECT COUNT(*) FROM daily_rollups")[0]
+        print(f"تمت إعادة بناء الملخصات اليومية: {count} يوم")
+        return 0
+    return 1
+
+
+def rebuild_search(db, args):
+    """إعادة بناء فهرس البحث النصي للمنتجات"""
+    if db.rebuild_search_index():
+        count = db.fetch_one("SELECT COUNT(*) FROM products_fts")[0]
+        print(f"تمت إعادة بناء فهرس البحث: {count} منتج")
+        return 0
+    return 1
+
+
+def import_barcodes(db, args):
+    """استيراد باركودات من ملف CSV (رقم المنتج أو اسمه، الباركود)"""
+    if not args.file:
+        print("يرجى تحديد الملف بـ --file")
+        return 1
+    with open(args.file, newline='', encoding='utf-8-sig') as f:
+        rows = [(r[0], r[1]) for r in csv.reader(f) if len(r) >= 2]
+    result = db.import_barcodes(rows)
+    if result is None:
+        return 1
+    updated, skipped = result
+    print(f"تم تحديث باركود {updated} منتج، وتجاهل {len(skipped)} سطر")
+    for key, barcode in skipped:
+        print(f"  - {key},{barcode}")
+    return 0
+
+
+def rebuild_costs(db, args):
+    """إعادة بناء طبقات التكلفة وتكلفة عناصر المبيعات التاريخية ثم الملخصات اليومية"""
+    count = db.costing.rebuild()
+    if count is None:
+        return 1
+    print(f"تمت إعادة بناء طبقات التكلفة ({db.costing.method}): تكلفة {count} عنصر بيع")
+    return 0
+
+
+def export(db, args):
+    """تصدير تقرير أو جدول خام لفترة إلى CSV أو Parquet أو Feather (حسب امتداد الملف)"""
+    if not args.file or not args.dataset:
+        print("يرجى تحديد البيانات بـ --dataset والملف بـ --file")
+        return 1
+    from_date = args.from_date or '2000-01-01'
+    to_date = args.to_date or datetime.now().strftime('%Y-%m-%d')
+
+    def progress(value):
+        print(f"\r{value[0]:,} / {value[1]:,}", end='', flush=True)
+
+    try:
+        with db.pool.checkout() as reader:
+            count = export_dataset(reader, args.dataset, from_date, to_date, args.file, progress=progress)
+    except Exception as e:
+        print(f"\nخطأ في التصدير: {e}")
+        return 1
+    print(f"\nتم تصدير {count} صف إلى {args.file}" if count else "لا توجد بيانات لتصديرها")
+    return 0
+
+
+def slow_queries(db, args):
+    """تلخيص سجل الاستعلامات البطيئة: الأبطأ والماسحة لجداول كاملة مع خطط تنفيذها"""
+    path = args.file or db.db_path + '.slow.log'
+    rows, stats = summarize_log(path, args.top)
+    if not rows and not stats:
+        print(f"لا توجد سجلات في {path} (فعّل السجل بمتغير البيئة SUPERMARKET_SLOW_QUERY_MS)")
+        return 0
+    for row in rows:
+        if row['slow']:
+            print(f"\n[{row['slow']} بطيء] p50={row['p50_ms']:.1f} p95={row['p95_ms']:.1f} "
+                  f"p99={row['p99_ms']:.1f} max={row['max_ms']:.1f} ms  آخرها {row['last_at']}")
+        else:
+            print(f"\n[مسح كامل غير بطيء] {row['last_at']}")
+        print(f"  {row['fingerprint']}")
+        if row['scans']:
+            print(f"  مسح كامل: {', '.join(row['scans'])}")
+        for step in row['plan'] or []:
+            print(f"    {step}")
+    if stats:
+        print("\nإحصائيات آخر جلسة (الأعلى p95):")
+        for row in sorted(stats.values(), key=lambda r: r['p95_ms'], reverse=True)[:args.top]:
+            print(f"  {row['count']:>7} × p50={row['p50_ms']:.2f} p95={row['p95_ms']:.2f} "
+                  f"p99={row['p99_ms']:.2f} ms  {row['fingerprint'][:100]}")
+    return 0
+
+
+COMMANDS = {
+    'rebuild-rollups': rebuild_rollups,
+    'rebuild-search': rebuild_search,
+    'import-barcodes': import_barcodes,
+    'rebuild-costs': rebuild_costs,
+    'export': export,
+    'slow-queries': slow_queries,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="أوامر صيانة قاعدة بيانات السوبر ماركت")
+    parser.add_argument('command', choices=sorted(COMMANDS))
+    parser.add_argument('--db', default="supermarket.db", help="اسم أو مسار ملف قاعدة البيانات")
+    parser.add_argument('--file', help="ملف الإدخال (لأمري import-barcodes و slow-queries) أو الإخراج (لأمر export)")
+    parser.add_argument('--costing', choices=COSTING_METHODS, help="طريقة حساب التكلفة (لأمر rebuild-costs)")
+    parser.add_argument('--dataset', choices=sorted(EXPORTS), help="البيانات المصدرة (لأمر export)")
+    parser.add_argument('--from', dest='from_date', help="أول يوم YYYY-MM-DD (لأمر export)")
+    parser.add_argument('--to', dest='to_date', help="آخر يوم YYYY-MM-DD (لأمر export)")
+    parser.add_argument('--top', type=int, default=20, help="عدد الاستعلامات المعروضة (لأمر slow-queries)")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager(args.db, costing=args.costing)
+    try:
+        return COMMANDS[args.command](db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
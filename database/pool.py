@@ -0,0 +1,188 @@
+# مجمع اتصالات SQLite: كاتب واحد مخصص واتصالات قراءة فقط (WAL) تُعار لكل خيط
+# - كل الكتابات تمر عبر اتصال الكاتب تحت قفل واحد فلا تتداخل معاملات خيوط مختلفة
+# - القراءات تستعير اتصالاً للقراءة فقط فلا تنتظر خلف الكاتب (WAL يسمح بالقراءة أثناء الكتابة)
+# - الاستعارة متداخلة في الخيط نفسه: الاستعارة الداخلية تُرجع الاتصال المعار نفسه
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+# نفس دالة urllib.request.pathname2url دون استيراد urllib.request (بطيء عند بدء التشغيل)
+if os.name == 'nt':
+    from nturl2path import pathname2url
+else:
+    from urllib.parse import quote as pathname2url
+
+
+class PoolTimeout(Exception):
+    """لم يتوفر اتصال قراءة خلال المهلة المحددة"""
+
+
+class ReadConnection:
+    """اتصال قراءة فقط بنفس واجهة القراءة في DatabaseManager
+
+    بخلاف DatabaseManager تُرفع الأخطاء هنا إلى المستدعي بدلاً من طباعتها وإرجاع قيمة فارغة.
+    """
+
+    def __init__(self, db_path, configure=None):
+        uri = f"file:{pathname2url(db_path)}?mode=ro"
+        # ينتقل الاتصال بين الخيوط من استعارة لأخرى، ويُقاطع من خيط الواجهة عند الإلغاء
+        self.connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        if configure:
+            configure(self.connection)
+
+    def fetch_all(self, query, params=None):
+        return self.connection.execute(query, params or ()).fetchall()
+
+    def fetch_one(self, query, params=None):
+        return self.connection.execute(query, params or ()).fetchone()
+
+    def fetch_chunks(self, query, params=None, size=5000):
+        """الصفوف على دفعات (fetchmany) بدلاً من تحميلها كلها في الذاكرة"""
+        cursor = self.connection.execute(query, params or ())
+        try:
+            while True:
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def snapshot(self):
+        """تنفيذ عدة استعلامات من لقطة واحدة متسقة للقاعدة"""
+        self.connection.execute("BEGIN")
+        try:
+            yield self
+        finally:
+            if self.connection.in_transaction:
+                self.connection.execute("ROLLBACK")
+
+    def is_healthy(self):
+        """فحص سريع أن الاتصال ما زال صالحاً وغير عالق في معاملة"""
+        try:
+            if self.connection.in_transaction:
+                self.connection.execute("ROLLBACK")
+            self.connection.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def interrupt(self):
+        self.connection.interrupt()
+
+    def close(self):
+        self.connection.close()
+
+
+class ConnectionPool:
+    """اتصال كاتب واحد ومجموعة محدودة من اتصالات القراءة تُعار لكل خيط"""
+
+    def __init__(self, db_path, max_readers=4, timeout=10.0,
+                 configure_writer=None, configure_reader=None):
+        self.db_path = db_path
+        self.max_readers = max_readers
+        self.timeout = timeout
+        self.configure_reader = configure_reader
+        # isolation_level=None: المعاملات تُدار يدوياً عبر DatabaseManager.transaction()
+        self.writer = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        if configure_writer:
+            configure_writer(self.writer)
+        self.write_lock = threading.RLock()
+
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+    # ------------------ الكاتب ------------------
+    @contextmanager
+    def writing(self):
+        """حجز اتصال الكاتب للخيط الحالي (متداخل: يمكن حجزه مجدداً من الخيط نفسه)"""
+        with self.write_lock:
+            yield self.writer
+
+    # ------------------ القرّاء ------------------
+    @contextmanager
+    def checkout(self):
+        """استعارة اتصال قراءة للخيط الحالي وإعادته عند الانتهاء"""
+        reader = getattr(self._local, 'reader', None)
+        if reader is not None:
+            # استعارة متداخلة في الخيط نفسه
+            yield reader
+            return
+
+        reader = self._acquire()
+        self._local.reader = reader
+        try:
+            yield reader
+        finally:
+            self._local.reader = None
+            self._release(reader)
+
+    def _acquire(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("مجمع الاتصالات مغلق")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                reader = self._idle.get_nowait()
+            except queue.Empty:
+                reader = self._create()
+                if reader is None:
+                    # بلغ المجمع حده الأقصى: انتظار إعادة اتصال
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"لا يوجد اتصال قراءة متاح خلال {self.timeout} ثانية")
+                    try:
+                        reader = self._idle.get(timeout=remaining)
+                    except queue.Empty:
+                        continue
+            if reader.is_healthy():
+                return reader
+            # اتصال تالف: إغلاقه وإفساح مكانه لاتصال جديد
+            self._discard(reader)
+
+    def _create(self):
+        with self._lock:
+            if self._created >= self.max_readers:
+                return None
+            self._created += 1
+        try:
+            return ReadConnection(self.db_path, self.configure_reader)
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _release(self, reader):
+        if self._closed:
+            self._discard(reader)
+        else:
+            self._idle.put(reader)
+
+    def _discard(self, reader):
+        try:
+            reader.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    def stats(self):
+        """عدد اتصالات القراءة المفتوحة والمتاحة حالياً"""
+        return {'readers': self._created, 'idle': self._idle.qsize(), 'max_readers': self.max_readers}
+
+    def close(self):
+        """إغلاق اتصالات القراءة المتاحة ثم الكاتب (المعارة تُغلق عند إعادتها)"""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        with self.write_lock:
+            self.writer.close()
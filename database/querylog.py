@@ -0,0 +1,184 @@
+# سجل الاستعلامات البطيئة (اختياري): تفعيله بتحديد حد زمني بالميلي ثانية
+# - لكل بصمة استعلام: عدد الاستدعاءات وآخر الأزمنة لحساب p50/p95/p99
+# - الاستعلام الذي يتجاوز الحد أو يمسح جدولاً كاملاً يُسجَّل مع خطة تنفيذه (EXPLAIN QUERY PLAN)
+# - السجل ملف JSON lines محلي يدور عند بلوغ حجمه الأقصى، ويلخصه أمر slow-queries في maintenance
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from utils.perf import percentile
+
+
+# مسح جدول كامل في خطة التنفيذ (لا يشمل المسح عبر فهرس أو الجداول الافتراضية كفهرس البحث)
+_FULL_SCAN_RE = re.compile(r"^SCAN (?!CONSTANT ROW)(\w+)(?!.*\b(?:USING|VIRTUAL TABLE)\b)")
+
+# عدد الأزمنة الأخيرة المحفوظة لكل بصمة لحساب المئينات
+_SAMPLES = 1000
+
+
+def percentiles(durations, fractions=(0.5, 0.95, 0.99)):
+    """المئينات (أقرب رتبة) من قائمة أزمنة غير مرتبة"""
+    values = sorted(durations)
+    return [percentile(values, fraction) for fraction in fractions]
+
+
+def full_scans(plan):
+    """الجداول الممسوحة بالكامل في خطة تنفيذ [(id, parent, notused, detail)]"""
+    scans = []
+    for row in plan:
+        match = _FULL_SCAN_RE.match(row[3])
+        if match:
+            scans.append(match.group(1))
+    return scans
+
+
+def log_files(path):
+    """ملف السجل الحالي وملفاته المدوّرة (الأقدم أولاً)"""
+    files = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        files.append(f"{path}.{index}")
+        index += 1
+    files.reverse()
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+class SlowQueryLog:
+    """إحصائيات الاستعلامات حسب البصمة وتسجيل البطيء منها أو الماسح لجداول كاملة"""
+
+    def __init__(self, db, path, threshold_ms=100, max_bytes=1024 * 1024, backups=3):
+        self.db = db
+        self.path = path
+        self.threshold_ms = threshold_ms
+        # البصمة -> {'count', 'samples', 'max_ms', 'plan', 'scans'}
+        self.stats = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(f"supermarket.slow_queries.{id(self)}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self._handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+        self._handler.setFormatter(logging.Formatter('%(message)s'))
+        self.logger.addHandler(self._handler)
+
+    def observe(self, operation, query, params, fingerprint, rows, seconds):
+        """تسجيل استدعاء استعلام (من DatabaseManager بعد تنفيذه)"""
+        ms = seconds * 1000
+        with self._lock:
+            entry = self.stats.get(fingerprint)
+            first = entry is None
+            if first:
+                entry = self.stats[fingerprint] = {
+                    'count': 0, 'samples': deque(maxlen=_SAMPLES), 'max_ms': 0, 'plan': None, 'scans': [],
+                }
+            entry['count'] += 1
+            entry['samples'].append(ms)
+            entry['max_ms'] = max(entry['max_ms'], ms)
+
+        slow = ms >= self.threshold_ms
+        # الخطة تُحسب مرة واحدة لكل بصمة: عند أول ظهور (لكشف المسح الكامل) أو أول بطء
+        if (first or slow) and entry['plan'] is None:
+            plan = self.explain(query, params)
+            if plan is not None:
+                entry['plan'] = [row[3] for row in plan]
+                entry['scans'] = full_scans(plan)
+            if first and entry['scans'] and not slow:
+                self.write('scan', operation, fingerprint, ms, rows, entry)
+        if slow:
+            self.write('slow', operation, fingerprint, ms, rows, entry)
+
+    def explain(self, query, params):
+        """خطة تنفيذ الاستعلام بالمعاملات نفسها (None إن تعذر حسابها)"""
+        if params is None and '?' in query:
+            return None
+        try:
+            with self.db._reading() as connection:
+                return connection.execute(f"EXPLAIN QUERY PLAN {query}", params or ()).fetchall()
+        except Exception:
+            return None
+
+    def write(self, event, operation, fingerprint, ms, rows, entry):
+        self.logger.info(json.dumps({
+            'at': datetime.now().isoformat(timespec='milliseconds'),
+            'event': event,
+            'op': operation,
+            'fingerprint': fingerprint,
+            'ms': round(ms, 3),
+            'rows': rows,
+            'threshold_ms': self.threshold_ms,
+            'scans': entry['scans'],
+            'plan': entry['plan'],
+        }, ensure_ascii=False))
+
+    def summary(self):
+        """إحصائيات كل بصمة منذ بدء التشغيل، الأبطأ (p95) أولاً"""
+        with self._lock:
+            items = [(fingerprint, entry['count'], list(entry['samples']), entry['max_ms'], list(entry['scans']))
+                     for fingerprint, entry in self.stats.items()]
+        rows = []
+        for fingerprint, count, samples, max_ms, scans in items:
+            p50, p95, p99 = percentiles(samples)
+            rows.append({
+                'fingerprint': fingerprint, 'count': count,
+                'p50_ms': round(p50, 3), 'p95_ms': round(p95, 3), 'p99_ms': round(p99, 3),
+                'max_ms': round(max_ms, 3), 'scans': scans,
+            })
+        rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+        return rows
+
+    def close(self):
+        """كتابة إحصائيات الجلسة في السجل ثم إغلاقه"""
+        rows = self.summary()
+        if rows:
+            self.logger.info(json.dumps({
+                'at': datetime.now().isoformat(timespec='milliseconds'),
+                'event': 'stats',
+                'threshold_ms': self.threshold_ms,
+                'queries': rows,
+            }, ensure_ascii=False))
+        self.logger.removeHandler(self._handler)
+        self._handler.close()
+
+
+def summarize_log(path, top=20):
+    """تلخيص ملفات السجل: الاستعلامات البطيئة والماسحة وآخر إحصائيات مسجلة لكل بصمة"""
+    slow = {}
+    latest_stats = {}
+    for file_path in log_files(path):
+        with open(file_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('event') == 'stats':
+                    for row in record.get('queries', []):
+                        latest_stats[row['fingerprint']] = row
+                    continue
+                entry = slow.setdefault(record['fingerprint'], {
+                    'slow': 0, 'durations': [], 'scans': [], 'plan': None, 'last_at': None,
+                })
+                if record.get('event') == 'slow':
+                    entry['slow'] += 1
+                    entry['durations'].append(record['ms'])
+                entry['scans'] = record.get('scans') or entry['scans']
+                entry['plan'] = record.get('plan') or entry['plan']
+                entry['last_at'] = record.get('at')
+
+    rows = []
+    for fingerprint, entry in slow.items():
+        p50, p95, p99 = percentiles(entry['durations'])
+        rows.append({
+            'fingerprint': fingerprint, 'slow': entry['slow'],
+            'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+            'max_ms': max(entry['durations'], default=0),
+            'scans': entry['scans'], 'plan': entry['plan'], 'last_at': entry['last_at'],
+            'stats': latest_stats.get(fingerprint),
+        })
+    rows.sort(key=lambda row: (row['slow'], row['p95_ms']), reverse=True)
+    return rows[:top], latest_stats
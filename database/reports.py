@@ -0,0 +1,193 @@
+# جمع بيانات التقارير بدون واجهة
+# كل دالة تأخذ قارئاً يوفر fetch_all/fetch_one فتعمل في خيط عامل باتصال مستقل،
+# وتُرجع البيانات الجاهزة للعرض فقط دون إنشاء أي عنصر Tk
+import threading
+from collections import OrderedDict
+from database.db_manager import day_bounds, rollup_totals, daily_series
+
+
+def sales_report(reader, from_date, to_date):
+    """مجاميع المبيعات وسلسلتها اليومية وتفاصيلها"""
+    start, end = day_bounds(from_date, to_date)
+    totals = rollup_totals(reader, from_date, to_date)
+    if not totals['sales_count']:
+        return {'totals': totals, 'daily': [], 'rows': []}
+    return {
+        'totals': totals,
+        'daily': daily_series(reader, from_date, to_date, 'revenue_syp'),
+        'rows': reader.fetch_all("""
+            SELECT id, total_syp, total_usd, payment_method, sale_date
+            FROM sales WHERE sale_date >= ? AND sale_date < ? ORDER BY id DESC
+        """, (start, end)),
+    }
+
+
+def purchases_report(reader, from_date, to_date):
+    """مجاميع المشتريات وتفاصيلها مع اسم المورد"""
+    start, end = day_bounds(from_date, to_date)
+    totals = rollup_totals(reader, from_date, to_date)
+    if not totals['purchases_count']:
+        return {'totals': totals, 'rows': []}
+    return {
+        'totals': totals,
+        'rows': reader.fetch_all("""
+            SELECT p.id, COALESCE(s.name, 'غير محدد'), p.total_syp, p.total_usd, p.purchase_date
+            FROM purchases p
+            LEFT JOIN suppliers s ON p.supplier_id = s.id
+            WHERE p.purchase_date >= ? AND p.purchase_date < ?
+            ORDER BY p.id DESC
+        """, (start, end)),
+    }
+
+
+def expenses_report(reader, from_date, to_date):
+    """مجاميع المصروفات وتوزيعها حسب الفئة"""
+    start, end = day_bounds(from_date, to_date)
+    totals = rollup_totals(reader, from_date, to_date)
+    if not totals['expenses_count']:
+        return {'totals': totals, 'rows': []}
+    return {
+        'totals': totals,
+        'rows': reader.fetch_all("""
+            SELECT category, COUNT(*), SUM(amount_syp), SUM(amount_usd)
+            FROM expenses
+            WHERE expense_date >= ? AND expense_date < ?
+            GROUP BY category
+            ORDER BY SUM(amount_syp) DESC
+        """, (start, end)),
+    }
+
+
+def profit_report(reader, from_date, to_date):
+    """الإيرادات وتكلفة البضاعة والمصروفات من الملخصات اليومية"""
+    return {'totals': rollup_totals(reader, from_date, to_date)}
+
+
+def top_products_report(reader, from_date, to_date, limit=50):
+    """أكثر المنتجات مبيعاً بالكمية"""
+    start, end = day_bounds(from_date, to_date)
+    return {
+        'rows': reader.fetch_all("""
+            SELECT si.product_name, SUM(si.quantity), SUM(si.subtotal_syp), SUM(si.subtotal_usd)
+            FROM sale_items si
+            JOIN sales s ON si.sale_id = s.id
+            WHERE s.sale_date >= ? AND s.sale_date < ?
+            GROUP BY si.product_name
+            ORDER BY SUM(si.quantity) DESC
+            LIMIT ?
+        """, (start, end, limit)),
+    }
+
+
+def suppliers_report(reader, from_date=None, to_date=None):
+    """الموردون مع عدد مشترياتهم وديونهم (لا يعتمد على الفترة)"""
+    return {
+        'rows': reader.fetch_all("""
+            SELECT s.name, COUNT(p.id), s.debt_syp, s.debt_usd, s.phone
+            FROM suppliers s
+            LEFT JOIN purchases p ON s.id = p.supplier_id
+            GROUP BY s.id
+            ORDER BY s.debt_syp DESC
+        """),
+    }
+
+
+# نوع التقرير -> دالة جمع بياناته
+REPORT_BUILDERS = {
+    'sales': sales_report,
+    'purchases': purchases_report,
+    'expenses': expenses_report,
+    'profit': profit_report,
+    'top_products': top_products_report,
+    'suppliers': suppliers_report,
+}
+
+def row_count(data):
+    """عدد الصفوف في نتيجة تقرير (مجموع قوائمها) لتقدير حجمها في الذاكرة"""
+    return sum(len(value) for value in data.values() if isinstance(value, list))
+
+
+# تقارير لا تعتمد على الفترة -> الجداول التي يبطلها تغيرها
+_UNDATED_REPORTS = {
+    'suppliers': {'suppliers', 'purchases'},
+}
+
+
+class ReportCache:
+    """ذاكرة نتائج التقارير حسب (النوع، الفترة الموحدة)
+
+    كل عملية كتابة تمس الملخصات اليومية تُبلغ عن الأيام التي غيرتها، فلا يُبطَل إلا ما تشمل فترته
+    أحد هذه الأيام: الأيام الماضية المغلقة تبقى صالحة ما دام لم يُسجَّل فيها شيء بأثر رجعي.
+    الحجم محدود بعدد النتائج (size) وبمجموع صفوفها (max_rows): تقرير مبيعات سنة قد يحمل مئات آلاف الصفوف،
+    فتُطرد الأقدم استخداماً حتى يعود المجموع تحت الحد، والنتيجة الأكبر من الحد وحدها لا تُخزن.
+    """
+
+    def __init__(self, db, size=64, max_rows=200000):
+        self.size = size
+        self.max_rows = max_rows
+        self._entries = OrderedDict()
+        # المفتاح -> عدد صفوف نتيجته، ومجموعها
+        self._sizes = {}
+        self.rows = 0
+        self._lock = threading.Lock()
+        # يزداد مع كل إبطال: النتيجة المحسوبة قبل تغيير لا تُخزن بعده
+        self.generation = 0
+        db.subscribe_rows(self._on_rows_changed)
+        db.subscribe(self._on_tables_changed)
+
+    @staticmethod
+    def key(report, from_date=None, to_date=None):
+        """مفتاح موحد: (النوع، أول يوم، اليوم التالي لآخر يوم)"""
+        if report in _UNDATED_REPORTS:
+            return (report, None, None)
+        start, end = day_bounds(from_date, to_date)
+        return (report, start, end)
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data, generation=None):
+        """تخزين نتيجة (تُتجاهل إن حدث إبطال منذ generation الذي بدأ عنده الحساب)"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            rows = row_count(data)
+            self._discard(key)
+            if rows > self.max_rows:
+                return
+            self._entries[key] = data
+            self._sizes[key] = rows
+            self.rows += rows
+            while len(self._entries) > self.size or self.rows > self.max_rows:
+                self._discard(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.rows = 0
+            self.generation += 1
+
+    def _discard(self, key):
+        if self._entries.pop(key, None) is not None:
+            self.rows -= self._sizes.pop(key)
+
+    def _invalidate(self, predicate):
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._entries if predicate(key)]:
+                self._discard(key)
+
+    def _on_rows_changed(self, rows):
+        days = rows.get('daily_rollups')
+        if days:
+            self._invalidate(lambda key: key[1] is not None and any(key[1] <= day < key[2] for day in days))
+
+    def _on_tables_changed(self, tables):
+        stale = {report for report, dependent in _UNDATED_REPORTS.items() if tables & dependent}
+        if stale:
+            self._invalidate(lambda key: key[0] in stale)
@@ -0,0 +1,125 @@
+# توحيد النص العربي لفهرس البحث (FTS5) وبناء استعلامات المطابقة
+# يُطبَّق التوحيد نفسه على النص المفهرس وعلى ما يكتبه المستخدم فتتطابق الصيغ المختلفة للكلمة
+import re
+import threading
+from collections import OrderedDict
+
+
+# أحرف التشكيل والتطويل التي تُحذف
+_DIACRITICS = [chr(c) for c in range(0x064B, 0x0660)] + ['ٰ', 'ـ']
+
+_NORMALIZE_TABLE = str.maketrans({
+    **{c: None for c in _DIACRITICS},
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه',
+    'ى': 'ي',
+    'ؤ': 'و',
+    'ئ': 'ي',
+    **{chr(0x0660 + d): str(d) for d in range(10)},
+})
+
+# حدود الكلمات كما في مقسّم unicode61 (الشرطة السفلية فاصل أيضاً)
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def normalize_arabic(text):
+    """توحيد الهمزات والألف والتاء المربوطة والألف المقصورة وحذف التشكيل"""
+    if not text:
+        return ''
+    return str(text).translate(_NORMALIZE_TABLE).casefold()
+
+
+def tokenize(text):
+    """كلمات النص بعد التوحيد"""
+    return _TOKEN_RE.findall(normalize_arabic(text))
+
+
+def build_match_query(term, columns=None):
+    """تحويل نص البحث إلى استعلام FTS5: كل كلمة بادئة مطلوبة (AND)، أو None إن لم توجد كلمات"""
+    tokens = tokenize(term)
+    if not tokens:
+        return None
+    query = ' '.join(f'"{token}"*' for token in tokens)
+    if columns:
+        query = f"{{{' '.join(columns)}}} : ({query})"
+    return query
+
+
+def matches_tokens(query_tokens, text_tokens):
+    """هل كل كلمة من البحث بادئة لكلمة من النص (نفس دلالة استعلام FTS5)"""
+    return all(any(t.startswith(q) for t in text_tokens) for q in query_tokens)
+
+
+class ProductSearcher:
+    """بحث المنتجات مع ذاكرة LRU للنتائج وتضييق نتيجة البادئة السابقة بدلاً من استعلام جديد"""
+
+    # أكبر نتيجة سابقة يُضيَّق منها في الذاكرة (ما فوقها أسرع عبر الفهرس)
+    NARROW_LIMIT = 300
+
+    def __init__(self, db, size=128):
+        self.db = db
+        self.size = size
+        self._cache = OrderedDict()
+        # البحث يُستدعى من عدة خيوط (خيوط الخادم) فالقراءة والتعديل والمرور على الذاكرة تحت القفل
+        self._lock = threading.Lock()
+        self._text_version = None
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def search(self, term, limit=None, include_category=False):
+        """معرفات المنتجات المطابقة مرتبة حسب الصلة"""
+        catalog = self.db.catalog
+        catalog.ensure_loaded()
+        normalized = ' '.join(tokenize(term))
+        if not normalized:
+            return []
+        key = (normalized, limit, include_category)
+        with self._lock:
+            # تغير أسماء المنتجات أو الفئات يبطل النتائج المخزنة (تغير الكميات لا يؤثر)
+            if self._text_version != catalog.text_version:
+                self._cache.clear()
+                self._text_version = catalog.text_version
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return list(cached[0])
+
+        ids = self._narrow(normalized, limit, include_category)
+        if ids is not None:
+            complete = True
+        else:
+            ids, complete = self.db.query_product_ids(normalized, limit, include_category)
+        with self._lock:
+            self._cache[key] = (ids, complete)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+        return list(ids)
+
+    def _narrow(self, normalized, limit, include_category):
+        """تصفية نتيجة أطول بادئة مخزنة كاملة (غير مقطوعة) بدلاً من الاستعلام"""
+        best = None
+        with self._lock:
+            for (prefix, cached_limit, cached_category), (ids, complete) in self._cache.items():
+                if (complete and cached_limit == limit and cached_category == include_category
+                        and normalized.startswith(prefix) and len(ids) <= self.NARROW_LIMIT
+                        and (best is None or len(prefix) > len(best[0]))):
+                    best = (prefix, ids)
+        if best is None:
+            return None
+
+        query_tokens = normalized.split()
+        catalog = self.db.catalog
+        result = []
+        for product_id in best[1]:
+            record = catalog.get(product_id)
+            if record is None:
+                continue
+            text = record.name
+            if include_category and record.category_id is not None:
+                text += ' ' + record.category
+            if matches_tokens(query_tokens, tokenize(text)):
+                result.append(product_id)
+        return result
@@ -0,0 +1,148 @@
+# تنفيذ استعلامات القراءة في خيوط عاملة بعيداً عن حلقة Tk الرئيسية
+# - كل مهمة تستعير اتصال قراءة فقط من مجمع الاتصالات (WAL يسمح بالقراءة بالتوازي مع الكاتب)
+# - النتائج تُجمع في طابور وتُسلَّم إلى دوالها في خيط الواجهة عبر root.after
+# - المهمة الملغاة لا تُسلَّم نتيجتها، ويُقاطَع استعلامها الجاري إن وُجد
+import queue
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskCancelled(Exception):
+    """تُرفع داخل المهمة عند الإبلاغ عن التقدم بعد إلغائها"""
+
+
+class Task:
+    """مهمة مرسلة إلى المنفذ: يمكن إلغاؤها من خيط الواجهة في أي وقت"""
+
+    def __init__(self):
+        self.cancelled = False
+        self.future = None
+        # اتصال القراءة ما دامت المهمة تملكه: يُفك تحت القفل قبل إعادته إلى المجمع
+        # فلا يقاطع الإلغاءُ استعلامَ مهمة أخرى استعارت الاتصال نفسه بعدها
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """إلغاء المهمة: لا تبدأ إن كانت في الانتظار، ويُقاطع استعلامها إن كانت تعمل"""
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+        with self._lock:
+            if self._reader is not None:
+                self._reader.interrupt()
+
+    def _attach(self, reader):
+        with self._lock:
+            self._reader = reader
+
+    def _detach(self):
+        with self._lock:
+            self._reader = None
+
+    @property
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+class QueryExecutor:
+    """مجمع خيوط للاستعلامات الطويلة يعيد النتائج إلى خيط الواجهة"""
+
+    def __init__(self, pool, max_workers=2, poll_interval=25):
+        # pool: مجمع الاتصالات (ConnectionPool) الذي تُستعار منه اتصالات القراءة
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='db-reader')
+        self._results = queue.Queue()
+        self._tasks = set()
+        self._root = None
+        self._polling = False
+
+    def attach(self, root):
+        """ربط المنفذ بنافذة Tk لتسليم النتائج تلقائياً عبر root.after"""
+        self._root = root
+        if self._tasks:
+            self._schedule_poll()
+
+    # ------------------ الإرسال ------------------
+    def submit(self, fn, *args, on_done=None, on_error=None, on_progress=None):
+        """تشغيل fn(reader, *args) في خيط عامل ثم استدعاء on_done(result) أو on_error(exc) في خيط الواجهة
+
+        مع on_progress تُستدعى fn(reader, *args, progress=دالة) لتبلغ عن تقدمها، فتصل القيمة إلى
+        on_progress(value) في خيط الواجهة، وترفع الدالة TaskCancelled إن أُلغيت المهمة.
+        """
+        task = Task()
+        kwargs = {}
+        if on_progress is not None:
+            def progress(value):
+                if task.cancelled:
+                    raise TaskCancelled()
+                self._results.put((task, on_progress, value, False))
+            kwargs['progress'] = progress
+
+        def run():
+            if task.cancelled:
+                return
+            try:
+                with self.pool.checkout() as reader:
+                    task._attach(reader)
+                    try:
+                        result = fn(reader, *args, **kwargs)
+                    finally:
+                        task._detach()
+            except Exception as e:
+                self._results.put((task, on_error or self._report_error, e, True))
+            else:
+                self._results.put((task, on_done, result, True))
+
+        self._tasks.add(task)
+        task.future = self._threads.submit(run)
+        self._schedule_poll()
+        return task
+
+    # ------------------ التسليم ------------------
+    def poll(self):
+        """تسليم النتائج الجاهزة إلى دوالها (يُستدعى في خيط الواجهة)"""
+        while True:
+            try:
+                task, callback, value, final = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if final:
+                self._tasks.discard(task)
+            if task.cancelled or callback is None:
+                continue
+            try:
+                callback(value)
+            except Exception as e:
+                print(f"خطأ في معالج نتيجة الاستعلام: {e}")
+        # المهام الملغاة قبل بدئها لا تضع شيئاً في الطابور
+        self._tasks = {task for task in self._tasks if not (task.cancelled and task.done)}
+
+    def _schedule_poll(self):
+        if self._root is None or self._polling:
+            return
+        self._polling = True
+        try:
+            self._root.after(self.poll_interval, self._tick)
+        except Exception:
+            # النافذة أُغلقت
+            self._polling = False
+
+    def _tick(self):
+        self._polling = False
+        self.poll()
+        if self._tasks:
+            self._schedule_poll()
+
+    @staticmethod
+    def _report_error(error):
+        if not isinstance(error, sqlite3.OperationalError) or 'interrupted' not in str(error):
+            print(f"خطأ في جلب البيانات: {error}")
+
+    def shutdown(self):
+        """إلغاء المهام وإيقاف الخيوط"""
+        for task in list(self._tasks):
+            task.cancel()
+        self._threads.shutdown(wait=True, cancel_futures=True)
+        self._tasks.clear()
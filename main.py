@@ -1,35 +1,71 @@
+import time
+STARTED = time.perf_counter()
+import argparse
+import os
 import tkinter as tk
 from tkinter import ttk, messagebox
-import ttkbootstrap as ttkb
-from ttkbootstrap.constants import *
-from database.db_manager import DatabaseManager
-from ui.dashboard_ui import DashboardUI
-from ui.categories_ui import CategoriesUI
-from ui.products_ui import ProductsUI
-from ui.suppliers_ui import SuppliersUI
-from ui.sales_ui import SalesUI
-from ui.purchases_ui import PurchasesUI
-from ui.expenses_ui import ExpensesUI
-from ui.inventory_ui import InventoryUI
-from ui.reports_ui import ReportsUI
-from ui.about_ui import AboutUI
+from utils.imports import lazy_import, import_attr, format_import_times
+from utils.perf import PERF
+
+# الشاشات: المفتاح -> (الوحدة، الصنف، الجداول التي يجعل تغيرها الشاشة بحاجة إلى تحديث)
+# وحدة الشاشة (ومكتباتها الثقيلة) تُستورد عند أول عرض لها لا عند بدء التشغيل
+VIEWS = {
+    'dashboard': ('ui.dashboard_ui', 'DashboardUI', {'sales', 'products', 'suppliers', 'daily_rollups'}),
+    'categories': ('ui.categories_ui', 'CategoriesUI', {'categories'}),
+    'products': ('ui.products_ui', 'ProductsUI', {'products', 'categories'}),
+    'suppliers': ('ui.suppliers_ui', 'SuppliersUI', {'suppliers', 'purchases'}),
+    'sales': ('ui.sales_ui', 'SalesUI', {'products'}),
+    'purchases': ('ui.purchases_ui', 'PurchasesUI', {'purchases', 'suppliers', 'products'}),
+    'expenses': ('ui.expenses_ui', 'ExpensesUI', {'expenses'}),
+    'inventory': ('ui.inventory_ui', 'InventoryUI', {'products', 'categories'}),
+    'reports': ('ui.reports_ui', 'ReportsUI', {'sales', 'sale_items', 'purchases', 'expenses', 'suppliers', 'daily_rollups'}),
+    'about': ('ui.about_ui', 'AboutUI', set()),
+    # لوحة الأداء: لا تظهر في القائمة الجانبية (زر ⏱ في الشريط العلوي أو Ctrl+Shift+P)
+    'performance': ('ui.performance_ui', 'PerformanceUI', set()),
+}
+
+# فترة فحص الملف عن تغييرات عمليات أخرى (الخادم ونقاط البيع) بالمللي ثانية
+EXTERNAL_POLL_MS = int(os.environ.get('SUPERMARKET_EXTERNAL_POLL_MS') or 5000)
 
 class SupermarketApp:
-    def __init__(self, root):
+    def __init__(self, root, start_view='dashboard', eager=False, import_times=False):
         self.root = root
+        self.start_view = start_view
+        self.import_times = import_times
         self.root.title("نظام إدارة السوبر ماركت")
         self.root.geometry("1400x800")
         self.root.state('zoomed')  # تكبير النافذة
         
         # إنشاء قاعدة البيانات
-        self.db = DatabaseManager()
+        with PERF.measure('startup', 'database'):
+            self.db = import_attr('database.db_manager', 'DatabaseManager')()
+        # قياس زمن كل استعلام في لوحة الأداء
+        self.db.observe_queries(PERF.on_query)
+        # تسليم نتائج الاستعلامات المنفذة في الخيوط العاملة عبر حلقة Tk
+        self.db.executor.attach(self.root)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # متغيرات التحكم
         self.sidebar_expanded = True
         self.current_theme = "cosmo"
         
+        # الشاشات المبنية: تُبنى مرة واحدة ثم تُخفى وتُظهر عند التنقل
+        self.views = {}
+        self.view_frames = {}
+        self.stale_views = set()
+        self.current_view = None
+        self.db.subscribe(self.on_data_change)
+        
+        # وضع البدء الكامل: استيراد كل الشاشات مسبقاً (أبطأ في البدء، أسرع في أول تنقل)
+        if eager:
+            for module, _, _ in VIEWS.values():
+                lazy_import(module)
+        
         # إعداد الواجهة
-        self.setup_ui()
+        with PERF.measure('startup', 'ui'):
+            self.setup_ui()
+        self.root.after_idle(self.on_ready)
+        self.root.after(EXTERNAL_POLL_MS, self.poll_external_changes)
         
     def setup_ui(self):
         """إعداد الواجهة الرئيسية"""
@@ -46,8 +82,8 @@ class SupermarketApp:
         # القائمة الجانبية
         self.setup_sidebar(main_frame)
         
-        # عرض لوحة التحكم افتراضياً
-        self.show_dashboard()
+        # عرض شاشة البدء (لوحة التحكم افتراضياً)
+        self.show_view(self.start_view)
     
     def setup_top_bar(self, parent):
         """إعداد شريط الأدوات العلوي"""
@@ -97,6 +133,17 @@ class SupermarketApp:
             width=3
         )
         refresh_btn.pack(side='left', padx=5)
+        
+        # زر لوحة الأداء
+        perf_btn = ttk.Button(
+            control_frame,
+            text="⏱",
+            command=self.show_performance,
+            style='primary.TButton',
+            width=3
+        )
+        perf_btn.pack(side='left', padx=5)
+        self.root.bind_all('<Control-Shift-P>', lambda event: self.show_performance())
     
     def setup_sidebar(self, parent):
         """إعداد القائمة الجانبية القابلة للطي"""
@@ -228,87 +275,167 @@ class SupermarketApp:
     
     def refresh_app(self):
         """تحديث التطبيق"""
-        current_method = getattr(self, 'current_method', None)
-        if current_method:
-            current_method()
+        view = self.views.get(self.current_view)
+        if view is not None and hasattr(view, 'refresh'):
+            view.refresh()
         messagebox.showinfo("تحديث", "تم تحديث البيانات بنجاح")
     
-    def clear_content(self):
-        """مسح المحتوى الحالي"""
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+    def on_data_change(self, tables):
+        """تعليم الشاشات المخفية التي تعتمد على الجداول المتغيرة بأنها بحاجة إلى تحديث"""
+        for key in self.views:
+            if key != self.current_view and VIEWS[key][2] & tables:
+                self.stale_views.add(key)
+    
+    def sync_external_changes(self):
+        """التقاط ما ثبّتته عمليات أخرى على الملف: تعليم الشاشات المخفية بأنها بحاجة إلى تحديث
+        وتحديث الشاشة الحالية (الكتالوج يُعاد تحميله ويُشعر مشتركيه داخل sync_external_changes)"""
+        if not self.db.sync_external_changes():
+            return False
+        self.stale_views.update(key for key in self.views if key != self.current_view)
+        view = self.views.get(self.current_view)
+        if view is not None and hasattr(view, 'refresh'):
+            view.refresh()
+        return True
+    
+    def poll_external_changes(self):
+        """فحص دوري للتغييرات الخارجية من حلقة Tk"""
+        try:
+            self.sync_external_changes()
+        except Exception as e:
+            print(f"خطأ في فحص التغييرات الخارجية: {e}")
+        self.root.after(EXTERNAL_POLL_MS, self.poll_external_changes)
+    
+    def show_view(self, key):
+        """عرض شاشة: تُبنى عند أول طلب ثم يُعاد استخدامها"""
+        if key == self.current_view:
+            return
+        # الشاشة المعروضة بعد كتابة خارجية لا تنتظر الفحص الدوري التالي
+        if self.db.sync_external_changes():
+            self.stale_views.update(self.views)
+        start = time.perf_counter()
+        first = key not in self.views
+        
+        # إخفاء الشاشة الحالية
+        current = self.views.get(self.current_view)
+        if current is not None:
+            if hasattr(current, 'on_hide'):
+                current.on_hide()
+            self.view_frames[self.current_view].pack_forget()
+        
+        self.current_view = key
+        if key not in self.views:
+            frame = ttk.Frame(self.content_frame)
+            self.view_frames[key] = frame
+            frame.pack(fill='both', expand=True)
+            module, class_name, _ = VIEWS[key]
+            self.views[key] = import_attr(module, class_name)(frame, self.db)
+            self.stale_views.discard(key)
+        else:
+            self.view_frames[key].pack(fill='both', expand=True)
+            view = self.views[key]
+            if key in self.stale_views:
+                self.stale_views.discard(key)
+                if hasattr(view, 'refresh'):
+                    view.refresh()
+            if hasattr(view, 'on_show'):
+                view.on_show()
+        
+        # زمن البناء وزمن الوصول إلى أول خمول (بعد تنفيذ ما جدولته الشاشة وحساب التخطيط)
+        build = time.perf_counter() - start
+        self.root.after_idle(lambda: PERF.record(
+            'navigation', key, time.perf_counter() - start, build_ms=round(build * 1000, 3), first=first
+        ))
     
     def show_dashboard(self):
         """عرض لوحة التحكم"""
-        self.clear_content()
-        self.current_method = self.show_dashboard
-        DashboardUI(self.content_frame, self.db)
+        self.show_view('dashboard')
     
     def show_categories(self):
         """عرض إدارة الفئات"""
-        self.clear_content()
-        self.current_method = self.show_categories
-        CategoriesUI(self.content_frame, self.db)
+        self.show_view('categories')
     
     def show_products(self):
         """عرض إدارة المنتجات"""
-        self.clear_content()
-        self.current_method = self.show_products
-        ProductsUI(self.content_frame, self.db)
+        self.show_view('products')
     
     def show_suppliers(self):
         """عرض إدارة الموردين"""
-        self.clear_content()
-        self.current_method = self.show_suppliers
-        SuppliersUI(self.content_frame, self.db)
+        self.show_view('suppliers')
     
     def show_sales(self):
         """عرض نقطة البيع"""
-        self.clear_content()
-        self.current_method = self.show_sales
-        SalesUI(self.content_frame, self.db)
+        self.show_view('sales')
     
     def show_purchases(self):
         """عرض إدارة المشتريات"""
-        self.clear_content()
-        self.current_method = self.show_purchases
-        PurchasesUI(self.content_frame, self.db)
+        self.show_view('purchases')
     
     def show_expenses(self):
         """عرض إدارة المصروفات"""
-        self.clear_content()
-        self.current_method = self.show_expenses
-        ExpensesUI(self.content_frame, self.db)
+        self.show_view('expenses')
     
     def show_inventory(self):
         """عرض المخزون"""
-        self.clear_content()
-        self.current_method = self.show_inventory
-        InventoryUI(self.content_frame, self.db)
+        self.show_view('inventory')
     
     def show_reports(self):
         """عرض التقارير"""
-        self.clear_content()
-        self.current_method = self.show_reports
-        ReportsUI(self.content_frame, self.db)
+        self.show_view('reports')
     
     def show_about(self):
         """عرض حول البرنامج"""
-        self.clear_content()
-        self.current_method = self.show_about
-        AboutUI(self.content_frame, self.db)
+        self.show_view('about')
+    
+    def show_performance(self):
+        """عرض لوحة الأداء"""
+        self.show_view('performance')
+    
+    def on_ready(self):
+        """عند أول خمول لحلقة Tk (النافذة جاهزة للاستخدام): عرض زمن البدء وتوزيع الاستيراد"""
+        PERF.record('startup', 'ready', time.perf_counter() - STARTED)
+        if self.import_times:
+            print(f"جاهز خلال {time.perf_counter() - STARTED:.2f} ثانية من بدء التشغيل")
+            print(format_import_times())
+    
+    def on_close(self):
+        """إيقاف الخيوط العاملة وإغلاق قاعدة البيانات ثم إغلاق النافذة"""
+        if self.import_times:
+            print("أزمنة الاستيراد حتى الإغلاق:")
+            print(format_import_times())
+        self.db.close()
+        self.root.destroy()
     
     def run(self):
         """تشغيل التطبيق"""
         self.root.mainloop()
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="نظام إدارة السوبر ماركت")
+    parser.add_argument('--view', choices=sorted(VIEWS),
+                        default=os.environ.get('SUPERMARKET_START_VIEW', 'dashboard'),
+                        help="الشاشة المعروضة عند البدء (sales لأجهزة نقاط البيع)")
+    parser.add_argument('--eager', action='store_true',
+                        help="استيراد كل الشاشات عند البدء بدلاً من عند أول عرض")
+    parser.add_argument('--import-times', action='store_true',
+                        default=bool(os.environ.get('SUPERMARKET_IMPORT_TIMES')),
+                        help="طباعة زمن البدء وتوزيع أزمنة الاستيراد")
+    args = parser.parse_args(argv)
+    if args.view not in VIEWS:
+        args.view = 'dashboard'
+    return args
+
+
 if __name__ == "__main__":
-    root = ttkb.Window(themename="cosmo")
+    args = parse_args()
+    PERF.record('startup', 'imports', time.perf_counter() - STARTED)
+    with PERF.measure('startup', 'window'):
+        ttkb = lazy_import('ttkbootstrap')
+        root = ttkb.Window(themename="cosmo")
     
     # تفعيل دعم RTL (من اليمين إلى اليسار) للغة العربية
     root.option_add('*TButton*justify', 'right')
     root.option_add('*TLabel*justify', 'right')
     root.option_add('*TEntry*justify', 'right')
     
-    app = SupermarketApp(root)
+    app = SupermarketApp(root, args.view, args.eager, args.import_times)
     app.run()
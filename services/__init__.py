@@ -0,0 +1,21 @@
+# Services Package
+# منطق العمليات (البيع، المشتريات، المخزون، التقارير، الكتالوج) بواجهات Python عادية فوق DatabaseManager
+# - بدون أي عنصر Tk: تستدعيها الشاشات، وتعمل في خيوط عاملة ومن أدوات القياس والخادم
+# - أخطاء المدخلات ترفع ValueError برسالة جاهزة للعرض، وفشل الحفظ يُرجع None/False كما في DatabaseManager
+from services.catalog import CatalogService
+from services.sales import SalesService
+from services.purchasing import PurchasingService
+from services.inventory import InventoryService
+from services.reporting import ReportingService
+
+
+class Services:
+    """كل الخدمات فوق DatabaseManager واحد"""
+
+    def __init__(self, db):
+        self.db = db
+        self.catalog = CatalogService(db)
+        self.sales = SalesService(db)
+        self.purchasing = PurchasingService(db)
+        self.inventory = InventoryService(db)
+        self.reporting = ReportingService(db)
@@ -0,0 +1,143 @@
+# خدمة الكتالوج: الفئات والمنتجات والباركود والبحث
+
+
+# أعمدة المنتج القابلة للتعديل بترتيب نموذج الإضافة/التعديل
+PRODUCT_FIELDS = ('name', 'category_id', 'purchase_price_syp', 'purchase_price_usd',
+                  'selling_price_syp', 'selling_price_usd', 'quantity', 'min_quantity',
+                  'unit', 'description', 'barcode')
+
+# عناوين عمود الباركود المعروفة في ملفات الاستيراد
+_BARCODE_HEADERS = ('barcode', 'الباركود', 'باركود')
+
+
+class CatalogService:
+    def __init__(self, db):
+        self.db = db
+        self.catalog = db.catalog
+
+    # ------------------ الفئات ------------------
+    def categories(self):
+        """كل الفئات (الأحدث أولاً)"""
+        return self.db.fetch_all("SELECT * FROM categories ORDER BY id DESC")
+
+    def category_choices(self):
+        """اسم الفئة -> رقمها (لقوائم الاختيار)"""
+        return {row[1]: row[0] for row in self.db.fetch_all("SELECT id, name FROM categories")}
+
+    def add_category(self, name, description=''):
+        name = (name or '').strip()
+        if not name:
+            raise ValueError("يرجى إدخال اسم الفئة")
+        return self.db.execute_query(
+            "INSERT INTO categories (name, description) VALUES (?, ?)",
+            (name, (description or '').strip())
+        )
+
+    def update_category(self, category_id, name, description=''):
+        name = (name or '').strip()
+        if not name:
+            raise ValueError("يرجى إدخال اسم الفئة")
+        return self.db.execute_query(
+            "UPDATE categories SET name = ?, description = ? WHERE id = ?",
+            (name, (description or '').strip(), category_id)
+        )
+
+    def delete_category(self, category_id):
+        return self.db.execute_query("DELETE FROM categories WHERE id = ?", (category_id,))
+
+    # ------------------ المنتجات ------------------
+    def product(self, product_id):
+        """بيانات منتج من القاعدة بترتيب (id,) + PRODUCT_FIELDS أو None"""
+        return self.db.fetch_one(
+            f"SELECT id, {', '.join(PRODUCT_FIELDS)} FROM products WHERE id = ?",
+            (product_id,)
+        )
+
+    def get(self, product_id):
+        """سجل المنتج من الكتالوج في الذاكرة"""
+        return self.catalog.get(product_id)
+
+    def find_by_barcode(self, barcode):
+        return self.catalog.find_by_barcode(barcode)
+
+    def search(self, term, limit=None, include_category=False):
+        """معرفات المنتجات المطابقة مرتبة حسب الصلة"""
+        return self.db.search_product_ids(term, limit=limit, include_category=include_category)
+
+    def save_product(self, data, product_id=None):
+        """إضافة منتج (product_id=None) أو تعديله من قاموس بمفاتيح PRODUCT_FIELDS وإرجاع True/False
+
+        الكمية الابتدائية أو فرق تعديلها يُسجَّل حركة مخزون (مع طبقة التكلفة) عبر adjust_stock.
+        يرفع ValueError إن كان الاسم فارغاً أو الباركود مستخدماً لمنتج آخر.
+        """
+        values = {field: data.get(field) for field in PRODUCT_FIELDS}
+        values['name'] = (values['name'] or '').strip()
+        values['barcode'] = (values['barcode'] or '').strip() or None
+        values['description'] = (values['description'] or '').strip()
+        if not values['name']:
+            raise ValueError("يرجى إدخال اسم المنتج")
+        if values['barcode']:
+            owner = self.find_by_barcode(values['barcode'])
+            if owner and owner.id != product_id:
+                raise ValueError(f"الباركود مستخدم للمنتج: {owner.name}")
+
+        # الكمية لا تُكتب مباشرة: الفرق يمر بحركة مخزون فتبقى طبقات التكلفة مطابقة للكمية
+        quantity = float(values.pop('quantity') or 0)
+        fields = tuple(values)
+        params = tuple(values.values())
+        try:
+            with self.db.transaction():
+                if product_id:
+                    current = self.db.fetch_one("SELECT COALESCE(quantity, 0) FROM products WHERE id = ?", (product_id,))
+                    if current is None:
+                        raise RuntimeError(f"منتج غير موجود: {product_id}")
+                    assignments = ', '.join(f"{field} = ?" for field in fields)
+                    self.db.execute_query(
+                        f"UPDATE products SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                        params + (product_id,)
+                    )
+                    change, reason = quantity - current[0], 'تعديل الكمية'
+                else:
+                    product_id = self.db.execute_insert(
+                        f"INSERT INTO products ({', '.join(fields)}) VALUES ({', '.join('?' * len(fields))})",
+                        params
+                    )
+                    change, reason = quantity, 'رصيد افتتاحي'
+                if change and not self.db.adjust_stock(product_id, abs(change), 'in' if change > 0 else 'out', reason):
+                    raise RuntimeError("تعذر تسجيل حركة المخزون")
+            return True
+        except Exception as e:
+            print(f"خطأ في حفظ المنتج: {e}")
+            return False
+
+    def delete_product(self, product_id):
+        """حذف منتج مع حركاته اليدوية وطبقات تكلفته وإرجاع True/False
+
+        يرفع ValueError إن كانت له مبيعات أو مشتريات مسجلة (سجلها يبقى مرتبطاً به).
+        """
+        history = self.db.fetch_one(
+            """SELECT EXISTS (SELECT 1 FROM sale_items WHERE product_id = ?)
+                      OR EXISTS (SELECT 1 FROM purchase_items WHERE product_id = ?)""",
+            (product_id, product_id)
+        )
+        if history and history[0]:
+            raise ValueError("لا يمكن حذف منتج له مبيعات أو مشتريات مسجلة")
+        try:
+            # الحركات (الرصيد الافتتاحي وتعديلات الكمية) تمنع الحذف بمفتاحها الخارجي، وطبقات التكلفة تُحذف معه
+            with self.db.transaction():
+                self.db.execute_query("DELETE FROM inventory_movements WHERE product_id = ?", (product_id,))
+                self.db.execute_query("DELETE FROM products WHERE id = ?", (product_id,))
+            return True
+        except Exception as e:
+            print(f"خطأ في حذف المنتج: {e}")
+            return False
+
+    def import_barcodes(self, rows):
+        """استيراد أزواج (رقم المنتج أو اسمه، الباركود) مع تجاهل سطر العناوين إن وُجد
+
+        يُرجع (عدد المحدَّث، الأسطر المتجاهلة) أو None عند الفشل.
+        """
+        rows = list(rows)
+        if rows and not rows[0][0].strip().isdigit() and rows[0][1].strip().lower() in _BARCODE_HEADERS:
+            rows = rows[1:]
+        return self.db.import_barcodes(rows)
@@ -0,0 +1,70 @@
+# خدمة المخزون: حالة كل منتج وتصفية القائمة وإحصائياتها وتعديل الكميات يدوياً
+
+
+# أعمدة قائمة المخزون: (الاسم، دالة على سجل الكتالوج)
+INVENTORY_COLUMNS = (
+    ('id', lambda r: r.id),
+    ('name', lambda r: r.name),
+    ('category', lambda r: r.category),
+    ('quantity', lambda r: r.quantity),
+    ('min_quantity', lambda r: r.min_quantity),
+    ('unit', lambda r: r.unit),
+)
+
+# اسم الفلتر -> شرط على سجل الكتالوج (None = الكل)
+FILTERS = {
+    'الكل': None,
+    'قريب من النفاد': lambda record: record.is_low,
+    'نفذ من المخزون': lambda record: record.is_out,
+}
+
+
+def stock_status(quantity, min_quantity):
+    """'out' أو 'low' أو 'normal'"""
+    if quantity == 0:
+        return 'out'
+    if quantity <= min_quantity:
+        return 'low'
+    return 'normal'
+
+
+class InventoryService:
+    def __init__(self, db):
+        self.db = db
+        self.catalog = db.catalog
+
+    def search(self, term):
+        """معرفات المنتجات المطابقة لنص البحث أو None إن كان فارغاً (كل المنتجات)"""
+        term = (term or '').strip()
+        return self.db.search_product_ids(term) if term else None
+
+    def stats(self, matches=None):
+        """عدد المنتجات المطابقة حسب الحالة: {'total', 'normal', 'low', 'out'}"""
+        counts = {'total': 0, 'normal': 0, 'low': 0, 'out': 0}
+        for record in self.catalog.records():
+            if matches and not matches(record):
+                continue
+            counts['total'] += 1
+            counts[stock_status(record.quantity, record.min_quantity)] += 1
+        return counts
+
+    def adjust(self, product_id, quantity, movement_type, reason='', movement_date=None):
+        """إضافة ('in') أو سحب ('out') كمية يدوياً وإرجاع الكمية الجديدة أو None عند فشل الحفظ
+
+        يرفع ValueError إن كانت الكمية غير موجبة أو أكبر من المتوفر عند السحب.
+        """
+        if movement_type not in ('in', 'out'):
+            raise ValueError(f"نوع حركة غير معروف: {movement_type}")
+        if quantity <= 0:
+            raise ValueError("يرجى إدخال كمية أكبر من صفر")
+        # قراءة الكمية والتعديل في معاملة واحدة حتى لا يسبق بيعٌ السحبَ بعد التحقق
+        with self.db.transaction():
+            row = self.db.fetch_one("SELECT COALESCE(quantity, 0) FROM products WHERE id = ?", (product_id,))
+            if row is None:
+                raise ValueError(f"منتج غير معروف: {product_id}")
+            current = row[0]
+            if movement_type == 'out' and quantity > current:
+                raise ValueError(f"الكمية المطلوبة ({quantity}) أكبر من المتوفر ({current})")
+            if not self.db.adjust_stock(product_id, quantity, movement_type, reason or 'تعديل يدوي', movement_date):
+                return None
+        return current + quantity if movement_type == 'in' else current - quantity
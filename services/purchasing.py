@@ -0,0 +1,89 @@
+# خدمة المشتريات: أسطر فاتورة الشراء وحفظها (المخزون، طبقات التكلفة، ديون المورد) وتفاصيلها
+
+
+def purchase_line(product_id, name, quantity, unit_price_syp, unit_price_usd):
+    """سطر فاتورة شراء بصيغة save_purchase"""
+    if quantity <= 0:
+        raise ValueError("يرجى إدخال كمية صحيحة")
+    return {
+        'product_id': product_id,
+        'name': name,
+        'quantity': quantity,
+        'unit_price_syp': unit_price_syp,
+        'unit_price_usd': unit_price_usd,
+        'total_syp': quantity * unit_price_syp,
+        'total_usd': quantity * unit_price_usd,
+    }
+
+
+def totals(lines):
+    """(مجموع ل.س، مجموع $) لأسطر فاتورة"""
+    return sum(line['total_syp'] for line in lines), sum(line['total_usd'] for line in lines)
+
+
+class PurchasingService:
+    def __init__(self, db):
+        self.db = db
+        self.catalog = db.catalog
+
+    def supplier_choices(self):
+        """اسم المورد -> رقمه"""
+        return {row[1]: row[0] for row in self.db.fetch_all("SELECT id, name FROM suppliers")}
+
+    def product_choices(self):
+        """اسم المنتج -> رقمه وسعر شرائه الحالي"""
+        return {
+            p.name: {'id': p.id, 'price_syp': p.purchase_price_syp, 'price_usd': p.purchase_price_usd}
+            for p in self.catalog.records()
+        }
+
+    def line(self, product_id, quantity, unit_price_syp=None, unit_price_usd=None):
+        """سطر شراء لمنتج من الكتالوج (بسعر الشراء الحالي ما لم يُحدد سعر)"""
+        product = self.catalog.get(product_id)
+        if product is None:
+            raise ValueError(f"منتج غير معروف: {product_id}")
+        return purchase_line(
+            product.id, product.name, quantity,
+            product.purchase_price_syp if unit_price_syp is None else unit_price_syp,
+            product.purchase_price_usd if unit_price_usd is None else unit_price_usd,
+        )
+
+    def save(self, lines, supplier_id=None, payment_method='نقدي', paid_syp=0, paid_usd=0, notes='',
+             purchase_date=None):
+        """حفظ فاتورة الشراء وإرجاع رقمها أو None عند فشل الحفظ
+
+        يرفع ValueError إن كان المورد أو أحد المنتجات غير موجود.
+        """
+        if not lines:
+            raise ValueError("يرجى إضافة منتجات")
+        total_syp, total_usd = totals(lines)
+        # التحقق والحفظ في معاملة واحدة حتى لا يُحذف المورد أو المنتج بينهما
+        with self.db.transaction():
+            if supplier_id is not None and not self.db.fetch_one("SELECT 1 FROM suppliers WHERE id = ?", (supplier_id,)):
+                raise ValueError(f"مورد غير معروف: {supplier_id}")
+            product_ids = {line['product_id'] for line in lines}
+            found = {row[0] for row in self.db.fetch_all(
+                f"SELECT id FROM products WHERE id IN ({', '.join('?' * len(product_ids))})", tuple(product_ids)
+            )}
+            missing = sorted(product_ids - found)
+            if missing:
+                raise ValueError(f"منتج غير معروف: {', '.join(map(str, missing))}")
+            return self.db.save_purchase(
+                lines, supplier_id, total_syp, total_usd,
+                payment_method=payment_method,
+                paid_syp=paid_syp,
+                paid_usd=paid_usd,
+                notes=notes,
+                purchase_date=purchase_date
+            )
+
+    def details(self, purchase_id):
+        """(صف الفاتورة، أسطرها) أو (None, []) إن لم توجد"""
+        purchase = self.db.fetch_one("SELECT * FROM purchases WHERE id = ?", (purchase_id,))
+        if purchase is None:
+            return None, []
+        items = self.db.fetch_all(
+            "SELECT product_name, quantity, unit_price_syp, unit_price_usd, subtotal_syp, subtotal_usd FROM purchase_items WHERE purchase_id = ?",
+            (purchase_id,)
+        )
+        return purchase, items
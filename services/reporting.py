@@ -0,0 +1,70 @@
+# خدمة التقارير: فترات التقارير وجمع بياناتها عبر ذاكرة التقارير وتصديرها
+from datetime import datetime, timedelta
+from database.db_manager import day_bounds
+from database.reports import REPORT_BUILDERS
+from database.export import export_dataset
+
+
+# الفترات الجاهزة: الاسم -> عدد الأيام قبل اليوم
+PERIODS = {'day': 0, 'week': 7, 'month': 30, 'year': 365}
+
+
+def period_range(period, today=None):
+    """(من، إلى) بصيغة YYYY-MM-DD لفترة جاهزة تنتهي اليوم"""
+    today = today or datetime.now()
+    return (today - timedelta(days=PERIODS[period])).strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d')
+
+
+def validate_range(from_date, to_date):
+    """رفع ValueError برسالة للعرض إن لم تكن التواريخ بالصيغة YYYY-MM-DD"""
+    try:
+        day_bounds(from_date, to_date)
+    except (TypeError, ValueError):
+        raise ValueError("يرجى إدخال التواريخ بالصيغة YYYY-MM-DD")
+
+
+def net_profit(totals):
+    """(الربح الصافي ل.س، الربح الصافي $) = الإيرادات - تكلفة البضاعة - المصروفات"""
+    return tuple(
+        (totals[f'revenue_{currency}'] or 0) - (totals[f'cogs_{currency}'] or 0) - (totals[f'expenses_{currency}'] or 0)
+        for currency in ('syp', 'usd')
+    )
+
+
+class ReportingService:
+    def __init__(self, db):
+        self.db = db
+        self.cache = db.report_cache
+
+    def cached(self, report, from_date, to_date):
+        """(مفتاح الذاكرة، البيانات المخزنة أو None)"""
+        self._check(report)
+        key = self.cache.key(report, from_date, to_date)
+        return key, self.cache.get(key)
+
+    def build(self, reader, report, from_date, to_date):
+        """جمع بيانات تقرير بقارئ معين (يُستدعى في خيط عامل) وتخزينها ما لم يحدث إبطال أثناء الحساب"""
+        self._check(report)
+        key = self.cache.key(report, from_date, to_date)
+        data = self.cache.get(key)
+        if data is not None:
+            return data
+        generation = self.cache.generation
+        data = REPORT_BUILDERS[report](reader, from_date, to_date)
+        self.cache.put(key, data, generation)
+        return data
+
+    def report(self, report, from_date, to_date):
+        """بيانات تقرير من الذاكرة أو عبر اتصال قراءة معار"""
+        validate_range(from_date, to_date)
+        with self.db.pool.checkout() as reader:
+            return self.build(reader, report, from_date, to_date)
+
+    def export(self, reader, dataset, from_date, to_date, file_path, file_format=None, progress=None):
+        """تصدير بيانات فترة إلى ملف وإرجاع عدد الصفوف (0 بدون إنشاء ملف إن لم توجد بيانات)"""
+        return export_dataset(reader, dataset, from_date, to_date, file_path, file_format, progress)
+
+    @staticmethod
+    def _check(report):
+        if report not in REPORT_BUILDERS:
+            raise ValueError(f"تقرير غير معروف: {report}")
@@ -0,0 +1,205 @@
+# خدمة البيع: سلة نقطة البيع (الأسطر، التحقق من المخزون، الإجماليات) وإتمام الفاتورة
+from database.db_manager import parse_timestamp
+
+
+def discounted_totals(lines, discount_syp=0, discount_usd=0):
+    """(الإجمالي ل.س، الإجمالي $) بعد الخصم، مع رفع ValueError إن كان الخصم سالباً أو يتجاوز المجموع"""
+    subtotal_syp = sum(line['total_syp'] for line in lines)
+    subtotal_usd = sum(line['total_usd'] for line in lines)
+    if discount_syp < 0 or discount_usd < 0:
+        raise ValueError('الخصم لا يمكن أن يكون سالباً')
+    if discount_syp > subtotal_syp:
+        raise ValueError(f'الخصم ({discount_syp:g} ل.س) يتجاوز مجموع الفاتورة ({subtotal_syp:g} ل.س)')
+    if discount_usd > subtotal_usd:
+        raise ValueError(f'الخصم ({discount_usd:g} $) يتجاوز مجموع الفاتورة ({subtotal_usd:g} $)')
+    return subtotal_syp - discount_syp, subtotal_usd - discount_usd
+
+
+class Cart:
+    """سلة البيع: أسطر بصيغة complete_sale مع التحقق من الكمية المتاحة في الكتالوج"""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.lines = []
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __getitem__(self, index):
+        return self.lines[index]
+
+    def find(self, product_id):
+        return next((line for line in self.lines if line['product_id'] == product_id), None)
+
+    def add(self, product, quantity):
+        """إضافة كمية من منتج (سجل كتالوج) أو زيادة سطره إن وُجد وإرجاع السطر"""
+        if quantity <= 0:
+            raise ValueError('الكمية يجب أن تكون أكبر من الصفر')
+        line = self.find(product.id)
+        in_cart = line['quantity'] if line else 0
+        if in_cart + quantity > float(product.quantity):
+            raise ValueError(f'الكمية المتاحة فقط: {product.quantity}')
+        if line is None:
+            line = {
+                'product_id': product.id,
+                'name': product.name,
+                'quantity': 0,
+                'unit_price_syp': float(product.selling_price_syp),
+                'unit_price_usd': float(product.selling_price_usd),
+            }
+            self.lines.append(line)
+        self._set(line, in_cart + quantity)
+        return line
+
+    def set_quantity(self, index, quantity):
+        """تغيير كمية السطر index بعد التحقق من المخزون الحالي"""
+        if quantity <= 0:
+            raise ValueError('الكمية يجب أن تكون أكبر من الصفر')
+        line = self.lines[index]
+        product = self.catalog.get(line['product_id'])
+        if product and quantity > float(product.quantity):
+            raise ValueError(f'الكمية المتاحة فقط: {product.quantity}')
+        self._set(line, quantity)
+        return line
+
+    @staticmethod
+    def _set(line, quantity):
+        line['quantity'] = quantity
+        line['total_syp'] = quantity * line['unit_price_syp']
+        line['total_usd'] = quantity * line['unit_price_usd']
+
+    def remove(self, index):
+        return self.lines.pop(index)
+
+    def clear(self):
+        self.lines.clear()
+
+    def subtotal(self):
+        """(مجموع ل.س، مجموع $) قبل الخصم"""
+        return (sum(line['total_syp'] for line in self.lines),
+                sum(line['total_usd'] for line in self.lines))
+
+
+class SalesService:
+    def __init__(self, db):
+        self.db = db
+        self.catalog = db.catalog
+
+    def new_cart(self):
+        return Cart(self.catalog)
+
+    def cart_from(self, items):
+        """سلة من أزواج (رقم المنتج، الكمية) بأسعار الكتالوج الحالية"""
+        cart = self.new_cart()
+        for product_id, quantity in items:
+            product = self.catalog.get(product_id)
+            if product is None:
+                raise ValueError(f'منتج غير معروف: {product_id}')
+            cart.add(product, quantity)
+        return cart
+
+    def scan(self, cart, barcode):
+        """إضافة قطعة واحدة من منتج الباركود إلى السلة وإرجاع سجل المنتج"""
+        product = self.catalog.find_by_barcode(barcode)
+        if product is None:
+            raise ValueError(f'باركود غير معروف: {barcode}')
+        cart.add(product, 1)
+        return product
+
+    def checkout(self, cart, payment_method='نقدي', discount_syp=0, discount_usd=0, notes='', sale_date=None):
+        """تسجيل فاتورة السلة (الإجمالي بعد الخصم) وإرجاع رقمها أو None عند فشل الحفظ
+
+        يرفع ValueError إن كانت السلة فارغة أو الخصم سالباً أو أكبر من مجموعها.
+        """
+        if not cart:
+            raise ValueError('لا يمكن إتمام البيع - السلة فارغة')
+        lines = list(cart)
+        total_syp, total_usd = discounted_totals(lines, discount_syp, discount_usd)
+        return self.db.complete_sale(
+            lines, total_syp, total_usd,
+            payment_method=payment_method,
+            discount_syp=discount_syp,
+            discount_usd=discount_usd,
+            notes=notes,
+            sale_date=sale_date
+        )
+
+    def sell(self, items, payment_method='نقدي', discount_syp=0, discount_usd=0, notes='', sale_date=None):
+        """بناء سلة من أزواج (رقم المنتج، الكمية) وتسجيلها وإرجاع (رقم الفاتورة، السلة)
+
+        التحقق من المخزون والتسجيل في معاملة واحدة حتى لا يسبق بيعٌ من نقطة بيع أخرى التحقق.
+        """
+        with self.db.transaction():
+            cart = self.cart_from(items)
+            return self.checkout(cart, payment_method, discount_syp, discount_usd, notes, sale_date), cart
+
+    def completed_line(self, item):
+        """سطر فاتورة مكتملة من نقطة بيع بسعرها وقت البيع: {'product_id', 'quantity', 'unit_price_syp', 'unit_price_usd'}"""
+        product = self.catalog.get(item.get('product_id'))
+        if product is None:
+            raise ValueError(f"منتج غير معروف: {item.get('product_id')}")
+        quantity = float(item.get('quantity') or 0)
+        if quantity <= 0:
+            raise ValueError('الكمية يجب أن تكون أكبر من الصفر')
+        price_syp = float(item.get('unit_price_syp') or 0)
+        price_usd = float(item.get('unit_price_usd') or 0)
+        return {
+            'product_id': product.id,
+            'name': item.get('name') or product.name,
+            'quantity': quantity,
+            'unit_price_syp': price_syp,
+            'unit_price_usd': price_usd,
+            'total_syp': quantity * price_syp,
+            'total_usd': quantity * price_usd,
+        }
+
+    def ingest(self, sales):
+        """تسجيل دفعة فواتير مكتملة من نقاط البيع في معاملة واحدة وإرجاع نتيجة كل فاتورة بالترتيب
+
+        كل فاتورة تحمل client_key تولده نقطة البيع، والمفتاح المسجل سابقاً لا يُكرر فتكون إعادة الإرسال آمنة.
+        لا يُتحقق من المخزون لأن البضاعة سُلّمت عند نقطة البيع. النتيجة:
+        {'client_key', 'status', 'sale_id', 'error'} حيث status أحد
+        'created' أو 'duplicate' أو 'rejected' (مدخلات غير صالحة منها التاريخ والخصم) أو 'failed' (فشل الحفظ).
+        """
+        results = []
+        with self.db.transaction():
+            for sale in sales:
+                key = (sale.get('client_key') or '').strip()
+                result = {'client_key': key, 'status': 'created', 'sale_id': None, 'error': None}
+                results.append(result)
+                try:
+                    if not key:
+                        raise ValueError('مفتاح الفاتورة (client_key) مطلوب')
+                    # داخل المعاملة تُقرأ الفواتير السابقة في الدفعة نفسها أيضاً
+                    existing = self.db.fetch_one("SELECT id FROM sales WHERE client_key = ?", (key,))
+                    if existing:
+                        result.update(status='duplicate', sale_id=existing[0])
+                        continue
+                    lines = [self.completed_line(item) for item in sale.get('items') or ()]
+                    if not lines:
+                        raise ValueError('الفاتورة بدون أسطر')
+                    sale_date = parse_timestamp(sale['sale_date']) if sale.get('sale_date') else None
+                    discount_syp = float(sale.get('discount_syp') or 0)
+                    discount_usd = float(sale.get('discount_usd') or 0)
+                    total_syp, total_usd = discounted_totals(lines, discount_syp, discount_usd)
+                except ValueError as e:
+                    result.update(status='rejected', error=str(e))
+                    continue
+
+                sale_id = self.db.complete_sale(
+                    lines, total_syp, total_usd,
+                    payment_method=sale.get('payment_method') or 'نقدي',
+                    discount_syp=discount_syp,
+                    discount_usd=discount_usd,
+                    notes=sale.get('notes') or '',
+                    sale_date=sale_date,
+                    client_key=key
+                )
+                if sale_id is None:
+                    result.update(status='failed', error='تعذر حفظ الفاتورة')
+                else:
+                    result['sale_id'] = sale_id
+        return results
@@ -21,6 +21,8 @@ class AboutUI:
         
         def _on_mousewheel(event):
             main_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
+        self.main_canvas = main_canvas
+        self._on_mousewheel = _on_mousewheel
         main_canvas.bind_all("<MouseWheel>", _on_mousewheel)
         
         main_canvas.pack(side="left", fill="both", expand=True)
@@ -68,6 +70,10 @@ class AboutUI:
         copyright_text = "© 2025 جميع الحقوق محفوظة | تم التطوير بـ ❤️ في سوريا 🇸🇾"
         ttk.Label(footer_frame, text=copyright_text, font=('Arial', 10), foreground='#95a5a6', justify='center').pack()
 
+    def on_show(self):
+        """إعادة ربط التمرير بالماوس عند العودة إلى الشاشة"""
+        self.main_canvas.bind_all("<MouseWheel>", self._on_mousewheel)
+
     def create_info_card(self, parent, title, text):
         card = ttk.LabelFrame(parent, text=title, padding=20)
         card.pack(fill='x', pady=(0, 20))
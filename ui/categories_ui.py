@@ -1,10 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+from services.catalog import CatalogService
 
 class CategoriesUI:
     def __init__(self, parent, db):
         self.parent = parent
         self.db = db
+        self.catalog = CatalogService(db)
         self.setup_ui()
         self.load_categories()
         
@@ -101,26 +103,26 @@ class CategoriesUI:
             self.tree.delete(item)
         
         # جلب البيانات
-        categories = self.db.fetch_all("SELECT * FROM categories ORDER BY id DESC")
+        categories = self.catalog.categories()
         
         # إضافة البيانات للجدول
         for category in categories:
             self.tree.insert('', 'end', values=category)
     
+    def refresh(self):
+        """تحديث قائمة الفئات"""
+        self.load_categories()
+    
     def add_category(self):
         """إضافة فئة جديدة"""
-        name = self.name_entry.get().strip()
-        description = self.desc_entry.get().strip()
-        
-        if not name:
-            messagebox.showerror("خطأ", "يرجى إدخال اسم الفئة")
+        # إضافة للقاعدة
+        try:
+            added = self.catalog.add_category(self.name_entry.get(), self.desc_entry.get())
+        except ValueError as e:
+            messagebox.showerror("خطأ", str(e))
             return
         
-        # إضافة للقاعدة
-        if self.db.execute_query(
-            "INSERT INTO categories (name, description) VALUES (?, ?)",
-            (name, description)
-        ):
+        if added:
             messagebox.showinfo("نجاح", "تمت إضافة الفئة بنجاح")
             self.clear_fields()
             self.load_categories()
@@ -135,18 +137,15 @@ class CategoriesUI:
             return
         
         category_id = self.tree.item(selected[0])['values'][0]
-        name = self.name_entry.get().strip()
-        description = self.desc_entry.get().strip()
         
-        if not name:
-            messagebox.showerror("خطأ", "يرجى إدخال اسم الفئة")
+        # تحديث في القاعدة
+        try:
+            updated = self.catalog.update_category(category_id, self.name_entry.get(), self.desc_entry.get())
+        except ValueError as e:
+            messagebox.showerror("خطأ", str(e))
             return
         
-        # تحديث في القاعدة
-        if self.db.execute_query(
-            "UPDATE categories SET name = ?, description = ? WHERE id = ?",
-            (name, description, category_id)
-        ):
+        if updated:
             messagebox.showinfo("نجاح", "تم تحديث الفئة بنجاح")
             self.clear_fields()
             self.load_categories()
@@ -164,7 +163,7 @@ class CategoriesUI:
         
         # تأكيد الحذف
         if messagebox.askyesno("تأكيد", "هل أنت متأكد من حذف هذه الفئة؟"):
-            if self.db.execute_query("DELETE FROM categories WHERE id = ?", (category_id,)):
+            if self.catalog.delete_category(category_id):
                 messagebox.showinfo("نجاح", "تم حذف الفئة بنجاح")
                 self.clear_fields()
                 self.load_categories()
@@ -1,11 +1,8 @@
 import tkinter as tk
 from tkinter import ttk
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
 from utils.arabic_helper import prepare_arabic_text
-import matplotlib.font_manager as fm
+from utils.imports import import_attr
+from utils.perf import PERF
 
 class DashboardUI:
     def __init__(self, parent, db):
@@ -32,6 +29,8 @@ class DashboardUI:
         def _on_mousewheel(event):
             main_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
         
+        self.main_canvas = main_canvas
+        self._on_mousewheel = _on_mousewheel
         main_canvas.bind_all("<MouseWheel>", _on_mousewheel)
         
         # العنوان
@@ -42,33 +41,27 @@ class DashboardUI:
         )
         title.pack(pady=20)
         
+        # محتوى لوحة التحكم (يُعاد بناؤه عند التحديث)
+        self.body = ttk.Frame(scrollable_frame)
+        self.body.pack(fill='both', expand=True)
+        self.load_data()
+        
+        # عرض Canvas و Scrollbar
+        main_canvas.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+    
+    def load_data(self):
+        """بناء بطاقات الإحصائيات فوراً ثم الرسم البياني بعد ظهورها (matplotlib تُستورد عندها)"""
         # إطار الإحصائيات السريعة
-        stats_frame = ttk.Frame(scrollable_frame)
+        stats_frame = ttk.Frame(self.body)
         stats_frame.pack(fill='x', padx=20, pady=10)
         
-        # الحصول على البيانات
-        today = datetime.now().strftime('%Y-%m-%d')
-        
-        # مبيعات اليوم
-        sales_today = self.db.fetch_one(
-            "SELECT SUM(total_syp) FROM sales WHERE DATE(sale_date) = ?",
-            (today,)
-        )
-        sales_today = sales_today[0] if sales_today[0] else 0
-        
-        # عدد المنتجات
-        products_count = self.db.fetch_one("SELECT COUNT(*) FROM products")
-        products_count = products_count[0] if products_count else 0
-        
-        # المنتجات القريبة من النفاد
-        low_stock = self.db.fetch_one(
-            "SELECT COUNT(*) FROM products WHERE quantity <= min_quantity"
-        )
-        low_stock = low_stock[0] if low_stock else 0
-        
-        # عدد الموردين
-        suppliers_count = self.db.fetch_one("SELECT COUNT(*) FROM suppliers")
-        suppliers_count = suppliers_count[0] if suppliers_count else 0
+        # الحصول على البيانات (لقطة واحدة مخزنة مؤقتاً)
+        snapshot = self.db.dashboard.get()
+        sales_today = snapshot['sales_today']
+        products_count = snapshot['products_count']
+        low_stock = snapshot['low_stock']
+        suppliers_count = snapshot['suppliers_count']
         
         # عرض البطاقات
         self.create_stat_card(stats_frame, "مبيعات اليوم", f"{sales_today:,.0f} ل.س", "success", 0)
@@ -80,15 +73,26 @@ class DashboardUI:
             stats_frame.columnconfigure(i, weight=1)
         
         # إطار الرسوم البيانية
-        charts_frame = ttk.Frame(scrollable_frame)
+        charts_frame = ttk.Frame(self.body)
         charts_frame.pack(fill='both', expand=True, padx=20, pady=10)
         
-        # رسم بياني للمبيعات الأسبوعية
-        self.create_weekly_sales_chart(charts_frame)
-        
-        # عرض Canvas و Scrollbar
-        main_canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        # رسم بياني للمبيعات الأسبوعية: بعد أن ترسم Tk البطاقات فتصبح الشاشة قابلة للاستخدام
+        def draw_chart():
+            # قد يُعاد بناء المحتوى (تحديث) قبل موعد الرسم
+            if charts_frame.winfo_exists():
+                with PERF.measure('chart', 'dashboard_weekly_sales'):
+                    self.create_weekly_sales_chart(charts_frame, snapshot['week'])
+        self.parent.after(50, draw_chart)
+    
+    def refresh(self):
+        """إعادة بناء المحتوى ببيانات محدثة"""
+        for widget in self.body.winfo_children():
+            widget.destroy()
+        self.load_data()
+    
+    def on_show(self):
+        """إعادة ربط التمرير بالماوس عند العودة إلى الشاشة"""
+        self.main_canvas.bind_all("<MouseWheel>", self._on_mousewheel)
         
     def create_stat_card(self, parent, title, value, color, column):
         """إنشاء بطاقة إحصائيات"""
@@ -113,23 +117,15 @@ class DashboardUI:
         )
         value_label.pack(pady=(5, 15))
     
-    def create_weekly_sales_chart(self, parent):
+    def create_weekly_sales_chart(self, parent, week):
         """إنشاء رسم بياني للمبيعات الأسبوعية"""
-        # الحصول على بيانات آخر 7 أيام
-        dates = []
-        sales = []
-        
-        for i in range(6, -1, -1):
-            date = (datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d')
-            dates.append(date)
-            
-            result = self.db.fetch_one(
-                "SELECT SUM(total_syp) FROM sales WHERE DATE(sale_date) = ?",
-                (date,)
-            )
-            sales.append(result[0] if result[0] else 0)
+        # بيانات آخر 7 أيام من لقطة لوحة التحكم
+        dates = [day for day, _ in week]
+        sales = [total for _, total in week]
         
         # إنشاء الرسم البياني مع دعم العربية
+        Figure = import_attr('matplotlib.figure', 'Figure')
+        FigureCanvasTkAgg = import_attr('matplotlib.backends.backend_tkagg', 'FigureCanvasTkAgg')
         fig = Figure(figsize=(10, 5), dpi=100)
         ax = fig.add_subplot(111)
         
@@ -1,12 +1,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
-import pytz
+from utils.imports import lazy_import
+from ui.virtual_table import VirtualTable, SQLPageSource
 
 class ExpensesUI:
     def __init__(self, parent, db):
         self.parent = parent
         self.db = db
+        # توقيت سوريا (GMT+3)
+        self.syria_tz = lazy_import('pytz').timezone('Asia/Damascus')
         self.setup_ui()
         self.load_expenses()
         
@@ -100,11 +103,26 @@ class ExpensesUI:
         
         # Scrollbar
         scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
         
         self.tree.pack(side='right', fill='both', expand=True)
         scrollbar.pack(side='left', fill='y')
         
+        # تحميل السجل صفحةً صفحة أثناء التمرير
+        source = SQLPageSource(
+            self.db,
+            columns=[
+                ('id', 'id'),
+                ('category', 'category'),
+                ('description', 'description'),
+                ('amount_syp', 'COALESCE(amount_syp, 0)'),
+                ('amount_usd', 'COALESCE(amount_usd, 0)'),
+                ('date', "COALESCE(expense_date, '')"),
+            ],
+            from_clause="FROM expenses"
+        )
+        self.table = VirtualTable(self.tree, scrollbar, source, sort='id', descending=True,
+                                  executor=self.db.executor)
+        
         # قائمة النقر بالزر الأيمن
         self.context_menu = tk.Menu(self.tree, tearoff=0)
         self.context_menu.add_command(label="حذف", command=self.delete_expense)
@@ -124,26 +142,33 @@ class ExpensesUI:
         
     def load_expenses(self):
         """تحميل المصروفات"""
-        # مسح الجدول
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # جلب البيانات
-        expenses = self.db.fetch_all("SELECT * FROM expenses ORDER BY id DESC")
-        
-        total_syp = 0
-        total_usd = 0
-        
-        # إضافة البيانات للجدول
-        for expense in expenses:
-            self.tree.insert('', 'end', values=expense)
-            total_syp += expense[3]
-            total_usd += expense[4]
-        
-        # تحديث الإجماليات
+        self.table.reload()
+        
+        # الإجماليات من قاعدة البيانات وليس من الصفوف المعروضة (في خيط عامل)
+        self.db.executor.submit(
+            lambda reader: reader.fetch_one(
+                "SELECT COALESCE(SUM(amount_syp), 0), COALESCE(SUM(amount_usd), 0) FROM expenses"
+            ),
+            on_done=self.show_totals
+        )
+    
+    def show_totals(self, totals):
+        """تحديث الإجماليات"""
+        total_syp, total_usd = totals if totals else (0, 0)
         self.total_syp_label.config(text=f"إجمالي المصروفات (ل.س): {total_syp:,.2f}")
         self.total_usd_label.config(text=f"إجمالي المصروفات ($): {total_usd:,.2f}")
     
+    def refresh(self):
+        """تحديث سجل المصروفات"""
+        self.load_expenses()
+    
+    def on_hide(self):
+        # إيقاف جلب الصفحات الجاري عند مغادرة الشاشة
+        self.table.cancel()
+    
+    def on_show(self):
+        self.table.resume()
+    
     def add_expense(self):
         """إضافة مصروف جديد"""
         category = self.category_var.get().strip()
@@ -1,13 +1,18 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime
+from ui.virtual_table import VirtualTable, CatalogPageSource
+from ui.search_box import DebouncedSearch
+from services.inventory import InventoryService, INVENTORY_COLUMNS, FILTERS, stock_status
 
 class InventoryUI:
     def __init__(self, parent, db):
         self.parent = parent
         self.db = db
+        self.inventory = InventoryService(db)
         self.setup_ui()
-        self.load_inventory()
+        # تحميل الكتالوج في خيط عامل عند أول فتح ثم ملء الجدول
+        self.table.set_busy(True)
+        self.db.catalog.load_async(self.db.executor, self.load_inventory)
         
     def setup_ui(self):
         """إعداد واجهة المخزون"""
@@ -27,14 +32,14 @@ class InventoryUI:
         self.filter_var = tk.StringVar(value='all')
         filter_combo = ttk.Combobox(filter_frame, textvariable=self.filter_var, 
                                      font=('Arial', 11), width=20, state='readonly')
-        filter_combo['values'] = ['الكل', 'قريب من النفاد', 'نفذ من المخزون']
+        filter_combo['values'] = list(FILTERS)
         filter_combo.pack(side='right', padx=10)
         filter_combo.bind('<<ComboboxSelected>>', lambda e: self.load_inventory())
         
         ttk.Label(filter_frame, text="بحث:", font=('Arial', 11)).pack(side='left', padx=10)
         self.search_entry = ttk.Entry(filter_frame, font=('Arial', 11), width=25)
         self.search_entry.pack(side='left', padx=10)
-        self.search_entry.bind('<KeyRelease>', lambda e: self.load_inventory())
+        self.search_debounce = DebouncedSearch(self.search_entry, lambda term: self.load_inventory())
         
         # جدول المخزون
         table_frame = ttk.LabelFrame(self.parent, text="المخزون الحالي", padding=10)
@@ -64,11 +69,16 @@ class InventoryUI:
         
         # Scrollbar
         scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
         
         self.tree.pack(side='right', fill='both', expand=True)
         scrollbar.pack(side='left', fill='y')
         
+        # عرض الصفوف صفحةً صفحة من كتالوج المنتجات (الحالة تُحسب لكل صف عند عرضه)
+        source = CatalogPageSource(self.db.catalog, columns=INVENTORY_COLUMNS)
+        self.table = VirtualTable(self.tree, scrollbar, source, sort='quantity',
+                                  row_builder=self.build_row)
+        self.db.catalog.subscribe(self.on_catalog_change)
+        
         # تلوين الصفوف
         self.tree.tag_configure('low', background='#ffcccc')
         self.tree.tag_configure('out', background='#ff9999')
@@ -86,70 +96,42 @@ class InventoryUI:
         
     def load_inventory(self):
         """تحميل المخزون"""
-        # مسح الجدول
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
         # الفلتر
         filter_type = self.filter_var.get()
         search_term = self.search_entry.get().strip()
         
-        # بناء الاستعلام
-        query = """
-            SELECT p.id, p.name, 
-                   COALESCE(c.name, 'بدون فئة'), 
-                   p.quantity, p.min_quantity, p.unit
-            FROM products p
-            LEFT JOIN categories c ON p.category_id = c.id
-            WHERE 1=1
-        """
-        params = []
-        
-        if search_term:
-            query += " AND p.name LIKE ?"
-            params.append(f'%{search_term}%')
-        
-        if filter_type == 'قريب من النفاد':
-            query += " AND p.quantity <= p.min_quantity AND p.quantity > 0"
-        elif filter_type == 'نفذ من المخزون':
-            query += " AND p.quantity = 0"
-        
-        query += " ORDER BY p.quantity ASC"
-        
-        # جلب البيانات
-        products = self.db.fetch_all(query, tuple(params) if params else None)
-        
-        low_stock = 0
-        out_of_stock = 0
-        normal = 0
-        
-        # إضافة البيانات للجدول
-        for product in products:
-            product_id, name, category, quantity, min_quantity, unit = product
-            
-            # تحديد الحالة
-            if quantity == 0:
-                status = '⚠️ نفذ'
-                tag = 'out'
-                out_of_stock += 1
-            elif quantity <= min_quantity:
-                status = '⚠️ قريب من النفاد'
-                tag = 'low'
-                low_stock += 1
-            else:
-                status = '✓ متوفر'
-                tag = 'normal'
-                normal += 1
-            
-            self.tree.insert('', 'end', 
-                           values=(product_id, name, category, quantity, min_quantity, unit, status),
-                           tags=(tag,))
+        # البحث من الفهرس النصي ثم التصفية حسب الحالة
+        self.table.set_filter(FILTERS.get(filter_type), ids=self.inventory.search(search_term))
+        self.update_stats()
+    
+    def update_stats(self):
+        """تحديث إحصائيات المخزون للمنتجات المطابقة للفلتر الحالي"""
+        counts = self.inventory.stats(self.table.source.matches)
         
         # تحديث الإحصائيات
         self.stats_label.config(
-            text=f"المجموع: {len(products)} | متوفر: {normal} | قريب من النفاد: {low_stock} | نفذ: {out_of_stock}"
+            text=f"المجموع: {counts['total']} | متوفر: {counts['normal']} | "
+                 f"قريب من النفاد: {counts['low']} | نفذ: {counts['out']}"
         )
     
+    def on_catalog_change(self, changed, removed):
+        """تحديث الصفوف المعروضة والإحصائيات عند تغير الكتالوج"""
+        self.table.update_rows(changed | removed)
+        self.update_stats()
+    
+    def build_row(self, product):
+        """تنسيق صف المخزون وتحديد حالته"""
+        product_id, name, category, quantity, min_quantity, unit = product
+        
+        tag = stock_status(quantity, min_quantity)
+        status = {'out': '⚠️ نفذ', 'low': '⚠️ قريب من النفاد', 'normal': '✓ متوفر'}[tag]
+        
+        return (product_id, name, category, quantity, min_quantity, unit, status), (tag,)
+    
+    def refresh(self):
+        """تحديث المخزون مع الإبقاء على الفلتر والبحث"""
+        self.load_inventory()
+    
     def adjust_quantity(self, event):
         """تعديل كمية المنتج"""
         selected = self.tree.selection()
@@ -158,7 +140,6 @@ class InventoryUI:
         
         values = self.tree.item(selected[0])['values']
         product_id, name, category, current_qty_str = values[0], values[1], values[2], values[3]
-        current_qty = float(current_qty_str)
         
         # نافذة التعديل
         dialog = tk.Toplevel(self.parent)
@@ -268,50 +249,25 @@ class InventoryUI:
                 quantity_entry.focus()
                 return
             
-            operation = operation_var.get()
-            reason = reason_entry.get().strip() or 'تعديل يدوي'
+            adding = operation_var.get() == 'add'
             
-            # الحصول على التاريخ والوقت الحالي
-            movement_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            # التحقق من الكمية المتوفرة عند السحب ثم التعديل مع تسجيل الحركة
+            try:
+                new_qty = self.inventory.adjust(product_id, quantity, 'in' if adding else 'out',
+                                                reason_entry.get().strip())
+            except ValueError as e:
+                messagebox.showerror("خطأ", str(e), parent=dialog)
+                quantity_entry.focus()
+                quantity_entry.select_range(0, tk.END)
+                return
             
-            if operation == 'add':
-                # إضافة
-                if self.db.execute_query(
-                    "UPDATE products SET quantity = quantity + ?, updated_at = ? WHERE id = ?",
-                    (quantity, movement_date, product_id)
-                ):
-                    self.db.execute_query(
-                        """INSERT INTO inventory_movements (product_id, movement_type, quantity, reason, moved_at)
-                           VALUES (?, 'in', ?, ?, ?)""",
-                        (product_id, quantity, reason, movement_date)
-                    )
-                    messagebox.showinfo("نجاح", f"تم إضافة الكمية بنجاح\nالكمية الجديدة: {current_qty + quantity}", parent=dialog)
-                    dialog.destroy()
-                    self.load_inventory()
-                else:
-                    messagebox.showerror("خطأ", "فشل في إضافة الكمية", parent=dialog)
+            if new_qty is not None:
+                action = "إضافة" if adding else "سحب"
+                messagebox.showinfo("نجاح", f"تم {action} الكمية بنجاح\nالكمية الجديدة: {new_qty}", parent=dialog)
+                dialog.destroy()
+                self.load_inventory()
             else:
-                # سحب
-                if quantity > current_qty:
-                    messagebox.showerror("خطأ", f"الكمية المطلوبة ({quantity}) أكبر من المتوفر ({current_qty})", parent=dialog)
-                    quantity_entry.focus()
-                    quantity_entry.select_range(0, tk.END)
-                    return
-                
-                if self.db.execute_query(
-                    "UPDATE products SET quantity = quantity - ?, updated_at = ? WHERE id = ?",
-                    (quantity, movement_date, product_id)
-                ):
-                    self.db.execute_query(
-                        """INSERT INTO inventory_movements (product_id, movement_type, quantity, reason, moved_at)
-                           VALUES (?, 'out', ?, ?, ?)""",
-                        (product_id, quantity, reason, movement_date)
-                    )
-                    messagebox.showinfo("نجاح", f"تم سحب الكمية بنجاح\nالكمية الجديدة: {current_qty - quantity}", parent=dialog)
-                    dialog.destroy()
-                    self.load_inventory()
-                else:
-                    messagebox.showerror("خطأ", "فشل في سحب الكمية", parent=dialog)
+                messagebox.showerror("خطأ", "فشل في إضافة الكمية" if adding else "فشل في سحب الكمية", parent=dialog)
         
         # الأزرار
         button_frame = ttk.Frame(container)
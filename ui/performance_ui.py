@@ -0,0 +1,151 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from datetime import datetime
+from utils.perf import PERF
+from utils.imports import IMPORT_TIMES
+
+class PerformanceUI:
+    """لوحة الأداء: ملخص الأزمنة حسب النوع والاسم وآخر الأحداث وأزمنة الاستيراد"""
+
+    # عدد الأحداث الأخيرة المعروضة
+    RECENT_LIMIT = 500
+
+    # نوع الحدث -> اسمه في الواجهة
+    KINDS = {
+        '': 'الكل',
+        'startup': 'بدء التشغيل',
+        'navigation': 'التنقل',
+        'sql': 'الاستعلامات',
+        'chart': 'المخططات',
+        'report': 'التقارير',
+    }
+
+    def __init__(self, parent, db):
+        self.parent = parent
+        self.db = db
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        """إعداد واجهة لوحة الأداء"""
+        title = ttk.Label(
+            self.parent,
+            text="لوحة الأداء",
+            font=('Arial', 20, 'bold')
+        )
+        title.pack(pady=20)
+
+        # شريط الأدوات
+        toolbar = ttk.Frame(self.parent)
+        toolbar.pack(fill='x', padx=20, pady=5)
+
+        ttk.Label(toolbar, text="النوع:", font=('Arial', 11)).pack(side='right', padx=5)
+        self.kind_var = tk.StringVar(value=self.KINDS[''])
+        kind_combo = ttk.Combobox(toolbar, textvariable=self.kind_var, font=('Arial', 11),
+                                  width=15, state='readonly', justify='right')
+        kind_combo['values'] = list(self.KINDS.values())
+        kind_combo.pack(side='right', padx=5)
+        kind_combo.bind('<<ComboboxSelected>>', lambda event: self.refresh())
+
+        ttk.Button(toolbar, text="تحديث", command=self.refresh,
+                   style='primary.TButton').pack(side='right', padx=5)
+        ttk.Button(toolbar, text="تصدير JSON", command=self.export_json).pack(side='left', padx=5)
+        ttk.Button(toolbar, text="مسح", command=self.clear,
+                   style='secondary.TButton').pack(side='left', padx=5)
+
+        self.status_label = ttk.Label(self.parent, text="", font=('Arial', 10))
+        self.status_label.pack(fill='x', padx=20)
+
+        notebook = ttk.Notebook(self.parent)
+        notebook.pack(fill='both', expand=True, padx=20, pady=10)
+
+        # الملخص
+        self.summary_tree = self.create_tree(notebook, "الملخص", (
+            ('kind', 'النوع', 100), ('name', 'الاسم', 420), ('count', 'العدد', 70),
+            ('total', 'المجموع (ms)', 100), ('avg', 'المتوسط (ms)', 100),
+            ('p95', 'p95 (ms)', 90), ('max', 'الأقصى (ms)', 90),
+        ))
+        # آخر الأحداث
+        self.events_tree = self.create_tree(notebook, "آخر الأحداث", (
+            ('at', 'الوقت', 110), ('kind', 'النوع', 100), ('name', 'الاسم', 420),
+            ('ms', 'المدة (ms)', 90), ('details', 'تفاصيل', 250),
+        ))
+        # أزمنة الاستيراد
+        self.imports_tree = self.create_tree(notebook, "الاستيراد", (
+            ('module', 'الوحدة', 300), ('ms', 'الزمن (ms)', 100),
+        ))
+
+    def create_tree(self, notebook, text, columns):
+        """جدول في تبويب جديد: columns = ((المعرف، العنوان، العرض)...)"""
+        frame = ttk.Frame(notebook, padding=5)
+        notebook.add(frame, text=text)
+        tree = ttk.Treeview(frame, columns=[c[0] for c in columns], show='headings', height=15)
+        for key, heading, width in columns:
+            tree.heading(key, text=heading)
+            tree.column(key, width=width, anchor='w' if key in ('name', 'details', 'module') else 'center')
+        scrollbar = ttk.Scrollbar(frame, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side='right', fill='both', expand=True)
+        scrollbar.pack(side='left', fill='y')
+        return tree
+
+    def selected_kind(self):
+        name = self.kind_var.get()
+        return next((kind for kind, label in self.KINDS.items() if label == name), '')
+
+    def refresh(self):
+        """إعادة تعبئة الجداول من سجل الأداء"""
+        kind = self.selected_kind() or None
+        for tree in (self.summary_tree, self.events_tree, self.imports_tree):
+            tree.delete(*tree.get_children())
+
+        for row in PERF.summary(kind):
+            self.summary_tree.insert('', 'end', values=(
+                self.KINDS.get(row['kind'], row['kind']), row['name'], row['count'],
+                f"{row['total_ms']:,.1f}", f"{row['avg_ms']:,.2f}", f"{row['p95_ms']:,.2f}", f"{row['max_ms']:,.2f}",
+            ))
+
+        events = PERF.events(kind)
+        for event in reversed(events[-self.RECENT_LIMIT:]):
+            details = ', '.join(f"{key}={value}" for key, value in event.items()
+                                if key not in ('at', 'kind', 'name', 'ms'))
+            self.events_tree.insert('', 'end', values=(
+                event['at'][11:], self.KINDS.get(event['kind'], event['kind']), event['name'],
+                f"{event['ms']:,.2f}", details,
+            ))
+
+        for module, seconds in sorted(IMPORT_TIMES.items(), key=lambda item: item[1], reverse=True):
+            self.imports_tree.insert('', 'end', values=(module, f"{seconds * 1000:,.1f}"))
+
+        self.status_label.config(
+            text=f"{len(PERF.events())} حدث في السجل (الحد {PERF.size}) منذ {PERF.started_at:%Y-%m-%d %H:%M:%S}"
+        )
+
+    def on_show(self):
+        self.refresh()
+
+    def clear(self):
+        """مسح سجل الأداء"""
+        if messagebox.askyesno("تأكيد", "هل تريد مسح سجل الأداء؟"):
+            PERF.clear()
+            self.refresh()
+
+    def export_json(self):
+        """تصدير سجل الأداء إلى ملف JSON"""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json")],
+            initialfile=f"performance_{datetime.now():%Y%m%d_%H%M%S}.json"
+        )
+        if not file_path:
+            return
+        extra = {
+            'import_times_ms': {module: round(seconds * 1000, 3) for module, seconds in IMPORT_TIMES.items()},
+            'pool': self.db.pool.stats(),
+            'database_profile': self.db.profile_name,
+        }
+        try:
+            PERF.export_json(file_path, extra)
+            messagebox.showinfo("نجاح", f"تم تصدير سجل الأداء إلى:\n{file_path}")
+        except Exception as e:
+            messagebox.showerror("خطأ", f"حدث خطأ أثناء تصدير الملف:\n{e}")
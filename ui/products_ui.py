@@ -1,13 +1,20 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
+import csv
+from ui.virtual_table import VirtualTable, CatalogPageSource
+from ui.search_box import DebouncedSearch
+from services.catalog import CatalogService
 
 class ProductsUI:
     def __init__(self, parent, db):
         self.parent = parent
         self.db = db
+        self.catalog = CatalogService(db)
         self.setup_ui()
-        self.load_products()
+        # تحميل الكتالوج في خيط عامل عند أول فتح ثم ملء الجدول
+        self.table.set_busy(True)
+        self.db.catalog.load_async(self.db.executor, self.load_products)
         
     def setup_ui(self):
         """إعداد واجهة إدارة المنتجات"""
@@ -26,7 +33,7 @@ class ProductsUI:
         ttk.Label(search_frame, text="بحث:", font=('Arial', 11)).pack(side='right', padx=10)
         self.search_entry = ttk.Entry(search_frame, font=('Arial', 11), width=30)
         self.search_entry.pack(side='right', padx=10)
-        self.search_entry.bind('<KeyRelease>', lambda e: self.search_products())
+        self.search_debounce = DebouncedSearch(self.search_entry, lambda term: self.search_products())
         
         ttk.Button(
             search_frame,
@@ -35,6 +42,13 @@ class ProductsUI:
             style='success.TButton'
         ).pack(side='left', padx=10)
         
+        ttk.Button(
+            search_frame,
+            text="استيراد باركود (CSV)",
+            command=self.import_barcodes,
+            style='info.TButton'
+        ).pack(side='left', padx=10)
+        
         # جدول المنتجات
         table_frame = ttk.LabelFrame(self.parent, text="قائمة المنتجات", padding=10)
         table_frame.pack(fill='both', expand=True, padx=20, pady=10)
@@ -63,11 +77,26 @@ class ProductsUI:
         
         # Scrollbar
         scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
         
         self.tree.pack(side='right', fill='both', expand=True)
         scrollbar.pack(side='left', fill='y')
         
+        # عرض الصفوف صفحةً صفحة من كتالوج المنتجات في الذاكرة
+        source = CatalogPageSource(
+            self.db.catalog,
+            columns=[
+                ('id', lambda r: r.id),
+                ('name', lambda r: r.name),
+                ('category', lambda r: r.category),
+                ('quantity', lambda r: r.quantity),
+                ('unit', lambda r: r.unit),
+                ('price_syp', lambda r: r.selling_price_syp),
+                ('price_usd', lambda r: r.selling_price_usd),
+            ]
+        )
+        self.table = VirtualTable(self.tree, scrollbar, source, sort='id', descending=True)
+        self.db.catalog.subscribe(self.on_catalog_change)
+        
         # ربط النقر المزدوج للتعديل
         self.tree.bind('<Double-1>', self.show_edit_dialog)
         
@@ -79,51 +108,27 @@ class ProductsUI:
         
     def load_products(self):
         """تحميل المنتجات"""
-        # مسح الجدول
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # جلب البيانات
-        query = """
-            SELECT p.id, p.name, 
-                   COALESCE(c.name, 'بدون فئة'), 
-                   p.quantity, p.unit, 
-                   p.selling_price_syp, p.selling_price_usd
-            FROM products p
-            LEFT JOIN categories c ON p.category_id = c.id
-            ORDER BY p.id DESC
-        """
-        products = self.db.fetch_all(query)
-        
-        # إضافة البيانات للجدول
-        for product in products:
-            # تلوين المنتجات القريبة من النفاد
-            self.tree.insert('', 'end', values=product)
+        self.table.set_filter()
     
     def search_products(self):
         """البحث عن منتجات"""
         search_term = self.search_entry.get().strip()
+        if not search_term:
+            self.load_products()
+            return
         
-        # مسح الجدول
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # جلب البيانات
-        query = """
-            SELECT p.id, p.name, 
-                   COALESCE(c.name, 'بدون فئة'), 
-                   p.quantity, p.unit, 
-                   p.selling_price_syp, p.selling_price_usd
-            FROM products p
-            LEFT JOIN categories c ON p.category_id = c.id
-            WHERE p.name LIKE ? OR c.name LIKE ?
-            ORDER BY p.id DESC
-        """
-        products = self.db.fetch_all(query, (f'%{search_term}%', f'%{search_term}%'))
-        
-        # إضافة البيانات للجدول
-        for product in products:
-            self.tree.insert('', 'end', values=product)
+        self.table.set_filter(ids=self.catalog.search(search_term, include_category=True))
+    
+    def on_catalog_change(self, changed, removed):
+        """تحديث الصفوف المعروضة عند تغير الكتالوج"""
+        self.table.update_rows(changed | removed)
+    
+    def refresh(self):
+        """تحديث قائمة المنتجات مع الإبقاء على البحث الحالي"""
+        if self.search_entry.get().strip():
+            self.search_products()
+        else:
+            self.load_products()
     
     def show_add_dialog(self, event=None):
         """عرض نافذة إضافة منتج"""
@@ -151,9 +156,7 @@ class ProductsUI:
         # الحصول على بيانات المنتج إذا كان تعديل
         product_data = None
         if product_id:
-            product_data = self.db.fetch_one(
-                "SELECT * FROM products WHERE id = ?", (product_id,)
-            )
+            product_data = self.catalog.product(product_id)
         
         # النموذج
         form_frame = ttk.Frame(dialog, padding=20)
@@ -175,15 +178,14 @@ class ProductsUI:
         category_combo = ttk.Combobox(form_frame, textvariable=category_var, font=('Arial', 11), width=28, state='readonly')
         
         # جلب الفئات
-        categories = self.db.fetch_all("SELECT id, name FROM categories")
-        category_dict = {cat[1]: cat[0] for cat in categories}
+        category_dict = self.catalog.category_choices()
         category_combo['values'] = list(category_dict.keys())
         category_combo.grid(row=row, column=0, padx=10, pady=10)
         
         if product_data and product_data[2]:
-            cat_name = self.db.fetch_one("SELECT name FROM categories WHERE id = ?", (product_data[2],))
+            cat_name = next((name for name, cat_id in category_dict.items() if cat_id == product_data[2]), None)
             if cat_name:
-                category_var.set(cat_name[0])
+                category_var.set(cat_name)
         row += 1
         
         # سعر الشراء ليرة
@@ -246,6 +248,14 @@ class ProductsUI:
             unit_var.set('قطعة')
         row += 1
         
+        # الباركود
+        ttk.Label(form_frame, text="الباركود:", font=('Arial', 11)).grid(row=row, column=1, padx=10, pady=10, sticky='e')
+        barcode_entry = ttk.Entry(form_frame, font=('Arial', 11), width=30)
+        barcode_entry.grid(row=row, column=0, padx=10, pady=10)
+        if product_data and product_data[11]:
+            barcode_entry.insert(0, product_data[11])
+        row += 1
+        
         # الوصف
         ttk.Label(form_frame, text="الوصف:", font=('Arial', 11)).grid(row=row, column=1, padx=10, pady=10, sticky='ne')
         desc_text = tk.Text(form_frame, font=('Arial', 11), width=30, height=4)
@@ -271,41 +281,24 @@ class ProductsUI:
                 messagebox.showerror("خطأ", "يرجى إدخال أرقام صحيحة")
                 return
             
-            unit = unit_var.get()
-            description = desc_text.get('1.0', 'end-1c').strip()
+            data = {
+                'name': name, 'category_id': category_id,
+                'purchase_price_syp': purchase_syp, 'purchase_price_usd': purchase_usd,
+                'selling_price_syp': selling_syp, 'selling_price_usd': selling_usd,
+                'quantity': quantity, 'min_quantity': min_quantity,
+                'unit': unit_var.get(),
+                'description': desc_text.get('1.0', 'end-1c'),
+                'barcode': barcode_entry.get(),
+            }
             
-            if not name:
-                messagebox.showerror("خطأ", "يرجى إدخال اسم المنتج")
+            # التحقق من الاسم والباركود ثم الإضافة أو التحديث
+            try:
+                saved = self.catalog.save_product(data, product_id)
+            except ValueError as e:
+                messagebox.showerror("خطأ", str(e))
                 return
             
-            if product_id:
-                # تحديث
-                query = """
-                    UPDATE products SET 
-                    name = ?, category_id = ?, 
-                    purchase_price_syp = ?, purchase_price_usd = ?,
-                    selling_price_syp = ?, selling_price_usd = ?,
-                    quantity = ?, min_quantity = ?, unit = ?,
-                    description = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE id = ?
-                """
-                params = (name, category_id, purchase_syp, purchase_usd,
-                         selling_syp, selling_usd, quantity, min_quantity,
-                         unit, description, product_id)
-            else:
-                # إضافة
-                query = """
-                    INSERT INTO products 
-                    (name, category_id, purchase_price_syp, purchase_price_usd,
-                     selling_price_syp, selling_price_usd, quantity, min_quantity,
-                     unit, description)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """
-                params = (name, category_id, purchase_syp, purchase_usd,
-                         selling_syp, selling_usd, quantity, min_quantity,
-                         unit, description)
-            
-            if self.db.execute_query(query, params):
+            if saved:
                 messagebox.showinfo("نجاح", "تم حفظ المنتج بنجاح")
                 dialog.destroy()
                 self.load_products()
@@ -339,12 +332,45 @@ class ProductsUI:
         product_id = self.tree.item(selected[0])['values'][0]
         
         if messagebox.askyesno("تأكيد", "هل أنت متأكد من حذف هذا المنتج؟"):
-            if self.db.execute_query("DELETE FROM products WHERE id = ?", (product_id,)):
+            try:
+                deleted = self.catalog.delete_product(product_id)
+            except ValueError as e:
+                messagebox.showerror("خطأ", str(e))
+                return
+            if deleted:
                 messagebox.showinfo("نجاح", "تم حذف المنتج بنجاح")
                 self.load_products()
             else:
                 messagebox.showerror("خطأ", "فشل في حذف المنتج")
     
+    def import_barcodes(self):
+        """استيراد باركودات بالجملة من ملف CSV: عمود رقم المنتج أو اسمه ثم عمود الباركود"""
+        path = filedialog.askopenfilename(
+            title="اختر ملف الباركود",
+            filetypes=[("CSV", "*.csv"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                rows = [(r[0], r[1]) for r in csv.reader(f) if len(r) >= 2]
+        except Exception as e:
+            messagebox.showerror("خطأ", f"تعذر قراءة الملف: {e}")
+            return
+        
+        # سطر العناوين (إن وُجد) يُتجاهل في الخدمة
+        result = self.catalog.import_barcodes(rows)
+        if result is None:
+            messagebox.showerror("خطأ", "فشل في استيراد الباركود")
+            return
+        
+        updated, skipped = result
+        message = f"تم تحديث باركود {updated} منتج"
+        if skipped:
+            message += f"\nتم تجاهل {len(skipped)} سطر (منتج غير معروف أو باركود فارغ أو مكرر)"
+        messagebox.showinfo("نجاح", message)
+    
     def show_context_menu(self, event):
         """عرض قائمة النقر بالزر الأيمن"""
         self.context_menu.post(event.x_root, event.y_root)
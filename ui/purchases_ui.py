@@ -1,11 +1,14 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
+from ui.virtual_table import VirtualTable, SQLPageSource
+from services.purchasing import PurchasingService, purchase_line, totals
 
 class PurchasesUI:
     def __init__(self, parent, db):
         self.parent = parent
         self.db = db
+        self.purchasing = PurchasingService(db)
         self.cart = []
         self.setup_ui()
         
@@ -49,30 +52,44 @@ class PurchasesUI:
         self.tree.column('date', width=200, anchor='center')
         
         scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
         
         self.tree.pack(side='right', fill='both', expand=True)
         scrollbar.pack(side='left', fill='y')
         
+        # تحميل السجل صفحةً صفحة أثناء التمرير
+        source = SQLPageSource(
+            self.db,
+            columns=[
+                ('id', 'p.id'),
+                ('supplier', "COALESCE(s.name, 'بدون مورد')"),
+                ('total_syp', 'COALESCE(p.total_syp, 0)'),
+                ('total_usd', 'COALESCE(p.total_usd, 0)'),
+                ('payment', "COALESCE(p.payment_method, '')"),
+                ('date', "COALESCE(p.purchase_date, '')"),
+            ],
+            from_clause="FROM purchases p LEFT JOIN suppliers s ON p.supplier_id = s.id"
+        )
+        self.table = VirtualTable(self.tree, scrollbar, source, sort='id', descending=True,
+                                  executor=self.db.executor)
+        
         self.tree.bind('<Double-1>', self.show_purchase_details)
         
         self.load_purchases()
     
     def load_purchases(self):
         """تحميل المشتريات"""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        purchases = self.db.fetch_all("""
-            SELECT p.id, COALESCE(s.name, 'بدون مورد'), 
-                   p.total_syp, p.total_usd, p.payment_method, p.purchase_date
-            FROM purchases p
-            LEFT JOIN suppliers s ON p.supplier_id = s.id
-            ORDER BY p.id DESC
-        """)
-        
-        for purchase in purchases:
-            self.tree.insert('', 'end', values=purchase)
+        self.table.reload()
+    
+    def refresh(self):
+        """تحديث سجل المشتريات"""
+        self.load_purchases()
+    
+    def on_hide(self):
+        # إيقاف جلب الصفحات الجاري عند مغادرة الشاشة
+        self.table.cancel()
+    
+    def on_show(self):
+        self.table.resume()
     
     def show_purchase_dialog(self):
         """عرض نافذة إضافة مشتريات"""
@@ -112,8 +129,7 @@ class PurchasesUI:
         supplier_var = tk.StringVar()
         supplier_combo = ttk.Combobox(info_frame, textvariable=supplier_var, font=('Arial', 11), width=25, state='readonly')
         
-        suppliers = self.db.fetch_all("SELECT id, name FROM suppliers")
-        supplier_dict = {sup[1]: sup[0] for sup in suppliers}
+        supplier_dict = self.purchasing.supplier_choices()
         supplier_combo['values'] = list(supplier_dict.keys())
         supplier_combo.grid(row=0, column=0, padx=10, pady=10)
         
@@ -129,8 +145,7 @@ class PurchasesUI:
         product_var = tk.StringVar()
         product_combo = ttk.Combobox(select_frame, textvariable=product_var, font=('Arial', 11), width=25)
         
-        products = self.db.fetch_all("SELECT id, name, purchase_price_syp, purchase_price_usd FROM products")
-        product_dict = {f"{p[1]}": {'id': p[0], 'price_syp': p[2], 'price_usd': p[3]} for p in products}
+        product_dict = self.purchasing.product_choices()
         product_combo['values'] = list(product_dict.keys())
         product_combo.pack(side='right', padx=10)
         
@@ -144,28 +159,14 @@ class PurchasesUI:
                 messagebox.showerror("خطأ", "يرجى اختيار منتج")
                 return
             
+            product_info = product_dict[product_name]
             try:
-                quantity = float(quantity_entry.get())
-                if quantity <= 0:
-                    raise ValueError()
-            except:
+                self.cart.append(purchase_line(product_info['id'], product_name, float(quantity_entry.get()),
+                                               product_info['price_syp'], product_info['price_usd']))
+            except ValueError:
                 messagebox.showerror("خطأ", "يرجى إدخال كمية صحيحة")
                 return
             
-            product_info = product_dict[product_name]
-            total_syp = quantity * product_info['price_syp']
-            total_usd = quantity * product_info['price_usd']
-            
-            self.cart.append({
-                'product_id': product_info['id'],
-                'name': product_name,
-                'quantity': quantity,
-                'unit_price_syp': product_info['price_syp'],
-                'unit_price_usd': product_info['price_usd'],
-                'total_syp': total_syp,
-                'total_usd': total_usd
-            })
-            
             update_cart()
             product_var.set('')
             quantity_entry.delete(0, 'end')
@@ -208,8 +209,7 @@ class PurchasesUI:
                     f"{item['total_syp']:.2f}", f"{item['total_usd']:.2f}"
                 ))
             
-            total_syp = sum(item['total_syp'] for item in self.cart)
-            total_usd = sum(item['total_usd'] for item in self.cart)
+            total_syp, total_usd = totals(self.cart)
             total_syp_label.config(text=f"{total_syp:,.2f}")
             total_usd_label.config(text=f"{total_usd:,.2f}")
         
@@ -265,54 +265,22 @@ class PurchasesUI:
                 messagebox.showerror("خطأ", "مبلغ غير صحيح")
                 return
             
-            total_syp = sum(item['total_syp'] for item in self.cart)
-            total_usd = sum(item['total_usd'] for item in self.cart)
             payment_method = payment_var.get()
             notes = notes_text.get('1.0', 'end-1c').strip()
             
-            # حفظ المشتريات
-            if self.db.execute_query(
-                """INSERT INTO purchases 
-                   (supplier_id, total_syp, total_usd, payment_method, paid_amount_syp, paid_amount_usd, notes)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (supplier_id, total_syp, total_usd, payment_method, paid_syp, paid_usd, notes)
-            ):
-                purchase_id = self.db.cursor.lastrowid
-                
-                # حفظ العناصر وتحديث المخزون
-                for item in self.cart:
-                    self.db.execute_query(
-                        """INSERT INTO purchase_items 
-                           (purchase_id, product_id, product_name, quantity, unit_price_syp, unit_price_usd, subtotal_syp, subtotal_usd)
-                           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                        (purchase_id, item['product_id'], item['name'], item['quantity'],
-                         item['unit_price_syp'], item['unit_price_usd'],
-                         item['total_syp'], item['total_usd'])
-                    )
-                    
-                    # تحديث المخزون
-                    self.db.execute_query(
-                        "UPDATE products SET quantity = quantity + ? WHERE id = ?",
-                        (item['quantity'], item['product_id'])
-                    )
-                    
-                    # حركة المخزون
-                    self.db.execute_query(
-                        """INSERT INTO inventory_movements (product_id, movement_type, quantity, reason)
-                           VALUES (?, 'in', ?, 'شراء')""",
-                        (item['product_id'], item['quantity'])
-                    )
-                
-                # تحديث ديون المورد
-                if supplier_id:
-                    remaining_syp = total_syp - paid_syp
-                    remaining_usd = total_usd - paid_usd
-                    if remaining_syp > 0 or remaining_usd > 0:
-                        self.db.execute_query(
-                            "UPDATE suppliers SET debt_syp = debt_syp + ?, debt_usd = debt_usd + ? WHERE id = ?",
-                            (remaining_syp, remaining_usd, supplier_id)
-                        )
-                
+            # حفظ المشتريات وعناصرها وتحديث المخزون وديون المورد في معاملة واحدة
+            try:
+                purchase_id = self.purchasing.save(
+                    self.cart, supplier_id,
+                    payment_method=payment_method,
+                    paid_syp=paid_syp,
+                    paid_usd=paid_usd,
+                    notes=notes
+                )
+            except ValueError as e:
+                messagebox.showerror("خطأ", str(e))
+                return
+            if purchase_id is not None:
                 messagebox.showinfo("نجاح", f"تم تسجيل المشتريات بنجاح\nرقم: {purchase_id}")
                 main_canvas.unbind_all("<MouseWheel>")
                 dialog.destroy()
@@ -346,14 +314,16 @@ class PurchasesUI:
         
         purchase_id = self.tree.item(selected[0])['values'][0]
         
+        # معلومات المشتريات وعناصرها
+        purchase, items = self.purchasing.details(purchase_id)
+        if purchase is None:
+            return
+        
         # نافذة التفاصيل
         details = tk.Toplevel(self.parent)
         details.title(f"تفاصيل المشتريات #{purchase_id}")
         details.geometry("800x600")
         
-        # معلومات المشتريات
-        purchase = self.db.fetch_one("SELECT * FROM purchases WHERE id = ?", (purchase_id,))
-        
         info_frame = ttk.LabelFrame(details, text="معلومات عامة", padding=10)
         info_frame.pack(fill='x', padx=20, pady=10)
         
@@ -377,11 +347,6 @@ class PurchasesUI:
         
         items_tree.pack(fill='both', expand=True)
         
-        items = self.db.fetch_all(
-            "SELECT product_name, quantity, unit_price_syp, unit_price_usd, subtotal_syp, subtotal_usd FROM purchase_items WHERE purchase_id = ?",
-            (purchase_id,)
-        )
-        
         for item in items:
             items_tree.insert('', 'end', values=item)
         
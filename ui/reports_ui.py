@@ -1,20 +1,53 @@
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
-import pytz
-import csv
-import arabic_reshaper
-from bidi.algorithm import get_display
+from collections import OrderedDict
+from database.export import export_format, columnar_available
+from services.reporting import ReportingService, period_range, validate_range, net_profit
+from utils.imports import lazy_import, import_attr
+from utils.arabic_helper import prepare_arabic_text
+from utils.perf import PERF
+
+def chart_classes():
+    """صنفا الرسم من matplotlib (يُستوردان عند رسم أول مخطط لا عند فتح الشاشة)"""
+    return (import_attr('matplotlib.figure', 'Figure'),
+            import_attr('matplotlib.backends.backend_tkagg', 'FigureCanvasTkAgg'))
+
 
 class ReportsUI:
+    # عدد التقارير المرسومة التي يُحتفظ بإطاراتها لإعادة عرضها فوراً
+    RENDERED_LIMIT = 4
+
+    # نوع التقرير -> (مفتاح دالة جمع البيانات، دالة العرض)
+    REPORTS = {
+        'المبيعات': ('sales', 'show_sales_report'),
+        'المشتريات': ('purchases', 'show_purchases_report'),
+        'المصروفات': ('expenses', 'show_expenses_report'),
+        'الأرباح': ('profit', 'show_profit_report'),
+        'أفضل المنتجات': ('top_products', 'show_top_products_report'),
+        'الموردين': ('suppliers', 'show_suppliers_report'),
+    }
+
+    # اسم الفترة في الواجهة -> الفترة الجاهزة في خدمة التقارير
+    PERIODS = {
+        'اليوم': 'day',
+        'الأسبوع': 'week',
+        'الشهر': 'month',
+        'السنة': 'year',
+    }
+
     def __init__(self, parent, db):
         self.parent = parent
         self.db = db
+        self.reporting = ReportingService(db)
         # توقيت سوريا (GMT+3)
-        self.syria_tz = pytz.timezone('Asia/Damascus')
+        self.syria_tz = lazy_import('pytz').timezone('Asia/Damascus')
+        # مهمة جمع بيانات التقرير الجارية في الخيط العامل
+        self.report_task = None
+        self.report_interrupted = False
+        # التقارير المرسومة: المفتاح -> (البيانات، الإطار)
+        self.rendered = OrderedDict()
         self.setup_ui()
         
     def setup_ui(self):
@@ -40,6 +73,7 @@ class ReportsUI:
                                      font=('Arial', 11), width=20, state='readonly', justify='right')
         report_combo['values'] = ['المبيعات', 'المشتريات', 'المصروفات', 'الأرباح', 'أفضل المنتجات', 'الموردين']
         report_combo.grid(row=0, column=0, padx=10, pady=10, sticky='ew')
+        report_combo.bind('<<ComboboxSelected>>', self.on_report_selected)
         
         # الفترة
         ttk.Label(filter_frame, text="الفترة:", font=('Arial', 11)).grid(row=0, column=3, padx=10, pady=10, sticky='w')
@@ -76,13 +110,14 @@ class ReportsUI:
 
         ttk.Button(
             button_frame,
-            text="تصدير CSV",
+            text="تصدير البيانات",
             command=self.export_to_csv
         ).pack(side='left', padx=5)
         
-        # إطار عرض التقرير
-        self.report_frame = ttk.Frame(self.parent)
-        self.report_frame.pack(fill='both', expand=True, padx=20, pady=10)
+        # منطقة عرض التقرير: كل تقرير يُرسم في إطار خاص (self.report_frame) يُحتفظ به لإعادة عرضه
+        self.report_area = ttk.Frame(self.parent)
+        self.report_area.pack(fill='both', expand=True, padx=20, pady=10)
+        self.report_frame = None
         
     def toggle_date_entries(self, event=None):
         """تفعيل/تعطيل حقول التاريخ"""
@@ -100,100 +135,202 @@ class ReportsUI:
     
     def get_date_range(self):
         """الحصول على نطاق التاريخ"""
-        period = self.period_var.get()
-        syria_time = datetime.now(self.syria_tz)
-        today = syria_time
-        
-        if period == 'اليوم':
-            from_date = today.strftime('%Y-%m-%d')
-            to_date = today.strftime('%Y-%m-%d')
-        elif period == 'الأسبوع':
-            from_date = (today - timedelta(days=7)).strftime('%Y-%m-%d')
-            to_date = today.strftime('%Y-%m-%d')
-        elif period == 'الشهر':
-            from_date = (today - timedelta(days=30)).strftime('%Y-%m-%d')
-            to_date = today.strftime('%Y-%m-%d')
-        elif period == 'السنة':
-            from_date = (today - timedelta(days=365)).strftime('%Y-%m-%d')
-            to_date = today.strftime('%Y-%m-%d')
-        else:  # مخصص
-            from_date = self.from_date_entry.get()
-            to_date = self.to_date_entry.get()
-        
-        return from_date, to_date
+        period = self.PERIODS.get(self.period_var.get())
+        if period is None:  # مخصص
+            return self.from_date_entry.get(), self.to_date_entry.get()
+        return period_range(period, datetime.now(self.syria_tz))
     
     def generate_report(self):
-        """إنشاء التقرير"""
-        # مسح الإطار
-        for widget in self.report_frame.winfo_children():
-            widget.destroy()
-        
+        """إنشاء التقرير: من الذاكرة إن لم تتغير بياناته، وإلا جمعها في خيط عامل ثم العرض عند وصولها"""
         report_type = self.report_var.get()
         from_date, to_date = self.get_date_range()
+        try:
+            validate_range(from_date, to_date)
+        except ValueError as e:
+            messagebox.showerror("خطأ", str(e))
+            return
+        
+        self.cancel_report()
+        builder, renderer = self.REPORTS[report_type]
+        key, data = self.reporting.cached(builder, from_date, to_date)
+        if data is not None:
+            self.render_report(key, renderer, from_date, to_date, data)
+            return
+        
+        self.show_progress()
+        started = time.perf_counter()
+        
+        def on_done(data):
+            PERF.record('report', builder, time.perf_counter() - started, period=f"{from_date}..{to_date}")
+            self.render_report(key, renderer, from_date, to_date, data)
         
-        if report_type == 'المبيعات':
-            self.show_sales_report(from_date, to_date)
-        elif report_type == 'المشتريات':
-            self.show_purchases_report(from_date, to_date)
-        elif report_type == 'المصروفات':
-            self.show_expenses_report(from_date, to_date)
-        elif report_type == 'الأرباح':
-            self.show_profit_report(from_date, to_date)
-        elif report_type == 'أفضل المنتجات':
-            self.show_top_products_report(from_date, to_date)
-        elif report_type == 'الموردين':
-            self.show_suppliers_report()
+        # الخدمة تخزن النتيجة في ذاكرة التقارير ما لم تبطلها كتابة أثناء الحساب
+        self.report_task = self.db.executor.submit(
+            self.reporting.build, builder, from_date, to_date,
+            on_done=on_done,
+            on_error=self.on_report_error
+        )
+    
+    def on_report_selected(self, event=None):
+        # التبديل بين أنواع التقارير يعرضها مباشرة إن كان هناك تقرير معروض
+        if self.report_frame is not None:
+            self.generate_report()
+    
+    def render_report(self, key, renderer, from_date, to_date, data):
+        """عرض التقرير (في خيط الواجهة): يُعاد استخدام الإطار المرسوم إن لم تتغير البيانات"""
+        self.report_task = None
+        rendered = self.rendered.pop(key, None)
+        if rendered is not None and rendered[0] is data:
+            page = rendered[1]
+        else:
+            if rendered is not None:
+                if self.report_frame is rendered[1]:
+                    self.report_frame = None
+                rendered[1].destroy()
+            page = ttk.Frame(self.report_area)
+            self.show_page(page)
+            # زمن رسم صفحة التقرير ومخططها
+            with PERF.measure('chart', renderer):
+                getattr(self, renderer)(from_date, to_date, data)
+        self.rendered[key] = (data, page)
+        self.show_page(page)
+        while len(self.rendered) > self.RENDERED_LIMIT:
+            _, (_, old_page) = self.rendered.popitem(last=False)
+            old_page.destroy()
+    
+    def show_page(self, page):
+        """إظهار إطار في منطقة التقرير وإخفاء السابق (يُحذف إن لم يكن تقريراً محفوظاً)"""
+        current = self.report_frame
+        if current is page:
+            return
+        if current is not None:
+            if any(current is entry[1] for entry in self.rendered.values()):
+                current.pack_forget()
+            else:
+                current.destroy()
+        self.report_frame = page
+        if page is not None:
+            page.pack(fill='both', expand=True)
+    
+    def on_report_error(self, error):
+        self.report_task = None
+        page = ttk.Frame(self.report_area)
+        self.show_page(page)
+        ttk.Label(page, text=f"تعذر إنشاء التقرير: {error}",
+                  font=('Arial', 12), foreground='red').pack(pady=50)
+    
+    def show_progress(self):
+        """مؤشر تقدم أثناء جمع بيانات التقرير"""
+        page = ttk.Frame(self.report_area)
+        self.show_page(page)
+        progress_frame = ttk.Frame(page)
+        progress_frame.pack(pady=50)
+        ttk.Label(progress_frame, text="جاري إنشاء التقرير...", font=('Arial', 12)).pack(pady=5)
+        progress = ttk.Progressbar(progress_frame, mode='indeterminate', length=250)
+        progress.pack(pady=5)
+        progress.start(10)
+        ttk.Button(progress_frame, text="إلغاء", command=self.stop_report).pack(pady=5)
+    
+    def stop_report(self):
+        """إلغاء التقرير الجاري بطلب المستخدم"""
+        self.cancel_report()
+        self.show_page(None)
+    
+    def cancel_report(self):
+        if self.report_task is not None:
+            self.report_task.cancel()
+            self.report_task = None
+    
+    def on_hide(self):
+        """إلغاء جمع بيانات التقرير عند مغادرة الشاشة"""
+        if self.report_task is not None:
+            self.cancel_report()
+            self.report_interrupted = True
+    
+    def on_show(self):
+        # استئناف التقرير الذي أُلغي عند المغادرة
+        if self.report_interrupted:
+            self.report_interrupted = False
+            self.generate_report()
+    
+    def refresh(self):
+        """إعادة عرض التقرير الحالي (إن وجد): يُعاد حسابه فقط إن أبطلت الكتابات فترته"""
+        if self.report_frame is not None and not self.report_interrupted:
+            self.generate_report()
     
     def export_to_csv(self):
-        """تصدير بيانات التقرير الحالي إلى ملف CSV"""
+        """تصدير بيانات التقرير الحالي (CSV أو Parquet أو Feather حسب الامتداد) على دفعات في خيط عامل مع مؤشر تقدم"""
         report_type = self.report_var.get()
         from_date, to_date = self.get_date_range()
-        
-        data = []
-        header = []
-        
-        if report_type == 'المبيعات':
-            header = ['ID', 'Total SYP', 'Total USD', 'Payment Method', 'Date']
-            data = self.db.fetch_all("SELECT id, total_syp, total_usd, payment_method, sale_date FROM sales WHERE DATE(sale_date) BETWEEN ? AND ? ORDER BY id DESC", (from_date, to_date))
-        elif report_type == 'المشتريات':
-            header = ['ID', 'Supplier', 'Total SYP', 'Total USD', 'Date']
-            data = self.db.fetch_all("SELECT p.id, COALESCE(s.name, 'N/A'), p.total_syp, p.total_usd, p.purchase_date FROM purchases p LEFT JOIN suppliers s ON p.supplier_id = s.id WHERE DATE(p.purchase_date) BETWEEN ? AND ? ORDER BY p.id DESC", (from_date, to_date))
-        elif report_type == 'أفضل المنتجات':
-            header = ['Product Name', 'Quantity Sold', 'Total Sales (SYP)', 'Total Sales (USD)']
-            data = self.db.fetch_all("SELECT si.product_name, SUM(si.quantity), SUM(si.subtotal_syp), SUM(si.subtotal_usd) FROM sale_items si JOIN sales s ON si.sale_id = s.id WHERE DATE(s.sale_date) BETWEEN ? AND ? GROUP BY si.product_name ORDER BY SUM(si.quantity) DESC", (from_date, to_date))
-        else:
-            messagebox.showinfo("غير مدعوم", "التصدير غير مدعوم لهذا النوع من التقارير.")
-            return
-
-        if not data:
-            messagebox.showinfo("لا توجد بيانات", "لا توجد بيانات لتصديرها.")
+        try:
+            validate_range(from_date, to_date)
+        except ValueError as e:
+            messagebox.showerror("خطأ", str(e))
             return
-
+        
+        filetypes = [("CSV files", "*.csv")]
+        if columnar_available():
+            filetypes += [("Parquet files", "*.parquet"), ("Feather files", "*.feather")]
         file_path = filedialog.asksaveasfilename(defaultextension=".csv",
-                                                   filetypes=[("CSV files", "*.csv")],
+                                                   filetypes=filetypes,
                                                    initialfile=f"{report_type}_{from_date}_to_{to_date}.csv")
+        if not file_path:
+            return
+        file_format = export_format(file_path)
+        
+        # نافذة التقدم
+        dialog = tk.Toplevel(self.parent)
+        dialog.title(f"تصدير {file_format.upper()}")
+        dialog.resizable(False, False)
+        dialog.transient(self.parent)
+        container = ttk.Frame(dialog, padding=20)
+        container.pack(fill='both', expand=True)
+        ttk.Label(container, text=f"جاري تصدير تقرير {report_type}...", font=('Arial', 12)).pack(pady=5)
+        progress = ttk.Progressbar(container, mode='determinate', length=300)
+        progress.pack(pady=5)
+        status = ttk.Label(container, text="", font=('Arial', 10))
+        status.pack(pady=5)
+        
+        def on_progress(value):
+            written, total = value
+            progress.config(maximum=total, value=written)
+            status.config(text=f"{written:,} / {total:,}")
+        
+        def on_done(written):
+            dialog.destroy()
+            if not written:
+                messagebox.showinfo("لا توجد بيانات", "لا توجد بيانات لتصديرها.")
+            else:
+                messagebox.showinfo("نجاح", f"تم تصدير {written:,} صف بنجاح إلى:\n{file_path}")
+        
+        def on_error(error):
+            dialog.destroy()
+            messagebox.showerror("خطأ", f"حدث خطأ أثناء تصدير الملف:\n{error}")
+        
+        task = self.db.executor.submit(
+            self.reporting.export, self.REPORTS[report_type][0], from_date, to_date, file_path, file_format,
+            on_done=on_done,
+            on_error=on_error,
+            on_progress=on_progress
+        )
+        
+        def cancel():
+            # يتوقف الخيط عند الدفعة التالية ويحذف الملف المؤقت
+            task.cancel()
+            dialog.destroy()
         
-        if file_path:
-            try:
-                with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(header)
-                    writer.writerows(data)
-                messagebox.showinfo("نجاح", f"تم تصدير البيانات بنجاح إلى:\n{file_path}")
-            except Exception as e:
-                messagebox.showerror("خطأ", f"حدث خطأ أثناء تصدير الملف:\n{e}")
+        ttk.Button(container, text="إلغاء", command=cancel).pack(pady=5)
+        dialog.protocol("WM_DELETE_WINDOW", cancel)
     
-    def show_sales_report(self, from_date, to_date):
+    def show_sales_report(self, from_date, to_date, data):
         """تقرير المبيعات مع تحسينات بصرية"""
         # العنوان
         ttk.Label(self.report_frame, text=f"تقرير المبيعات من {from_date} إلى {to_date}", 
                   font=('Arial', 16, 'bold')).pack(pady=10)
 
-        # جلب البيانات
-        stats = self.db.fetch_one("""
-            SELECT COUNT(*), SUM(total_syp), SUM(total_usd), SUM(discount_syp)
-            FROM sales WHERE DATE(sale_date) BETWEEN ? AND ?
-        """, (from_date, to_date))
+        # البيانات من الملخصات اليومية
+        totals = data['totals']
+        stats = (totals['sales_count'], totals['revenue_syp'], totals['revenue_usd'], totals['discount_syp'])
 
         if not stats or not stats[0]:
             ttk.Label(self.report_frame, text="لا توجد مبيعات في هذه الفترة", 
@@ -222,21 +359,18 @@ class ReportsUI:
         self.create_stat_label(stats_container, "الإجمالي ($):", f"{total_usd:,.2f}")
         self.create_stat_label(stats_container, "الخصومات (ل.س):", f"{discount_syp:,.2f}")
         
-        sales_by_day = self.db.fetch_all("""
-            SELECT DATE(sale_date), SUM(total_syp)
-            FROM sales WHERE DATE(sale_date) BETWEEN ? AND ?
-            GROUP BY DATE(sale_date) ORDER BY DATE(sale_date)
-        """, (from_date, to_date))
+        sales_by_day = data['daily']
         
         if sales_by_day:
             dates = [row[0] for row in sales_by_day]
             totals = [row[1] for row in sales_by_day]
             
+            Figure, FigureCanvasTkAgg = chart_classes()
             fig = Figure(figsize=(6, 4), dpi=100)
             ax = fig.add_subplot(111)
             ax.bar(dates, totals, color='skyblue')
-            ax.set_ylabel(get_display(arabic_reshaper.reshape('إجمالي المبيعات (ل.س)')))
-            ax.set_xlabel(get_display(arabic_reshaper.reshape('التاريخ')))
+            ax.set_ylabel(prepare_arabic_text('إجمالي المبيعات (ل.س)'))
+            ax.set_xlabel(prepare_arabic_text('التاريخ'))
             fig.autofmt_xdate()
             
             canvas = FigureCanvasTkAgg(fig, master=chart_container)
@@ -260,24 +394,16 @@ class ReportsUI:
         scrollbar.pack(side='right', fill='y')
         tree.pack(fill='both', expand=True)
         
-        sales_data = self.db.fetch_all("""
-            SELECT id, total_syp, total_usd, payment_method, sale_date
-            FROM sales WHERE DATE(sale_date) BETWEEN ? AND ? ORDER BY id DESC
-        """, (from_date, to_date))
-        
-        for sale in sales_data:
+        for sale in data['rows']:
             tree.insert('', 'end', values=sale)
     
-    def show_purchases_report(self, from_date, to_date):
+    def show_purchases_report(self, from_date, to_date, data):
         """تقرير المشتريات"""
         ttk.Label(self.report_frame, text=f"تقرير المشتريات من {from_date} إلى {to_date}", 
                  font=('Arial', 14, 'bold')).pack(pady=10)
         
-        stats = self.db.fetch_one("""
-            SELECT COUNT(*), SUM(total_syp), SUM(total_usd)
-            FROM purchases
-            WHERE DATE(purchase_date) BETWEEN ? AND ?
-        """, (from_date, to_date))
+        totals = data['totals']
+        stats = (totals['purchases_count'], totals['purchases_syp'], totals['purchases_usd'])
         
         if stats and stats[0]:
             count, total_syp, total_usd = stats
@@ -306,30 +432,19 @@ class ReportsUI:
             
             tree.pack(fill='both', expand=True)
             
-            purchases = self.db.fetch_all("""
-                SELECT p.id, COALESCE(s.name, 'غير محدد'), p.total_syp, p.total_usd, p.purchase_date
-                FROM purchases p
-                LEFT JOIN suppliers s ON p.supplier_id = s.id
-                WHERE DATE(p.purchase_date) BETWEEN ? AND ?
-                ORDER BY p.id DESC
-            """, (from_date, to_date))
-            
-            for purchase in purchases:
+            for purchase in data['rows']:
                 tree.insert('', 'end', values=purchase)
         else:
             ttk.Label(self.report_frame, text="لا توجد مشتريات في هذه الفترة", 
                      font=('Arial', 12)).pack(pady=50)
     
-    def show_expenses_report(self, from_date, to_date):
+    def show_expenses_report(self, from_date, to_date, data):
         """تقرير المصروفات"""
         ttk.Label(self.report_frame, text=f"تقرير المصروفات من {from_date} إلى {to_date}", 
                  font=('Arial', 14, 'bold')).pack(pady=10)
         
-        stats = self.db.fetch_one("""
-            SELECT COUNT(*), SUM(amount_syp), SUM(amount_usd)
-            FROM expenses
-            WHERE DATE(expense_date) BETWEEN ? AND ?
-        """, (from_date, to_date))
+        totals = data['totals']
+        stats = (totals['expenses_count'], totals['expenses_syp'], totals['expenses_usd'])
         
         if stats and stats[0]:
             count, total_syp, total_usd = stats
@@ -357,35 +472,28 @@ class ReportsUI:
             
             tree.pack(fill='both', expand=True)
             
-            expenses = self.db.fetch_all("""
-                SELECT category, COUNT(*), SUM(amount_syp), SUM(amount_usd)
-                FROM expenses
-                WHERE DATE(expense_date) BETWEEN ? AND ?
-                GROUP BY category
-                ORDER BY SUM(amount_syp) DESC
-            """, (from_date, to_date))
-            
-            for expense in expenses:
+            for expense in data['rows']:
                 tree.insert('', 'end', values=expense)
         else:
             ttk.Label(self.report_frame, text="لا توجد مصروفات في هذه الفترة", 
                      font=('Arial', 12)).pack(pady=50)
     
-    def show_profit_report(self, from_date, to_date):
+    def show_profit_report(self, from_date, to_date, data):
         """تقرير الأرباح مع تحسينات بصرية"""
         ttk.Label(self.report_frame, text=f"تقرير الأرباح والخسائر من {from_date} إلى {to_date}", 
                   font=('Arial', 16, 'bold')).pack(pady=10)
 
-        # جلب البيانات
-        sales_syp, sales_usd = self.db.fetch_one("SELECT SUM(total_syp), SUM(total_usd) FROM sales WHERE DATE(sale_date) BETWEEN ? AND ?", (from_date, to_date)) or (0, 0)
-        cogs_syp, cogs_usd = self.db.fetch_one("SELECT SUM(si.quantity * p.purchase_price_syp), SUM(si.quantity * p.purchase_price_usd) FROM sale_items si JOIN sales s ON si.sale_id = s.id JOIN products p ON si.product_id = p.id WHERE DATE(s.sale_date) BETWEEN ? AND ?", (from_date, to_date)) or (0, 0)
-        expenses_syp, expenses_usd = self.db.fetch_one("SELECT SUM(amount_syp), SUM(amount_usd) FROM expenses WHERE DATE(expense_date) BETWEEN ? AND ?", (from_date, to_date)) or (0, 0)
+        # البيانات من الملخصات اليومية
+        totals = data['totals']
+        sales_syp, sales_usd = totals['revenue_syp'], totals['revenue_usd']
+        cogs_syp, cogs_usd = totals['cogs_syp'], totals['cogs_usd']
+        expenses_syp, expenses_usd = totals['expenses_syp'], totals['expenses_usd']
 
         sales_syp, sales_usd = sales_syp or 0, sales_usd or 0
         cogs_syp, cogs_usd = cogs_syp or 0, cogs_usd or 0
         expenses_syp, expenses_usd = expenses_syp or 0, expenses_usd or 0
 
-        net_profit_syp = sales_syp - cogs_syp - expenses_syp
+        net_profit_syp = net_profit(totals)[0]
 
         # الإطار الرئيسي
         main_frame = ttk.Frame(self.report_frame)
@@ -420,13 +528,12 @@ class ReportsUI:
             non_zero_data = []
             for label, size, color in zip(labels_ar, sizes, colors):
                 if size > 0:
-                    reshaped_text = arabic_reshaper.reshape(label)
-                    bidi_text = get_display(reshaped_text)
-                    non_zero_data.append((bidi_text, size, color))
+                    non_zero_data.append((prepare_arabic_text(label), size, color))
 
             if non_zero_data:
                 labels, sizes, colors = zip(*non_zero_data)
 
+                Figure, FigureCanvasTkAgg = chart_classes()
                 fig = Figure(figsize=(5, 5), dpi=100)
                 ax = fig.add_subplot(111)
                 ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140, colors=colors)
@@ -438,20 +545,12 @@ class ReportsUI:
         else:
             ttk.Label(chart_container, text="لا توجد إيرادات لعرض المخطط").pack(pady=50)
     
-    def show_top_products_report(self, from_date, to_date):
+    def show_top_products_report(self, from_date, to_date, data):
         """تقرير أفضل المنتجات مبيعاً مع مخطط بياني"""
         ttk.Label(self.report_frame, text=f"أفضل المنتجات مبيعاً من {from_date} إلى {to_date}", 
                   font=('Arial', 16, 'bold')).pack(pady=10)
 
-        products = self.db.fetch_all("""
-            SELECT si.product_name, SUM(si.quantity), SUM(si.subtotal_syp), SUM(si.subtotal_usd)
-            FROM sale_items si
-            JOIN sales s ON si.sale_id = s.id
-            WHERE DATE(s.sale_date) BETWEEN ? AND ?
-            GROUP BY si.product_name
-            ORDER BY SUM(si.quantity) DESC
-            LIMIT 50
-        """, (from_date, to_date))
+        products = data['rows']
 
         if not products:
             ttk.Label(self.report_frame, text="لا توجد بيانات لعرضها", 
@@ -470,13 +569,14 @@ class ReportsUI:
         
         # تشكيل أسماء المنتجات العربية
         product_names_ar = [p[0] for p in top_10_products]
-        product_names = [get_display(arabic_reshaper.reshape(name)) for name in product_names_ar]
+        product_names = [prepare_arabic_text(name) for name in product_names_ar]
         quantities = [p[1] for p in top_10_products]
 
+        Figure, FigureCanvasTkAgg = chart_classes()
         fig = Figure(figsize=(10, 4), dpi=100)
         ax = fig.add_subplot(111)
         ax.barh(product_names, quantities, color='coral')
-        ax.set_xlabel(get_display(arabic_reshaper.reshape('الكمية المباعة')))
+        ax.set_xlabel(prepare_arabic_text('الكمية المباعة'))
         ax.invert_yaxis()  # لعرض المنتج الأعلى في الأعلى
         fig.tight_layout()
 
@@ -509,7 +609,7 @@ class ReportsUI:
         for product in products:
             tree.insert('', 'end', values=product)
     
-    def show_suppliers_report(self):
+    def show_suppliers_report(self, from_date, to_date, data):
         """تقرير الموردين والديون"""
         ttk.Label(self.report_frame, text="تقرير الموردين والديون", 
                  font=('Arial', 14, 'bold')).pack(pady=10)
@@ -528,15 +628,7 @@ class ReportsUI:
         
         tree.pack(fill='both', expand=True)
         
-        suppliers = self.db.fetch_all("""
-            SELECT s.name, COUNT(p.id), s.debt_syp, s.debt_usd, s.phone
-            FROM suppliers s
-            LEFT JOIN purchases p ON s.id = p.supplier_id
-            GROUP BY s.id
-            ORDER BY s.debt_syp DESC
-        """)
-        
-        for supplier in suppliers:
+        for supplier in data['rows']:
             tree.insert('', 'end', values=supplier)
     
     def create_stat_label(self, parent, title, value):
@@ -1,7 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime
 import traceback
+from ui.virtual_table import VirtualTable, CatalogPageSource
+from ui.search_box import DebouncedSearch
+from services.sales import SalesService
 
 # ملف محسّن لواجهة نقطة البيع (SalesUI)
 # تحسينات رئيسية:
@@ -13,11 +15,16 @@ import traceback
 # - تعامل آمن مع قاعدة البيانات مع دوال "safe_"
 
 
+# الحد الأقصى لنتائج البحث المعروضة في نقطة البيع
+SEARCH_LIMIT = 500
+
+
 class SalesUI:
     def __init__(self, parent, db):
         self.parent = parent
         self.db = db
-        self.cart = []
+        self.sales = SalesService(db)
+        self.cart = self.sales.new_cart()
 
         # عناصر ستتم تهيئتها في setup
         self.products_tree = None
@@ -107,17 +114,38 @@ class SalesUI:
                 elif event.num == 5:
                     self.canvas.yview_scroll(1, 'units')
 
-        self.canvas.bind_all('<MouseWheel>', _on_mousewheel)
-        self.canvas.bind_all('<Button-4>', _on_mousewheel)
-        self.canvas.bind_all('<Button-5>', _on_mousewheel)
+        self._on_mousewheel = _on_mousewheel
 
         # بناء المحتوى
         self.setup_content()
 
-        # اختصارات لوحة مفاتيح
+        # التمرير واختصارات لوحة المفاتيح
+        self.bind_shortcuts()
+
+    def bind_shortcuts(self):
+        """ربط التمرير بالماوس واختصارات لوحة المفاتيح الخاصة بنقطة البيع"""
+        self.canvas.bind_all('<MouseWheel>', self._on_mousewheel)
+        self.canvas.bind_all('<Button-4>', self._on_mousewheel)
+        self.canvas.bind_all('<Button-5>', self._on_mousewheel)
         self.parent.bind_all('<Delete>', lambda e: self.remove_from_cart())
         self.parent.bind_all('<Control-l>', lambda e: self.clear_cart())
 
+    # ------------------ دورة حياة الشاشة ------------------
+    def refresh(self):
+        """تحديث قائمة المنتجات مع الإبقاء على السلة الحالية"""
+        self.search_products()
+
+    def on_show(self):
+        self.bind_shortcuts()
+        self.barcode_entry.focus_set()
+
+    def on_hide(self):
+        # إلغاء الاختصارات حتى لا تعمل في الشاشات الأخرى
+        self.parent.unbind_all('<Delete>')
+        self.parent.unbind_all('<Control-l>')
+        self.canvas.unbind_all('<Button-4>')
+        self.canvas.unbind_all('<Button-5>')
+
     # ------------------ محتوى الواجهة ------------------
     def setup_content(self):
         # Header
@@ -158,6 +186,16 @@ class SalesUI:
         frame = ttk.LabelFrame(parent, text='🛍️ المنتجات المتاحة', padding=10)
         frame.pack(fill='both', expand=True)
 
+        # إدخال الماسح الضوئي: كل مسح يضيف المنتج إلى السلة مباشرة بدون حوار
+        scan_group = ttk.Frame(frame)
+        scan_group.pack(fill='x', pady=(0, 8))
+        ttk.Label(scan_group, text='📷 باركود:', font=('Arial', 11, 'bold')).pack(side='left', padx=6)
+        self.barcode_entry = ttk.Entry(scan_group, font=('Arial', 12))
+        self.barcode_entry.pack(side='left', fill='x', expand=True, padx=6)
+        self.barcode_entry.bind('<Return>', self.scan_barcode)
+        self.scan_status = ttk.Label(scan_group, text='', font=('Arial', 10))
+        self.scan_status.pack(side='left', padx=6)
+
         controls = ttk.Frame(frame)
         controls.pack(fill='x', pady=(0, 8))
 
@@ -167,7 +205,7 @@ class SalesUI:
         ttk.Label(search_group, text='🔍 بحث سريع:', font=('Arial', 11)).pack(side='left', padx=6)
         self.search_entry = ttk.Entry(search_group, font=('Arial', 11))
         self.search_entry.pack(side='left', fill='x', expand=True, padx=6)
-        self.search_entry.bind('<KeyRelease>', lambda e: self.search_products())
+        self.search_debounce = DebouncedSearch(self.search_entry, lambda term: self.search_products())
 
         btn_group = ttk.Frame(controls)
         btn_group.pack(side='right')
@@ -193,20 +231,35 @@ class SalesUI:
 
         y_scroll = ttk.Scrollbar(table_container, orient='vertical', command=self.products_tree.yview)
         x_scroll = ttk.Scrollbar(table_container, orient='horizontal', command=self.products_tree.xview)
-        self.products_tree.configure(yscrollcommand=y_scroll.set, xscrollcommand=x_scroll.set)
+        self.products_tree.configure(xscrollcommand=x_scroll.set)
 
         self.products_tree.pack(side='top', fill='both', expand=True)
         y_scroll.pack(side='right', fill='y')
         x_scroll.pack(side='bottom', fill='x')
 
+        # عرض المنتجات صفحةً صفحة من كتالوج الذاكرة (بدون الوصول إلى القرص)
+        source = CatalogPageSource(
+            self.db.catalog,
+            columns=[
+                ('id', lambda r: r.id),
+                ('name', lambda r: r.name),
+                ('price_syp', lambda r: r.selling_price_syp),
+                ('price_usd', lambda r: r.selling_price_usd),
+                ('quantity', lambda r: r.quantity),
+            ]
+        )
+        self.products_table = VirtualTable(self.products_tree, y_scroll, source, sort='name')
+        self.db.catalog.subscribe(self.on_catalog_change)
+
         # تفعيل إضافة عبر نقرة مزدوجة أو Enter
         self.products_tree.bind('<Double-1>', self.add_to_cart)
         self.products_tree.bind('<Return>', self.add_to_cart)
 
         ttk.Label(frame, text='💡 انقر نقراً مزدوجاً على المنتج لإضافته إلى السلة', font=('Arial', 10, 'italic'), foreground='#666').pack(pady=8)
 
-        # تحميل البيانات
-        self.load_products()
+        # تحميل الكتالوج في خيط عامل عند أول فتح ثم ملء الجدول
+        self.products_table.set_busy(True)
+        self.db.catalog.load_async(self.db.executor, self.load_products)
 
     # ------------------ قسم السلة ------------------
     def setup_cart_section(self, parent):
@@ -303,48 +356,63 @@ class SalesUI:
 
     # ------------------ وظائف تحميل/بحث ------------------
     def load_products(self):
-        for i in self.products_tree.get_children():
-            self.products_tree.delete(i)
-
-        rows = self.safe_fetch_all(
-            """
-            SELECT id, name, selling_price_syp, selling_price_usd, quantity
-            FROM products
-            ORDER BY name
-            """
-        )
-        for r in rows:
-            # تأكد من وجود القيم
-            if r and len(r) >= 5:
-                self.products_tree.insert('', 'end', values=r)
+        try:
+            self.products_table.reload()
+        except Exception as e:
+            print('load_products error:', e)
+            traceback.print_exc()
         self.update_stats()
 
     def show_all_products(self):
         self.search_entry.delete(0, 'end')
-        self.load_products()
+        self.search_debounce.reset()
+        self.products_table.set_filter()
+        self.update_stats()
 
     def search_products(self):
         term = self.search_entry.get().strip()
-        for i in self.products_tree.get_children():
-            self.products_tree.delete(i)
-        if term == '':
-            self.load_products()
-            return
-        rows = self.safe_fetch_all(
-            """
-            SELECT id, name, selling_price_syp, selling_price_usd, quantity
-            FROM products
-            WHERE name LIKE ?
-            ORDER BY name
-            """,
-            (f'%{term}%',)
-        )
-        for r in rows:
-            if r and len(r) >= 5:
-                self.products_tree.insert('', 'end', values=r)
+        try:
+            if term == '':
+                self.products_table.set_filter()
+            else:
+                # أفضل النتائج من فهرس البحث مرتبة حسب الصلة
+                self.products_table.set_sort(CatalogPageSource.RANK, reload=False)
+                self.products_table.set_filter(ids=self.db.search_product_ids(term, limit=SEARCH_LIMIT))
+        except Exception as e:
+            print('search_products error:', e)
+            traceback.print_exc()
         self.update_stats()
 
+    def on_catalog_change(self, changed, removed):
+        """تحديث الأسعار والكميات المعروضة عند تغير الكتالوج"""
+        self.products_table.update_rows(changed | removed)
+
     # ------------------ إضافة وإدارة السلة ------------------
+    def add_item(self, product, quantity):
+        """إضافة كمية من منتج إلى السلة (أو زيادة سطره إن وُجد) وإرجاع رسالة خطأ أو None"""
+        try:
+            self.cart.add(product, quantity)
+        except ValueError as e:
+            return str(e)
+        self.update_cart_display()
+        return None
+
+    def scan_barcode(self, event=None):
+        """معالجة مسح باركود: بحث في الذاكرة ثم إضافة قطعة واحدة إلى السلة"""
+        code = self.barcode_entry.get().strip()
+        self.barcode_entry.delete(0, 'end')
+        if not code:
+            return 'break'
+        try:
+            product = self.sales.scan(self.cart, code)
+        except ValueError as e:
+            self.barcode_entry.bell()
+            self.scan_status.config(text=f'⚠️ {e}', foreground='red')
+            return 'break'
+        self.update_cart_display()
+        self.scan_status.config(text=f'✓ {product.name}', foreground='green')
+        return 'break'
+
     def add_to_cart(self, event=None):
         sel = self.products_tree.selection()
         if not sel:
@@ -352,16 +420,18 @@ class SalesUI:
             return
         try:
             vals = self.products_tree.item(sel[0])['values']
-            product_id, name, price_syp, price_usd, available_qty = vals
-            # تحويل أنواع مع التحقق
+            # القيم الحالية من الكتالوج وليس من نص الجدول
             try:
-                product_id = int(product_id)
-                price_syp = float(price_syp)
-                price_usd = float(price_usd)
-                available_qty = float(available_qty)
+                product = self.db.catalog.get(int(vals[0]))
             except Exception:
+                product = None
+            if product is None:
                 messagebox.showerror('خطأ', 'بيانات المنتج غير صالحة')
                 return
+            name = product.name
+            price_syp = float(product.selling_price_syp)
+            price_usd = float(product.selling_price_usd)
+            available_qty = float(product.quantity)
 
             # حوار الكمية
             dlg = tk.Toplevel(self.parent)
@@ -387,24 +457,10 @@ class SalesUI:
             def confirm():
                 try:
                     q = float(qty_var.get())
-                    if q <= 0:
-                        raise ValueError('الكمية يجب أن تكون أكبر من الصفر')
-                    if q > available_qty:
-                        messagebox.showerror('خطأ', f'الكمية المتاحة فقط: {available_qty}')
+                    error = self.add_item(product, q)
+                    if error:
+                        messagebox.showerror('خطأ', error)
                         return
-                    total_syp = q * price_syp
-                    total_usd = q * price_usd
-                    item = {
-                        'product_id': product_id,
-                        'name': name,
-                        'quantity': q,
-                        'unit_price_syp': price_syp,
-                        'unit_price_usd': price_usd,
-                        'total_syp': total_syp,
-                        'total_usd': total_usd
-                    }
-                    self.cart.append(item)
-                    self.update_cart_display()
                     dlg.destroy()
                     messagebox.showinfo('تم', f"تمت إضافة '{name}' إلى السلة")
                 except ValueError as ve:
@@ -446,8 +502,7 @@ class SalesUI:
         self.update_stats()
 
     def update_totals(self):
-        total_syp = sum(item['total_syp'] for item in self.cart)
-        total_usd = sum(item['total_usd'] for item in self.cart)
+        total_syp, total_usd = self.cart.subtotal()
         try:
             discount_syp = float(self.discount_syp_entry.get() or 0)
         except Exception:
@@ -468,7 +523,7 @@ class SalesUI:
             return
         idx = self.cart_tree.index(sel[0])
         if 0 <= idx < len(self.cart):
-            removed = self.cart.pop(idx)
+            removed = self.cart.remove(idx)
             self.update_cart_display()
             messagebox.showinfo('تم', f"تم حذف '{removed['name']}' من السلة")
 
@@ -506,17 +561,8 @@ class SalesUI:
 
         def apply_change():
             try:
-                new_q = float(qvar.get())
-                if new_q <= 0:
-                    raise ValueError('الكمية يجب أن تكون أكبر من الصفر')
-                # (اختياري) التحقق من المخزون بقيام استعلام للمنتج
-                row = self.safe_fetch_one('SELECT quantity FROM products WHERE id = ?', (item['product_id'],))
-                if row and row[0] is not None and new_q > float(row[0]):
-                    messagebox.showerror('خطأ', f'الكمية المتاحة فقط: {row[0]}')
-                    return
-                item['quantity'] = new_q
-                item['total_syp'] = new_q * item['unit_price_syp']
-                item['total_usd'] = new_q * item['unit_price_usd']
+                # التحقق من الكمية والمخزون في السلة
+                self.cart.set_quantity(idx, float(qvar.get()))
                 self.update_cart_display()
                 dlg.destroy()
             except ValueError as ve:
@@ -573,50 +619,36 @@ class SalesUI:
             messagebox.showerror('خطأ', 'قيمة خصم غير صحيحة ($)')
             return
 
-        total_syp = sum(item['total_syp'] for item in self.cart) - discount_syp
-        total_usd = sum(item['total_usd'] for item in self.cart) - discount_usd
-
         payment_method = self.payment_var.get()
         notes = self.notes_text.get('1.0', 'end-1c').strip()
 
-        # حفظ البيع في قاعدة البيانات
-        if not self.safe_execute(
-            """
-            INSERT INTO sales (total_syp, total_usd, payment_method, discount_syp, discount_usd, notes, sale_date)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (total_syp, total_usd, payment_method, discount_syp, discount_usd, notes, datetime.now().isoformat())
-        ):
+        # حفظ البيع كاملاً (الفاتورة، العناصر، المخزون، الحركات) في معاملة واحدة
+        try:
+            sale_id = self.sales.checkout(
+                self.cart,
+                payment_method=payment_method,
+                discount_syp=discount_syp,
+                discount_usd=discount_usd,
+                notes=notes
+            )
+        except ValueError as e:
+            messagebox.showerror('خطأ', str(e))
+            return
+        except Exception:
+            traceback.print_exc()
+            sale_id = None
+        if sale_id is None:
             messagebox.showerror('خطأ', 'فشل في تسجيل عملية البيع')
             return
 
-        try:
-            sale_id = self.db.cursor.lastrowid if hasattr(self.db, 'cursor') else None
-            # حفظ عناصر البيع وتحديث المخزون
-            for item in self.cart:
-                self.safe_execute(
-                    """
-                    INSERT INTO sale_items (sale_id, product_id, product_name, quantity, unit_price_syp, unit_price_usd, subtotal_syp, subtotal_usd)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (sale_id, item['product_id'], item['name'], item['quantity'], item['unit_price_syp'], item['unit_price_usd'], item['total_syp'], item['total_usd'])
-                )
-                # تحديث المخزون
-                self.safe_execute("UPDATE products SET quantity = quantity - ? WHERE id = ?", (item['quantity'], item['product_id']))
-                # تسجيل حركة المخزون
-                self.safe_execute("INSERT INTO inventory_movements (product_id, movement_type, quantity, reason, moved_at) VALUES (?, 'out', ?, 'بيع', ?)", (item['product_id'], item['quantity'], datetime.now().isoformat()))
-
-            messagebox.showinfo('تم', f'تم تسجيل البيع بنجاح\nرقم الفاتورة: {sale_id or "-"}')
-
-            # إعادة تهيئة النموذج
-            self.cart.clear()
-            self.update_cart_display()
-            self.discount_syp_entry.delete(0, 'end'); self.discount_syp_entry.insert(0, '0')
-            self.discount_usd_entry.delete(0, 'end'); self.discount_usd_entry.insert(0, '0')
-            self.notes_text.delete('1.0', 'end')
-            self.load_products()
-        except Exception as e:
-            traceback.print_exc()
-            messagebox.showerror('خطأ', f'حدث خطأ أثناء حفظ عناصر البيع: {e}')
+        messagebox.showinfo('تم', f'تم تسجيل البيع بنجاح\nرقم الفاتورة: {sale_id}')
+
+        # إعادة تهيئة النموذج
+        self.cart.clear()
+        self.update_cart_display()
+        self.discount_syp_entry.delete(0, 'end'); self.discount_syp_entry.insert(0, '0')
+        self.discount_usd_entry.delete(0, 'end'); self.discount_usd_entry.insert(0, '0')
+        self.notes_text.delete('1.0', 'end')
+        self.load_products()
 
 # نهاية الملف
@@ -0,0 +1,47 @@
+from database.search import tokenize
+
+# بحث أثناء الكتابة مع تأخير قصير (debounce)
+# - كل ضغطة مفتاح تلغي البحث المجدول السابق فلا يُنفَّذ إلا آخر نص
+# - لا يُعاد البحث إن لم يتغير النص بعد التوحيد (مفاتيح الأسهم، Shift، مسافة زائدة...)
+
+
+class DebouncedSearch:
+    """تشغيل دالة البحث بعد توقف الكتابة لبضع أجزاء من الثانية مع إسقاط الطلبات القديمة"""
+
+    def __init__(self, entry, callback, delay=60):
+        self.entry = entry
+        self.callback = callback
+        self.delay = delay
+        # يزداد مع كل ضغطة: أي طلب برقم أقدم أصبح قديماً
+        self.generation = 0
+        self._after = None
+        self._last = None
+        entry.bind('<KeyRelease>', self.schedule)
+
+    def schedule(self, event=None):
+        """جدولة البحث بعد مهلة التأخير (تلغي أي جدولة سابقة)"""
+        self.cancel()
+        self.generation += 1
+        self._after = self.entry.after(self.delay, self._fire, self.generation)
+
+    def _fire(self, generation):
+        self._after = None
+        if generation != self.generation:
+            return
+        term = self.entry.get().strip()
+        key = ' '.join(tokenize(term))
+        if key == self._last:
+            return
+        self._last = key
+        self.callback(term)
+
+    def cancel(self):
+        """إلغاء البحث المجدول إن وُجد"""
+        if self._after:
+            self.entry.after_cancel(self._after)
+            self._after = None
+
+    def reset(self):
+        """نسيان آخر نص (بعد تغيير حقل البحث برمجياً)"""
+        self.cancel()
+        self._last = None
@@ -133,6 +133,10 @@ class SuppliersUI:
         for supplier in suppliers:
             self.tree.insert('', 'end', values=supplier)
     
+    def refresh(self):
+        """تحديث قائمة الموردين"""
+        self.load_suppliers()
+    
     def add_supplier(self):
         """إضافة مورد جديد"""
         name = self.name_entry.get().strip()
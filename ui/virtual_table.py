@@ -0,0 +1,383 @@
+import tkinter as tk
+from bisect import bisect_left, bisect_right
+
+# جدول افتراضي (Virtualized Treeview)
+# - يجلب الصفوف صفحةً صفحة بترقيم المفاتيح (keyset pagination) بدلاً من OFFSET أو جلب الجدول كاملاً
+# - يحتفظ في الـ Treeview بالنافذة المرئية مع هامش فقط، ويحذف الصفوف البعيدة أثناء التمرير
+# - الفرز من جهة قاعدة البيانات بالنقر على عنوان العمود
+# - مع منفذ استعلامات (db.executor) تُجلب صفحات مصادر SQL في خيط عامل ولا تتجمد الواجهة
+
+
+class SQLPageSource:
+    """مصدر صفحات من استعلام SQL مرتب بمفتاح (قيمة عمود الفرز، المعرف)"""
+
+    # يمكن جلب صفحاته في خيط عامل عبر fetch(..., reader=اتصال القراءة)
+    threaded = True
+
+    def __init__(self, db, columns, from_clause, key='id', where=None, params=()):
+        # columns: قائمة (اسم العمود، تعبير SQL) بترتيب قيم الصف
+        # يجب ألا تُرجع التعابير NULL (استخدم COALESCE) حتى تعمل المقارنات بين الصفحات
+        self.db = db
+        self.columns = [name for name, _ in columns]
+        self.exprs = dict(columns)
+        self.from_clause = from_clause
+        self.key = key
+        self.where = where
+        self.params = tuple(params)
+
+    def sortable(self, column):
+        return column in self.exprs
+
+    def set_filter(self, where=None, params=()):
+        """تغيير شرط التصفية (بدون كلمة WHERE)"""
+        self.where = where
+        self.params = tuple(params)
+
+    def value(self, row, column):
+        return row[self.columns.index(column)]
+
+    def fetch(self, sort, descending=False, after=None, before=None, limit=100, reader=None):
+        """جلب صفحة مرتبة تلي الصف after أو تسبق الصف before (عبر reader إن أُعطي بدلاً من db)"""
+        expr = self.exprs[sort]
+        key_expr = self.exprs[self.key]
+        conditions = [f"({self.where})"] if self.where else []
+        params = list(self.params)
+
+        backward = before is not None
+        anchor = before if backward else after
+        # الصفحات السابقة تُجلب بالترتيب المعكوس ثم تُقلب
+        reverse = descending != backward
+        op = '<' if reverse else '>'
+        if anchor is not None:
+            value = self.value(anchor, sort)
+            key_value = self.value(anchor, self.key)
+            conditions.append(f"({expr} {op} ? OR ({expr} = ? AND {key_expr} {op} ?))")
+            params += [value, value, key_value]
+
+        direction = 'DESC' if reverse else 'ASC'
+        query = f"SELECT {', '.join(self.exprs[c] for c in self.columns)} {self.from_clause}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {expr} {direction}, {key_expr} {direction} LIMIT ?"
+        params.append(limit)
+
+        rows = list((reader or self.db).fetch_all(query, tuple(params)))
+        if backward:
+            rows.reverse()
+        return rows
+
+
+class CatalogPageSource:
+    """مصدر صفحات من كتالوج المنتجات في الذاكرة (بدون الوصول إلى القرص)"""
+
+    # عمود فرز افتراضي يتبع ترتيب المعرفات المعطاة للفلتر (ترتيب الصلة من البحث)
+    RANK = 'rank'
+    # الصفحات من الذاكرة فلا فائدة من خيط عامل
+    threaded = False
+
+    def __init__(self, catalog, columns, key='id', predicate=None):
+        # columns: قائمة (اسم العمود، دالة تأخذ سجل المنتج وتُرجع القيمة)
+        self.catalog = catalog
+        self.columns = [name for name, _ in columns]
+        self.getters = [getter for _, getter in columns]
+        self.key = key
+        self.predicate = predicate
+        self.ids = None
+        self._rank = {}
+        # الترتيب المحسوب لكل عمود فرز حتى يتغير الكتالوج أو الفلتر
+        self._ordered = {}
+
+    def sortable(self, column):
+        return column in self.columns or (column == self.RANK and self.ids is not None)
+
+    def set_filter(self, predicate=None, ids=None):
+        """تغيير التصفية: دالة على سجل المنتج و/أو قائمة معرفات مرتبة (نتيجة البحث)"""
+        self.predicate = predicate
+        self.ids = list(ids) if ids is not None else None
+        self._rank = {product_id: i for i, product_id in enumerate(self.ids or ())}
+        self._ordered.clear()
+
+    def value(self, row, column):
+        if column == self.RANK:
+            return self._rank.get(self.value(row, self.key), len(self._rank))
+        return row[self.columns.index(column)]
+
+    def row(self, record):
+        return tuple(getter(record) for getter in self.getters)
+
+    def matches(self, record):
+        """هل يطابق سجل المنتج الفلتر الحالي"""
+        if self.ids is not None and record.id not in self._rank:
+            return False
+        return not self.predicate or self.predicate(record)
+
+    def lookup(self, key):
+        """الصف الحالي لمفتاح معين أو None إن حُذف أو لم يعد يطابق الفلتر"""
+        record = self.catalog.get(key)
+        if record is None or not self.matches(record):
+            return None
+        return self.row(record)
+
+    def _sorted(self, sort):
+        cached = self._ordered.get(sort)
+        if cached and cached[0] == self.catalog.version:
+            return cached[1], cached[2]
+        if self.ids is not None:
+            records = [r for r in map(self.catalog.get, self.ids) if r is not None]
+        else:
+            records = self.catalog.records()
+        if self.predicate:
+            records = [r for r in records if self.predicate(r)]
+        rows = [self.row(r) for r in records]
+        keys = [(self.value(r, sort), self.value(r, self.key)) for r in rows]
+        order = sorted(range(len(rows)), key=keys.__getitem__)
+        rows = [rows[i] for i in order]
+        keys = [keys[i] for i in order]
+        self._ordered[sort] = (self.catalog.version, rows, keys)
+        return rows, keys
+
+    def fetch(self, sort, descending=False, after=None, before=None, limit=100):
+        """جلب صفحة مرتبة تلي الصف after أو تسبق الصف before"""
+        rows, keys = self._sorted(sort)
+        anchor = before if before is not None else after
+        if anchor is None:
+            return rows[-limit:][::-1] if descending else rows[:limit]
+        anchor_key = (self.value(anchor, sort), self.value(anchor, self.key))
+        # الصف التالي في الترتيب التنازلي هو السابق في القائمة التصاعدية والعكس
+        forward = (after is not None) != descending
+        if forward:
+            i = bisect_right(keys, anchor_key)
+            page = rows[i:i + limit]
+        else:
+            i = bisect_left(keys, anchor_key)
+            page = rows[max(0, i - limit):i]
+        return page[::-1] if descending else page
+
+
+class VirtualTable:
+    """ربط Treeview موجود بمصدر صفحات وتحميل الصفوف تدريجياً أثناء التمرير"""
+
+    def __init__(self, tree, scrollbar, source, sort=None, descending=False,
+                 page_size=100, max_rows=500, row_builder=None, executor=None):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.source = source
+        self.sort = sort or source.key
+        self.descending = descending
+        self.default_sort = self.sort
+        self.default_descending = descending
+        self.page_size = page_size
+        self.max_rows = max_rows
+        # row_builder(row) -> (values, tags) لتنسيق الصف قبل عرضه
+        self.row_builder = row_builder or (lambda row: (row, ()))
+
+        # الصفوف الخام المعروضة حالياً بنفس ترتيب عناصر الجدول
+        self.rows = []
+        self.at_start = True
+        self.at_end = True
+        self._pending = None
+        # منفذ الخيوط العاملة (اختياري) والمهمة الجارية ورقم الجيل لتجاهل النتائج القديمة
+        self.executor = executor
+        self._task = None
+        self._generation = 0
+        self._interrupted = False
+
+        self._headings = {col: tree.heading(col, 'text') for col in tree['columns']}
+        tree.configure(yscrollcommand=self._on_scroll)
+        for col in tree['columns']:
+            if source.sortable(col):
+                tree.heading(col, command=lambda c=col: self.sort_by(c))
+        self._update_headings()
+
+    # ------------------ التحميل ------------------
+    def reload(self):
+        """إعادة التحميل من البداية (بعد تغيير الفلتر أو الفرز أو البيانات)"""
+        self._cancel_pending()
+        self._interrupted = False
+        generation = self._generation
+        self._fetch(dict(limit=self.page_size), lambda rows: self._replace(generation, rows))
+
+    def _replace(self, generation, rows):
+        if generation != self._generation:
+            return
+        self.set_busy(False)
+        self.tree.delete(*self.tree.get_children())
+        self.rows = rows
+        self.at_start = True
+        self.at_end = len(rows) < self.page_size
+        self._insert(rows, 'end')
+        self.tree.yview_moveto(0)
+
+    def _fetch(self, kwargs, apply):
+        """جلب صفحة من المصدر: في خيط عامل إن أمكن وإلا مباشرة، ثم apply(rows) في خيط الواجهة"""
+        if self.executor is None or not getattr(self.source, 'threaded', False):
+            apply(self.source.fetch(self.sort, self.descending, **kwargs))
+            return
+        source, sort, descending = self.source, self.sort, self.descending
+
+        def done(rows):
+            self._task = None
+            self.set_busy(False)
+            apply(rows)
+
+        def failed(error):
+            self._task = None
+            self.set_busy(False)
+            print(f"خطأ في جلب البيانات: {error}")
+
+        self.set_busy(True)
+        self._task = self.executor.submit(
+            lambda reader: source.fetch(sort, descending, reader=reader, **kwargs),
+            on_done=done, on_error=failed
+        )
+
+    def cancel(self):
+        """إلغاء أي تحميل جارٍ عند مغادرة الشاشة (يُستأنف بـ resume)"""
+        if self._task:
+            self._interrupted = True
+        self._cancel_pending()
+
+    def resume(self):
+        """إعادة التحميل إن أُلغي تحميل سابق قبل اكتماله"""
+        if self._interrupted:
+            self.reload()
+
+    def set_busy(self, busy):
+        """مؤشر الانتظار على الجدول أثناء جلب البيانات في خيط عامل"""
+        try:
+            self.tree.configure(cursor='watch' if busy else '')
+        except tk.TclError:
+            pass
+
+    def set_filter(self, *args, **kwargs):
+        """تطبيق شرط تصفية جديد (بصيغة المصدر) وإعادة التحميل"""
+        self.source.set_filter(*args, **kwargs)
+        if not self.source.sortable(self.sort):
+            self.set_sort(self.default_sort, self.default_descending, reload=False)
+        self.reload()
+
+    def update_rows(self, keys):
+        """تحديث الصفوف المعروضة ذات المفاتيح المحددة في مكانها (يتطلب مصدراً يدعم lookup)"""
+        items = self.tree.get_children()
+        for index, row in enumerate(self.rows):
+            key = self.source.value(row, self.source.key)
+            if key not in keys:
+                continue
+            fresh = self.source.lookup(key)
+            if fresh is None:
+                # حُذف الصف أو لم يعد يطابق الفلتر: إعادة التحميل أبسط من إزاحة النافذة
+                self.reload()
+                return
+            self.rows[index] = fresh
+            values, tags = self.row_builder(fresh)
+            self.tree.item(items[index], values=values, tags=tags)
+
+    def set_source(self, source):
+        """استبدال مصدر البيانات وإعادة التحميل"""
+        self.source = source
+        if not source.sortable(self.sort):
+            self.sort = source.key
+        self.reload()
+
+    def sort_by(self, column):
+        """الفرز حسب عمود (النقر مرة ثانية يعكس الاتجاه)"""
+        if column == self.sort:
+            self.set_sort(column, not self.descending)
+        else:
+            self.set_sort(column)
+
+    def set_sort(self, column, descending=False, reload=True):
+        """تحديد عمود الفرز واتجاهه"""
+        self.sort = column
+        self.descending = descending
+        self._update_headings()
+        if reload:
+            self.reload()
+
+    def _load_next(self):
+        self._pending = None
+        if self.at_end or not self.rows or self._task:
+            return
+        generation = self._generation
+        self._fetch(dict(after=self.rows[-1], limit=self.page_size),
+                    lambda rows: self._append(generation, rows))
+
+    def _append(self, generation, rows):
+        if generation != self._generation:
+            return
+        self.at_end = len(rows) < self.page_size
+        if not rows:
+            return
+        self.rows.extend(rows)
+        self._insert(rows, 'end')
+
+        # حذف الصفوف البعيدة من الأعلى مع الحفاظ على موضع العرض
+        excess = len(self.rows) - self.max_rows
+        if excess > 0:
+            items = self.tree.get_children()
+            self.tree.delete(*items[:excess])
+            del self.rows[:excess]
+            self.at_start = False
+            self.tree.yview_scroll(-excess, 'units')
+
+    def _load_prev(self):
+        self._pending = None
+        if self.at_start or not self.rows or self._task:
+            return
+        generation = self._generation
+        self._fetch(dict(before=self.rows[0], limit=self.page_size),
+                    lambda rows: self._prepend(generation, rows))
+
+    def _prepend(self, generation, rows):
+        if generation != self._generation:
+            return
+        self.at_start = len(rows) < self.page_size
+        if not rows:
+            return
+        self.rows[:0] = rows
+        self._insert(rows, 0)
+        self.tree.yview_scroll(len(rows), 'units')
+
+        # حذف الصفوف البعيدة من الأسفل
+        excess = len(self.rows) - self.max_rows
+        if excess > 0:
+            items = self.tree.get_children()
+            self.tree.delete(*items[-excess:])
+            del self.rows[-excess:]
+            self.at_end = False
+
+    def _insert(self, rows, index):
+        for offset, row in enumerate(rows):
+            values, tags = self.row_builder(row)
+            position = index if index == 'end' else index + offset
+            self.tree.insert('', position, values=values, tags=tags)
+
+    # ------------------ التمرير ------------------
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._pending or self._task:
+            return
+        if float(last) >= 0.95 and not self.at_end:
+            self._pending = self.tree.after_idle(self._load_next)
+        elif float(first) <= 0.05 and not self.at_start:
+            self._pending = self.tree.after_idle(self._load_prev)
+
+    def _cancel_pending(self):
+        # أي نتيجة تصل بعد هذه النقطة تخص جيلاً سابقاً فتُتجاهل
+        self._generation += 1
+        if self._pending:
+            try:
+                self.tree.after_cancel(self._pending)
+            except tk.TclError:
+                pass
+            self._pending = None
+        if self._task:
+            self._task.cancel()
+            self._task = None
+            self.set_busy(False)
+
+    def _update_headings(self):
+        for col, text in self._headings.items():
+            if col == self.sort:
+                text = f"{text} {'▼' if self.descending else '▲'}"
+            self.tree.heading(col, text=text)
@@ -1,11 +1,10 @@
-from arabic_reshaper import reshape
-from bidi.algorithm import get_display
+from utils.imports import import_attr
 
 def prepare_arabic_text(text):
-    """تحضير النص العربي للعرض الصحيح"""
+    """تحضير النص العربي للعرض الصحيح (مكتبتا التشكيل والاتجاه تُستوردان عند أول استخدام)"""
     if text:
-        reshaped_text = reshape(text)
-        return get_display(reshaped_text)
+        reshaped_text = import_attr('arabic_reshaper', 'reshape')(text)
+        return import_attr('bidi.algorithm', 'get_display')(reshaped_text)
     return text
 
 def format_currency(amount, currency='ل.س'):
@@ -0,0 +1,35 @@
+# استيراد المكتبات الثقيلة (matplotlib، pytz، arabic_reshaper...) عند أول حاجة إليها بدلاً من بدء التشغيل
+# مع تسجيل زمن كل استيراد لعرض توزيع زمن البدء
+import importlib
+import sys
+import time
+from collections import OrderedDict
+
+
+# اسم الوحدة -> زمن استيرادها بالثواني (شاملاً ما تستورده هي عند تحميلها)
+IMPORT_TIMES = OrderedDict()
+
+
+def lazy_import(name):
+    """استيراد وحدة بالاسم عند الحاجة وتسجيل زمن أول استيراد لها"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES[name] = time.perf_counter() - start
+    return module
+
+
+def import_attr(name, attr):
+    """استيراد عنصر من وحدة عند الحاجة: import_attr('matplotlib.figure', 'Figure')"""
+    return getattr(lazy_import(name), attr)
+
+
+def format_import_times(limit=None):
+    """توزيع أزمنة الاستيراد المسجلة كنص، الأبطأ أولاً"""
+    items = sorted(IMPORT_TIMES.items(), key=lambda item: item[1], reverse=True)
+    if limit:
+        items = items[:limit]
+    width = max((len(name) for name, _ in items), default=0)
+    return '\n'.join(f"{name.ljust(width)}  {seconds * 1000:8.1f} ms" for name, seconds in items)
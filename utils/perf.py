@@ -0,0 +1,114 @@
+# قياس الأداء داخل التطبيق: أزمنة مراحل البدء والتنقل بين الشاشات واستعلامات قاعدة البيانات ورسم المخططات
+# - الأحداث تُحفظ في حلقة محدودة الحجم (ring buffer) فلا تنمو الذاكرة مهما طال التشغيل
+# - التسجيل آمن من أي خيط (استعلامات الخيوط العاملة)، والعرض في لوحة الأداء أو التصدير JSON
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def percentile(values, fraction):
+    """قيمة المئين من قائمة مرتبة (أقرب رتبة)"""
+    if not values:
+        return 0
+    rank = math.ceil(fraction * len(values))
+    return values[min(len(values), max(rank, 1)) - 1]
+
+
+class PerfRecorder:
+    """سجل أحداث الأداء: كل حدث (النوع، الاسم، المدة بالميلي ثانية، تفاصيل إضافية)"""
+
+    def __init__(self, size=5000):
+        self.size = size
+        self.enabled = True
+        self.started_at = datetime.now()
+        self._events = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, kind, name, seconds, **details):
+        """تسجيل حدث مدته seconds ثانية"""
+        if not self.enabled:
+            return
+        event = {
+            'at': datetime.now().isoformat(timespec='milliseconds'),
+            'kind': kind,
+            'name': name,
+            'ms': round(seconds * 1000, 3),
+            'thread': threading.current_thread().name,
+        }
+        event.update(details)
+        with self._lock:
+            self._events.append(event)
+
+    @contextmanager
+    def measure(self, kind, name, **details):
+        """قياس مدة كتلة: with PERF.measure('chart', 'weekly_sales'): ..."""
+        start = time.perf_counter()
+        try:
+            yield details
+        finally:
+            self.record(kind, name, time.perf_counter() - start, **details)
+
+    def on_query(self, operation, fingerprint, rows, seconds, error=None):
+        """مراقب استعلامات DatabaseManager (يُسجَّل عبر db.observe_queries)"""
+        details = {'op': operation, 'rows': rows}
+        if error:
+            details['error'] = error
+        self.record('sql', fingerprint, seconds, **details)
+
+    def events(self, kind=None):
+        """نسخة من الأحداث المسجلة (الأقدم أولاً)"""
+        with self._lock:
+            events = list(self._events)
+        if kind:
+            events = [event for event in events if event['kind'] == kind]
+        return events
+
+    def summary(self, kind=None):
+        """إحصائيات كل (نوع، اسم): العدد والمجموع والمتوسط و p95 والأقصى، الأكبر مجموعاً أولاً"""
+        groups = {}
+        for event in self.events(kind):
+            groups.setdefault((event['kind'], event['name']), []).append(event['ms'])
+        rows = []
+        for (event_kind, name), durations in groups.items():
+            durations.sort()
+            total = sum(durations)
+            rows.append({
+                'kind': event_kind,
+                'name': name,
+                'count': len(durations),
+                'total_ms': round(total, 3),
+                'avg_ms': round(total / len(durations), 3),
+                'p95_ms': percentile(durations, 0.95),
+                'max_ms': durations[-1],
+            })
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+    def to_dict(self, extra=None):
+        data = {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'exported_at': datetime.now().isoformat(timespec='seconds'),
+            'buffer_size': self.size,
+            'summary': self.summary(),
+            'events': self.events(),
+        }
+        if extra:
+            data.update(extra)
+        return data
+
+    def export_json(self, file_path, extra=None):
+        """حفظ الأحداث والملخص في ملف JSON للتحليل خارج البرنامج"""
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(extra), f, ensure_ascii=False, indent=2)
+
+
+# السجل المشترك للتطبيق
+PERF = PerfRecorder()